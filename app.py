@@ -1,85 +1,115 @@
+from concurrent.futures import as_completed
+
 import streamlit as st
-from utils.display import display_results
-from checkers.excel.excel_1 import check_excel_1
-from checkers.excel.excel_2 import check_excel_2
-from checkers.excel.excel_3 import check_excel_3
-from checkers.excel.excel_final import check_excel_final
-from openpyxl import load_workbook
-from docx import Document
-from pptx import Presentation
+from utils.display import display_results, display_timings
+from utils.ingest import ingest
+from utils.instrumentation import Trace, stage, tracing
+from checkers.registry import ASSIGNMENTS
+from grading.archive import read_export
+from grading.pool import GradingPool
+from utils.detect import detect_assignment
+
+SECTIONS = [
+    ("Excel Assignments", "xlsx"),
+    ("Word Assignments", "docx"),
+    ("PowerPoint Assignments", "pptx"),
+]
+
+
+@st.cache_resource
+def grading_pool():
+    """One worker pool for the whole server, shared by every session."""
+    return GradingPool()
+
 
-st.title("Assignment Checker")
+def show_result(title, trace, warnings, checklist_data, key):
+    st.subheader(f"{title} Results: {trace.submission}")
+    for warning in warnings:
+        st.warning(warning)
+    with tracing(trace):
+        with stage("display"):
+            display_results(checklist_data)
+    display_timings(trace, key=key)
 
-# Excel Section
-st.header("Excel Assignments")
-excel_1_file = st.file_uploader("Upload Excel_1", type=["xlsx"], key="excel_1")
-excel_2_file = st.file_uploader("Upload Excel_2", type=["xlsx"], key="excel_2")
-excel_3_file = st.file_uploader("Upload Excel_3", type=["xlsx"], key="excel_3")
-excel_final_file = st.file_uploader("Upload Excel_Final", type=["xlsx"], key="excel_final")
 
-# Word Section
-st.header("Word Assignments")
-word_1_file = st.file_uploader("Upload Word_1", type=["docx"], key="word_1")
+def main():
+    st.title("Assignment Checker")
 
-# PowerPoint Section
-st.header("PowerPoint Assignments")
-ppt_1_file = st.file_uploader("Upload PowerPoint_1", type=["pptx"], key="ppt_1")
+    # One uploader per assignment, grouped by file type
+    uploads = {}
+    for header, extension in SECTIONS:
+        st.header(header)
+        for name, assignment in ASSIGNMENTS.items():
+            if assignment["extension"] == extension:
+                uploads[name] = st.file_uploader(
+                    f"Upload {assignment['title']}", type=[extension], key=name, accept_multiple_files=True
+                )
 
-# Excel Checkers
-if excel_1_file:
-    try:
-        workbook = load_workbook(excel_1_file)
-        checklist_data = check_excel_1(workbook)
-        st.subheader("Excel Assignment 1 Results")
-        display_results(checklist_data)
-    except Exception as e:
-        st.error(f"An error occurred with Excel Assignment 1: {str(e)}")
+    # A whole LMS export at once: each file is matched to its assignment by content
+    st.header("LMS Export")
+    export = st.file_uploader("Upload a submissions export", type=["zip"], key="lms_export")
 
-if excel_2_file:
-    try:
-        workbook = load_workbook(excel_2_file)
-        checklist_data = check_excel_2(workbook)
-        st.subheader("Excel Assignment 2 Results")
-        display_results(checklist_data)
-    except Exception as e:
-        st.error(f"An error occurred with Excel Assignment 2: {str(e)}")
+    # Ingest every upload and queue it on the shared pool. Each file gets its
+    # own slot on the page, filled in as soon as its result is ready.
+    pool = grading_pool()
+    jobs = {}
+    for name, files in uploads.items():
+        title = ASSIGNMENTS[name]["title"]
+        for index, file in enumerate(files or []):
+            slot = st.container()
+            trace = Trace(name, file.name)
+            try:
+                # Spool, hash and size-check the upload before any parser opens it
+                with tracing(trace, log=False):
+                    with stage("ingest"):
+                        submission = ingest(file)
+                with submission:
+                    trace.digest = submission.digest
+                    job = pool.submit(name, submission, file.name)
+                jobs.setdefault(job, []).append((slot, title, trace, submission.warnings, f"{name}-{index}"))
+            except Exception as e:
+                slot.error(f"An error occurred with {title} ({file.name}): {str(e)}")
 
-if excel_3_file:
-    try:
-        workbook = load_workbook(excel_3_file)
-        checklist_data = check_excel_3(workbook)
-        st.subheader("Excel Assignment 3 Results")
-        display_results(checklist_data)
-    except Exception as e:
-        st.error(f"An error occurred with Excel Assignment 3: {str(e)}")
+    if export is not None:
+        # Members stream out of the zip on a reader thread while earlier ones are queued
+        for index, (member, submission, error) in enumerate(read_export(export)):
+            slot = st.container()
+            if member is None:
+                slot.error(f"Could not read {export.name}: {str(error)}")
+                break
+            if error is not None:
+                slot.error(f"An error occurred with {member.original} ({member.student}): {str(error)}")
+                continue
+            with submission:
+                name = detect_assignment(submission.file)
+                if name is None:
+                    slot.error(f"Could not tell which assignment {member.original} ({member.student}) is for.")
+                    continue
+                title = f"{member.student}: {ASSIGNMENTS[name]['title']}"
+                trace = Trace(name, member.original)
+                trace.digest = submission.digest
+                job = pool.submit(name, submission, member.original)
+            jobs.setdefault(job, []).append((slot, title, trace, submission.warnings, f"export-{index}"))
 
-if excel_final_file:
-    try:
-        workbook = load_workbook(excel_final_file)
-        checklist_data = check_excel_final(workbook)  # Pass workbook directly
-        st.subheader("Excel Final Assignment Results")
-        display_results(checklist_data)
-    except Exception as e:
-        st.error(f"An error occurred with Excel Final Assignment: {str(e)}")
+    # Show results as they finish; a rerun while this waits picks the same jobs back up
+    if jobs:
+        total = sum(len(waiting) for waiting in jobs.values())
+        progress = st.progress(0.0, text=f"Grading {total} submission(s)...")
+        done = 0
+        for job in as_completed(jobs):
+            for slot, title, trace, warnings, key in jobs[job]:
+                with slot:
+                    try:
+                        checklist_data, worker_trace = job.result()
+                        trace.merge(worker_trace)
+                        show_result(title, trace, warnings, checklist_data, key)
+                    except Exception as e:
+                        st.error(f"An error occurred with {title} ({trace.submission}): {str(e)}")
+                done += 1
+                progress.progress(done / total, text=f"Graded {done} of {total} submission(s)")
 
-# Word Checker
-if word_1_file:
-    try:
-        doc = Document(word_1_file)
-        from checkers.word.word_1 import check_word_1
-        checklist_data = check_word_1(doc)
-        st.subheader("Word Assignment 1 Results")
-        display_results(checklist_data)
-    except Exception as e:
-        st.error(f"An error occurred with Word Assignment 1: {str(e)}")
 
-# PowerPoint Checker
-if ppt_1_file:
-    try:
-        prs = Presentation(ppt_1_file)
-        from checkers.powerpoint.ppt_1 import check_ppt_1
-        checklist_data = check_ppt_1(prs)
-        st.subheader("PowerPoint Assignment 1 Results")
-        display_results(checklist_data)
-    except Exception as e:
-        st.error(f"An error occurred with PowerPoint Assignment 1: {str(e)}")
+# Worker processes are spawned and re-import this script as __mp_main__;
+# the guard keeps them from building the page
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Synthetic submissions for every assignment, at configurable sizes.
+
+Each generator writes a valid file that passes (or nearly passes) its
+checker, padded with the kinds of extra content students add: more rows,
+extra sheets, longer papers, more slides and embedded media.
+"""
+import io
+import os
+
+from openpyxl import Workbook
+from openpyxl.chart import BarChart, PieChart, Reference
+from openpyxl.drawing.fill import GradientFillProperties, GradientStop
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
+HEADER_FILL = PatternFill("solid", fgColor="FFD966")
+BAND_FILL = PatternFill("solid", fgColor="D9EAD3")
+THIN = Side(style="thin")
+CENTER = Alignment(horizontal="center")
+
+
+def _add_extra_sheets(workbook, extra_sheets, extra_rows):
+    for index in range(extra_sheets):
+        sheet = workbook.create_sheet(f"Data {index + 1}")
+        for row in range(extra_rows):
+            sheet.append([row, row * 2.5, f"value {row}", row % 7])
+
+
+def _add_link_row(sheet, row, last_column):
+    sheet.cell(row=row, column=1, value="https://chat.openai.com/share/example")
+    sheet.merge_cells(start_row=row, start_column=1, end_row=row, end_column=last_column)
+    sheet.cell(row=row, column=1).alignment = CENTER
+    sheet.cell(row=row, column=1).fill = HEADER_FILL
+
+
+def make_excel_1(path, extra_sheets=0, extra_rows=0):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["ID", "First Name", "Last Name", "Date of Birth", "Hometown", "Occupation", "Hobby"])
+    for index in range(10):
+        sheet.append([index + 1, "Ada", "Lovelace", "1990-01-01", "London", "Analyst", "Chess"])
+    for cell in sheet[1]:
+        cell.font = Font(bold=True)
+        cell.fill = HEADER_FILL
+    for row in range(2, 12, 2):
+        sheet.cell(row=row, column=1).fill = BAND_FILL
+    _add_link_row(sheet, 13, 7)
+    _add_extra_sheets(workbook, extra_sheets, extra_rows)
+    workbook.save(path)
+
+
+def make_excel_2(path, extra_sheets=0, extra_rows=0):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Alumni"
+    sheet.append(["ID", "First Name", "Last Name", "Bachelor's Degree", "Current Profession",
+                  "Graduation Year", "Experience", "Salary", "Income Earned"])
+    for index in range(31):
+        row = index + 2
+        sheet.append([1001 + index, "Grace", "Hopper", "BS", "Engineer", 2010 + index % 10,
+                      f"=2024-F{row}", 50000 + index * 1000, f"=G{row}*H{row}"])
+        sheet.cell(row=row, column=9).number_format = '_($* #,##0_);_($* (#,##0);_($* "-"??_);_(@_)'
+        for column in (1, 6, 7, 8):
+            sheet.cell(row=row, column=column).alignment = CENTER
+        if index % 2:
+            sheet.cell(row=row, column=7).fill = BAND_FILL
+    for coordinate, formula in (("H33", "=SUM(H2:H32)"), ("H34", "=AVERAGE(H2:H32)"),
+                                ("I33", "=SUM(I2:I32)"), ("I34", "=AVERAGE(I2:I32)")):
+        sheet[coordinate] = formula
+        sheet[coordinate].font = Font(bold=True)
+    for cell in sheet[1]:
+        cell.font = Font(bold=True)
+    for cells in sheet.iter_rows(min_row=1, max_row=32, max_col=9):
+        for cell in cells:
+            cell.border = Border(left=THIN, right=THIN, top=THIN, bottom=THIN)
+    _add_link_row(sheet, 35, 9)
+    _add_extra_sheets(workbook, extra_sheets, extra_rows)
+    workbook.save(path)
+
+
+def make_excel_3(path, extra_sheets=0, extra_rows=0):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Countries"
+    sheet.append(["Country", "Continent", "Population", "GDP per Capita"])
+    for index in range(20):
+        sheet.append([f"Country {index}", "Asia" if index < 10 else "Europe", 1000000 - index * 1000, 5000 + index])
+    for row in range(12, 22):
+        sheet.cell(row=row, column=1).fill = BAND_FILL
+    sheet["C22"], sheet["D22"] = "=SUM(C2:C21)", "=SUM(D2:D21)"
+    sheet["C23"], sheet["D23"] = "=AVERAGE(C2:C21)", "=AVERAGE(D2:D21)"
+
+    population = BarChart()
+    population.title = "Population of the 20 sample countries"
+    population.add_data(Reference(sheet, min_col=3, min_row=1, max_row=21), titles_from_data=True)
+    sheet.add_chart(population, "G2")
+    gdp = BarChart()
+    gdp.title = "GDP per Capita"
+    gdp.add_data(Reference(sheet, min_col=4, min_row=1, max_row=21), titles_from_data=True)
+    gdp.series[0].graphicalProperties.gradFill = GradientFillProperties(
+        gsLst=[GradientStop(pos=0, prstClr="white"), GradientStop(pos=100000, prstClr="blue")])
+    sheet.add_chart(gdp, "G20")
+
+    _add_link_row(sheet, 26, 5)
+    _add_extra_sheets(workbook, extra_sheets, extra_rows)
+    workbook.save(path)
+
+
+def make_excel_final(path, extra_sheets=0, extra_rows=0):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Workplace Productivity"
+    sheet.append(["Employee ID", "Department", "Digital Skills Score (1-10)", "Productivity Rating (1-5)",
+                  "Hours of Training Completed", "Use of Productivity Software (hours/week)",
+                  "Reported Weekly Output (Tasks Completed)", "Years at Company", "Age",
+                  "Remote Work Percentage (%)", "Training Requirements"])
+    for cell in sheet[1]:
+        cell.font = Font(bold=True)
+        cell.alignment = CENTER
+    for index in range(15):
+        sheet.append([index + 1, ["IT", "HR", "Sales"][index % 3], 5 + index % 5, 1 + index % 5, 10 + index,
+                      20 + index % 4, 30 + index, 1 + index % 9, 25 + index, 10 * (index % 10), "High"])
+        sheet.cell(row=index + 2, column=11).fill = BAND_FILL
+    sheet["A17"] = "Company Averages"
+    sheet.merge_cells("A17:B17")
+    for column in "CDEFGHIJ":
+        sheet[f"{column}17"] = f"=AVERAGE({column}2:{column}16)"
+
+    skills = BarChart()
+    skills.title = "Digital Skills Scores by Department"
+    skills.add_data(Reference(sheet, min_col=3, min_row=1, max_row=16), titles_from_data=True)
+    sheet.add_chart(skills, "M2")
+    training = BarChart()
+    training.title = "Hours of Training Completed and Reported Weekly Output"
+    training.add_data(Reference(sheet, min_col=5, max_col=7, min_row=1, max_row=16), titles_from_data=True)
+    sheet.add_chart(training, "M20")
+
+    departments = workbook.create_sheet("Department Distribution")
+    departments.append(["Department", "Number of Employees"])
+    for name, count in (("IT", 5), ("HR", 5), ("Sales", 5)):
+        departments.append([name, count])
+    pie = PieChart()
+    pie.title = "Department Distribution"
+    pie.add_data(Reference(departments, min_col=2, min_row=1, max_row=4), titles_from_data=True)
+    departments.add_chart(pie, "D2")
+
+    _add_extra_sheets(workbook, extra_sheets, extra_rows)
+    workbook.save(path)
+
+
+def _png(size):
+    """A solid PNG roughly `size` pixels square."""
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size), "steelblue").save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def make_word_1(path, paragraphs=4, images=0):
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Inches, Pt
+
+    doc = Document()
+    normal = doc.styles["Normal"]
+    normal.font.name = "Times New Roman"
+    normal.font.size = Pt(12)
+    normal.paragraph_format.line_spacing = 2.0
+    for section in doc.sections:
+        section.left_margin = section.right_margin = Inches(1)
+        section.top_margin = section.bottom_margin = Inches(1)
+
+    doc.add_paragraph("The Impact of Digital Literacy").alignment = WD_ALIGN_PARAGRAPH.CENTER
+    body = ("Digital literacy shapes how students research, write and collaborate, and "
+            "instructors increasingly expect fluency with office software (Smith, 2020). ")
+    for index in range(paragraphs):
+        doc.add_paragraph(body * 3)
+        if index < images:
+            doc.add_picture(_png(400), width=Inches(3))
+    doc.add_paragraph("References")
+    doc.add_paragraph("Smith, J. (2020). Digital skills in higher education. Academic Press.")
+    doc.save(path)
+
+
+FADE_TRANSITION = '<p:transition xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"><p:fade/></p:transition>'
+
+
+def make_ppt_1(path, slides=6, images=2, media_bytes=0):
+    from lxml import etree
+    from pptx import Presentation
+    from pptx.chart.data import CategoryChartData
+    from pptx.enum.chart import XL_CHART_TYPE
+    from pptx.util import Inches
+
+    prs = Presentation()
+    title = prs.slides.add_slide(prs.slide_layouts[0])
+    title.shapes.title.text = "Digital Literacy"
+    title.placeholders[1].text = "Student Name"
+
+    for index in range(max(slides - 2, 0)):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Topic {index + 1}"
+        frame = slide.placeholders[1].text_frame
+        frame.text = "Main point"
+        detail = frame.add_paragraph()
+        detail.text = "Supporting detail"
+        detail.level = 1
+        if index < images:
+            slide.shapes.add_picture(_png(400), Inches(5), Inches(2), width=Inches(3))
+        if index == 0:
+            data = CategoryChartData()
+            data.categories = ["2022", "2023", "2024"]
+            data.add_series("Students", (120, 150, 180))
+            slide.shapes.add_chart(XL_CHART_TYPE.COLUMN_CLUSTERED, Inches(1), Inches(4),
+                                   Inches(4), Inches(3), data)
+        if index == 1 and media_bytes:
+            slide.shapes.add_movie(io.BytesIO(os.urandom(media_bytes)), Inches(1), Inches(1),
+                                   Inches(3), Inches(2), poster_frame_image=_png(64), mime_type="video/mp4")
+
+    closing = prs.slides.add_slide(prs.slide_layouts[1])
+    closing.shapes.title.text = "Conclusion"
+    closing.placeholders[1].text = "Thank you"
+    for slide in prs.slides:
+        slide.element.append(etree.fromstring(FADE_TRANSITION))
+    prs.save(path)
+
+
+# Generator and file extension for each assignment in the registry
+GENERATORS = {
+    "excel_1": (make_excel_1, "xlsx"),
+    "excel_2": (make_excel_2, "xlsx"),
+    "excel_3": (make_excel_3, "xlsx"),
+    "excel_final": (make_excel_final, "xlsx"),
+    "word_1": (make_word_1, "docx"),
+    "ppt_1": (make_ppt_1, "pptx"),
+}
+
+# Named size presets: keyword arguments for each generator
+SIZES = {
+    "small": {
+        "xlsx": {},
+        "docx": {"paragraphs": 4},
+        "pptx": {"slides": 6},
+    },
+    "large": {
+        "xlsx": {"extra_sheets": 3, "extra_rows": 30000},
+        "docx": {"paragraphs": 300, "images": 10},
+        "pptx": {"slides": 60, "images": 30, "media_bytes": 20 * 1024 * 1024},
+    },
+}
+
+
+def generate(assignment, path, size="small", **overrides):
+    """Write a synthetic submission for an assignment at a preset size."""
+    generator, extension = GENERATORS[assignment]
+    options = dict(SIZES[size][extension], **overrides)
+    generator(path, **options)
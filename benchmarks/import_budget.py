@@ -0,0 +1,71 @@
+"""Measure what starting the app imports, and how long that takes.
+
+Runs `import app` in a fresh interpreter under `python -X importtime` and
+fails if the total exceeds the budget or if a parsing library that should
+only load on first use (see checkers.registry.get_checker) was imported.
+
+    python -m benchmarks.import_budget --budget-ms 1000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Loaded lazily by the checkers and the registry, never at startup
+DEFERRED = ("pandas", "numpy", "openpyxl", "docx", "pptx", "PIL", "lxml")
+
+DEFAULT_BUDGET_MS = 1000
+
+
+def measure(module="app", repeat=3):
+    """Return (best total ms, {top-level package: self ms}) for importing a module."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=root, capture_output=True, text=True, check=True,
+        )
+        packages = defaultdict(int)
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, _, name = line[len("import time:"):].split("|")
+            packages[name.strip().split(".")[0]] += int(self_us)
+        total = sum(packages.values())
+        if best is None or total < best[0]:
+            best = (total, packages)
+    total, packages = best
+    return total / 1000, {name: us / 1000 for name, us in packages.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the app's cold-start import budget.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=10, help="slowest packages to report")
+    args = parser.parse_args(argv)
+
+    total_ms, packages = measure(args.module)
+    deferred = sorted(name for name in DEFERRED if name in packages)
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    json.dump({
+        "module": args.module,
+        "total_ms": round(total_ms, 1),
+        "budget_ms": args.budget_ms,
+        "slowest": {name: round(ms, 1) for name, ms in slowest},
+        "deferred_imported": deferred,
+    }, sys.stdout, indent=2)
+    print()
+
+    if deferred:
+        print(f"Imported at startup but should load on first use: {', '.join(deferred)}", file=sys.stderr)
+    if total_ms > args.budget_ms:
+        print(f"Startup imports took {total_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget", file=sys.stderr)
+    return 1 if deferred or total_ms > args.budget_ms else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
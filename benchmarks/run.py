@@ -0,0 +1,143 @@
+"""Benchmark every checker on synthetic submissions.
+
+Each case runs in a fresh process so its peak RSS is its own. The parse
+stage is load_submission (opening the workbook, document or deck) and the
+check stage is the checker itself; wall time covers both plus ingestion.
+
+    python -m benchmarks.run --size small large -o results.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from benchmarks.generators import GENERATORS, SIZES, generate
+from checkers.registry import ASSIGNMENTS, XLSX_BACKENDS, get_checker, load_submission
+from utils.ingest import ingest
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_kb():
+    """Peak resident set size of this process in KiB, or None if unknown."""
+    # Linux carries ru_maxrss over from the parent through exec, so prefer
+    # the high-water mark of this process's own address space
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _run_case(assignment, path, backend, repeat):
+    """Grade one file `repeat` times in this process and time each stage."""
+    checker = get_checker(assignment)
+    extension = ASSIGNMENTS[assignment]["extension"]
+    baseline_rss = _peak_rss_kb()
+
+    walls, parses, checks = [], [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with ingest(path) as submission:
+            parse_start = time.perf_counter()
+            loaded = load_submission(assignment, submission.file, backend if extension == "xlsx" else None)
+            check_start = time.perf_counter()
+            try:
+                checker(loaded)
+            finally:
+                check_end = time.perf_counter()
+                if hasattr(loaded, "close"):
+                    loaded.close()
+        walls.append(time.perf_counter() - start)
+        parses.append(check_start - parse_start)
+        checks.append(check_end - check_start)
+
+    return {
+        "wall_s": statistics.median(walls),
+        "parse_s": statistics.median(parses),
+        "check_s": statistics.median(checks),
+        "wall_min_s": min(walls),
+        "peak_rss_kb": _peak_rss_kb(),
+        "baseline_rss_kb": baseline_rss,
+    }
+
+
+def run_case(assignment, path, backend=None, repeat=3):
+    """Run a case in a new process and return its timings."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(_run_case, assignment, path, backend, repeat).result()
+
+
+def run(assignments, sizes, backends, repeat=3, workdir=None):
+    """Generate and benchmark every (assignment, size, backend) case."""
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as folder:
+        for size in sizes:
+            for assignment in assignments:
+                extension = GENERATORS[assignment][1]
+                path = os.path.join(folder, f"{assignment}-{size}.{extension}")
+                generate(assignment, path, size)
+                for backend in (backends if extension == "xlsx" else [None]):
+                    timings = run_case(assignment, path, backend, repeat)
+                    results.append({
+                        "assignment": assignment,
+                        "checker": ASSIGNMENTS[assignment]["checker"],
+                        "size": size,
+                        "backend": backend,
+                        "file_bytes": os.path.getsize(path),
+                        "repeat": repeat,
+                        **timings,
+                    })
+                    print(
+                        f"{assignment:<12} {size:<6} {backend or '-':<9} "
+                        f"wall {timings['wall_s'] * 1000:8.1f} ms  "
+                        f"parse {timings['parse_s'] * 1000:8.1f} ms  "
+                        f"check {timings['check_s'] * 1000:8.1f} ms  "
+                        f"rss {timings['peak_rss_kb'] or 0:>8} KiB",
+                        file=sys.stderr,
+                    )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the checkers on synthetic submissions.")
+    parser.add_argument("--assignment", nargs="+", choices=sorted(GENERATORS), default=list(GENERATORS))
+    parser.add_argument("--size", nargs="+", choices=sorted(SIZES), default=["small"])
+    parser.add_argument("--backend", nargs="+", choices=XLSX_BACKENDS, default=list(XLSX_BACKENDS),
+                        help="xlsx backends to compare")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the median is reported")
+    parser.add_argument("-o", "--output", help="write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": run(args.assignment, args.size, args.backend, args.repeat),
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import math
+
+from checkers.excel.evaluator import FormulaError, formula_evaluator
+
+# How far a cached total or average may drift from the recomputed one, so a
+# ROUND(...) to cents still counts as correct
+ABSOLUTE_TOLERANCE = 0.01
+RELATIVE_TOLERANCE = 1e-6
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def column_numbers(sheet, column, first_row, last_row):
+    """The numeric values Excel shows in a column range, formulas included."""
+    values = (sheet.cached_value(row, column) for row in range(first_row, last_row + 1))
+    return [value for value in values if _is_number(value)]
+
+
+def expected_aggregate(sheet, function, column, first_row, last_row):
+    """SUM or AVERAGE of a column range, or None when it has no numbers."""
+    numbers = column_numbers(sheet, column, first_row, last_row)
+    if not numbers:
+        return None
+    if function == "SUM":
+        return math.fsum(numbers)
+    if function == "AVERAGE":
+        return math.fsum(numbers) / len(numbers)
+    raise ValueError(f"Unsupported function: {function}")
+
+
+def aggregate_matches(sheet, row, column, function, first_row, last_row):
+    """Check the value in (row, column) against the recomputed aggregate.
+
+    `sheet` is a bounded or XML sheet, a StyleSnapshot or a rubric SheetView
+    (anything with cached_value(row, column)), or a fully loaded openpyxl
+    sheet. The value is the result cached in the file; when the file holds
+    none (e.g. it was written by a library rather than saved by a
+    spreadsheet app) the formulas are computed instead, see
+    checkers.excel.evaluator. Returns True or False, or None when neither
+    way gives a value to check.
+    """
+    actual = sheet.cached_value(row, column) if hasattr(sheet, "cached_value") else None
+    if actual is None:
+        return _evaluated_aggregate_matches(sheet, row, column, function, first_row, last_row)
+    expected = expected_aggregate(sheet, function, column, first_row, last_row)
+    if expected is None:
+        return None
+    if not _is_number(actual):
+        return False
+    return math.isclose(actual, expected, rel_tol=RELATIVE_TOLERANCE, abs_tol=ABSOLUTE_TOLERANCE)
+
+
+def _evaluated_aggregate_matches(sheet, row, column, function, first_row, last_row):
+    """aggregate_matches for a file without cached results: compute both sides from the formulas."""
+    evaluator = formula_evaluator(sheet)
+    try:
+        actual = evaluator.value(row, column)
+        numbers = evaluator.range_numbers(first_row, column, last_row, column)
+    except FormulaError:
+        return None
+    if not numbers.size:
+        return None
+    expected = math.fsum(numbers.tolist())
+    if function == "AVERAGE":
+        expected /= numbers.size
+    elif function != "SUM":
+        raise ValueError(f"Unsupported function: {function}")
+    return math.isclose(actual, expected, rel_tol=RELATIVE_TOLERANCE, abs_tol=ABSOLUTE_TOLERANCE)
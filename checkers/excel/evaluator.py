@@ -0,0 +1,445 @@
+"""A small formula evaluator, for files that carry no cached results.
+
+Spreadsheet apps save each formula's result next to it; files written by
+libraries (openpyxl, pandas, some LMS converters) do not, so a total or
+average can only be checked by computing it. SheetEvaluator covers what the
+assignments use: numbers, + - * / ^, unary minus, %, cell and range
+references on the same sheet, and SUM, AVERAGE, COUNT, MIN, MAX and ROUND.
+Anything else raises FormulaError, and the caller treats the cell as
+unverifiable rather than wrong.
+
+Cells are read once into NumPy arrays of kinds and numbers, so a range is
+an array slice. Each formula cell is evaluated at most once and its result
+stored in those arrays, which settles dependency chains (I33 = SUM(I2:I32),
+I2 = G2*H2, G2 = 2024-F2) in one pass. A filled-down block of the same
+formula (see checkers.excel.formulas) is evaluated for all its rows at once
+when it only does arithmetic on single cells.
+"""
+import numpy as np
+from openpyxl.formula.tokenizer import Token
+
+from checkers.excel.formulas import Reference, analyse
+
+# What a grid cell holds
+EMPTY, NUMBER, OTHER, ERROR, PENDING, ACTIVE, OUTSIDE = range(7)
+
+_INFIX = {"+": 1, "-": 1, "*": 2, "/": 2, "^": 3}
+_ELEMENTWISE_CALLS = {"ROUND"}
+
+
+class FormulaError(Exception):
+    """A formula that can't be computed here: unsupported, an Excel error, or
+    reading cells outside what was extracted."""
+
+
+class _Fallback(Exception):
+    """A block of rows must be evaluated one cell at a time after all."""
+
+
+class _Range:
+    """The cells a reference reads: their kinds and numbers, flattened."""
+
+    __slots__ = ("kinds", "numbers")
+
+    def __init__(self, kinds, numbers):
+        self.kinds = kinds.ravel()
+        self.numbers = numbers.ravel()
+
+
+class _Parser:
+    """Builds an expression tree from a formula's tokens (see FormulaAnalysis.tokens)."""
+
+    def __init__(self, tokens):
+        self.tokens = [token for token in tokens if token[1] != Token.WSPACE]
+        self.position = 0
+
+    def parse(self):
+        node = self.expression()
+        if self.position != len(self.tokens):
+            raise FormulaError(f"Unexpected {self.tokens[self.position][0]!r}")
+        return node
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None, None)
+
+    def _next(self):
+        token = self._peek()
+        if token[1] is None:
+            raise FormulaError("Formula ends unexpectedly")
+        self.position += 1
+        return token
+
+    def expression(self, min_precedence=1):
+        node = self.unary()
+        while True:
+            value, kind, _ = self._peek()
+            if kind != Token.OP_IN or value not in _INFIX or _INFIX[value] < min_precedence:
+                if kind == Token.OP_IN and value not in _INFIX:
+                    raise FormulaError(f"Unsupported operator {value!r}")
+                return node
+            self.position += 1
+            # Excel's operators, ^ included, all group left to right
+            node = ("op", value, node, self.expression(_INFIX[value] + 1))
+
+    def unary(self):
+        value, kind, subtype = self._next()
+        if kind == Token.OP_PRE:
+            operand = self.unary()
+            return ("neg", operand) if value == "-" else operand
+        node = self.primary(value, kind, subtype)
+        while self._peek()[1] == Token.OP_POST:
+            self.position += 1
+            node = ("percent", node)
+        return node
+
+    def primary(self, value, kind, subtype):
+        if kind == Token.OPERAND and subtype == Token.NUMBER:
+            return ("number", float(value))
+        if kind == Token.OPERAND and subtype == Token.RANGE and isinstance(value, Reference):
+            if value.sheet is not None or not value.corners:
+                raise FormulaError("Only references to cells on the same sheet are supported")
+            return ("ref", value)
+        if kind == Token.FUNC and subtype == Token.OPEN:
+            name = value[:-1].upper()
+            if name not in FUNCTIONS:
+                raise FormulaError(f"Unsupported function {name}")
+            arguments = []
+            if self._peek()[1:] == (Token.FUNC, Token.CLOSE):
+                self.position += 1
+                return ("call", name, arguments)
+            while True:
+                arguments.append(self.expression())
+                value, kind, subtype = self._next()
+                if kind == Token.FUNC and subtype == Token.CLOSE:
+                    return ("call", name, arguments)
+                if kind != Token.SEP or subtype != Token.ARG:
+                    raise FormulaError(f"Unexpected {value!r} in {name}()")
+        if kind == Token.PAREN and subtype == Token.OPEN:
+            node = self.expression()
+            if self._next()[1:] != (Token.PAREN, Token.CLOSE):
+                raise FormulaError("Unbalanced parentheses")
+            return node
+        raise FormulaError(f"Unsupported operand {value!r}")
+
+
+def _is_elementwise(node):
+    """True if the tree only does arithmetic on single cells, so it can run over many rows at once."""
+    tag = node[0]
+    if tag == "number":
+        return True
+    if tag == "ref":
+        return len(node[1].corners) == 1
+    if tag in ("neg", "percent"):
+        return _is_elementwise(node[1])
+    if tag == "op":
+        return _is_elementwise(node[2]) and _is_elementwise(node[3])
+    return node[1] in _ELEMENTWISE_CALLS and all(_is_elementwise(argument) for argument in node[2])
+
+
+# Compiled trees by R1C1 formula shape, shared like the analyses they come from
+_programs = {}
+
+
+def _program(formula, row, column):
+    """(tree, elementwise) for a formula, or the FormulaError it can't get past."""
+    analysis = analyse(formula, row, column)
+    program = _programs.get(analysis.r1c1)
+    if program is None:
+        if analysis.error is not None:
+            program = FormulaError(analysis.error)
+        else:
+            try:
+                tree = _Parser(analysis.tokens).parse()
+                program = (tree, _is_elementwise(tree))
+            except FormulaError as e:
+                program = e
+        _programs[analysis.r1c1] = program
+    if isinstance(program, FormulaError):
+        raise program
+    return program
+
+
+def _numbers(arguments):
+    """The numbers SUM and friends see: numeric cells of ranges, plus plain values."""
+    parts = []
+    for argument in arguments:
+        if isinstance(argument, _Range):
+            if (argument.kinds == ERROR).any():
+                raise FormulaError("A referenced cell has an error")
+            parts.append(argument.numbers[argument.kinds == NUMBER])
+        else:
+            parts.append(np.atleast_1d(argument))
+    return np.concatenate(parts) if parts else np.zeros(0)
+
+
+def _average(arguments):
+    numbers = _numbers(arguments)
+    if not numbers.size:
+        raise FormulaError("#DIV/0!")
+    return float(numbers.mean())
+
+
+def _extreme(function, arguments):
+    # MIN and MAX of nothing are 0 in Excel
+    numbers = _numbers(arguments)
+    return float(function(numbers)) if numbers.size else 0.0
+
+
+def _round(arguments):
+    if len(arguments) != 2:
+        raise FormulaError("ROUND takes two arguments")
+    value, digits = arguments
+    scale = 10.0 ** np.trunc(digits)
+    # Excel rounds halves away from zero
+    return np.sign(value) * np.floor(np.abs(value) * scale + 0.5) / scale
+
+
+FUNCTIONS = {
+    "SUM": lambda arguments: float(_numbers(arguments).sum()),
+    "AVERAGE": _average,
+    "COUNT": lambda arguments: float(_numbers(arguments).size),
+    "MIN": lambda arguments: _extreme(np.min, arguments),
+    "MAX": lambda arguments: _extreme(np.max, arguments),
+    "ROUND": _round,
+}
+
+
+def _arithmetic(operator, left, right):
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if operator == "+":
+            return left + right
+        if operator == "-":
+            return left - right
+        if operator == "*":
+            return left * right
+        if operator == "/":
+            if np.any(right == 0):
+                raise FormulaError("#DIV/0!")
+            return left / right
+        return np.power(left, right)
+
+
+class SheetEvaluator:
+    """Evaluates the formulas of one sheet from its cell values.
+
+    `read(row, column)` returns a cell's (value, data_type). Cells outside
+    min/max row and column (when given) count as unreadable, so a formula
+    that needs them raises FormulaError instead of reading them as blank.
+    """
+
+    def __init__(self, read, min_row=1, min_column=1, max_row=None, max_column=None):
+        self._read = read
+        self._limits = (min_row, min_column, max_row, max_column)
+        self._formulas = {}
+        self._errors = {}
+        # Indexed by [row, column]; row and column 0 are never used
+        self.kinds = np.full((1, 1), OUTSIDE, dtype=np.int8)
+        self.numbers = np.full((1, 1), np.nan)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        return cls(lambda row, column: (snapshot.value(row, column), snapshot.data_type(row, column)),
+                   snapshot.min_row, snapshot.min_column, snapshot.max_row, snapshot.max_column)
+
+    @classmethod
+    def from_sheet(cls, sheet):
+        def read(row, column):
+            cell = sheet.cell(row=row, column=column)
+            return cell.value, cell.data_type
+        return cls(read)
+
+    def _load(self, max_row, max_column):
+        """Read cells up to (max_row, max_column) that haven't been read yet."""
+        rows, columns = self.kinds.shape
+        if max_row < rows and max_column < columns:
+            return
+        new_rows, new_columns = max(rows, max_row + 1), max(columns, max_column + 1)
+        kinds = np.full((new_rows, new_columns), OUTSIDE, dtype=np.int8)
+        numbers = np.full((new_rows, new_columns), np.nan)
+        kinds[:rows, :columns] = self.kinds
+        numbers[:rows, :columns] = self.numbers
+
+        min_row, min_column, limit_row, limit_column = self._limits
+        last_row = min(new_rows - 1, limit_row or new_rows - 1)
+        last_column = min(new_columns - 1, limit_column or new_columns - 1)
+        for row in range(min_row, last_row + 1):
+            for column in range(min_column, last_column + 1):
+                if row < rows and column < columns:
+                    continue
+                value, data_type = self._read(row, column)
+                if data_type == "f" and isinstance(value, str):
+                    kinds[row, column] = PENDING
+                    self._formulas[row, column] = value if value.startswith("=") else f"={value}"
+                elif value is None:
+                    kinds[row, column] = EMPTY
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    kinds[row, column] = NUMBER
+                    numbers[row, column] = value
+                else:
+                    kinds[row, column] = OTHER
+        self.kinds, self.numbers = kinds, numbers
+
+    def value(self, row, column):
+        """The number in a cell, computing its formula if it has one.
+
+        Raises FormulaError when the cell holds text, an error or a formula
+        that can't be computed.
+        """
+        self._load(row, column)
+        if self.kinds[row, column] == PENDING:
+            self._evaluate_cell(row, column)
+        kind = self.kinds[row, column]
+        if kind == NUMBER:
+            return float(self.numbers[row, column])
+        if kind == EMPTY:
+            return 0.0
+        raise FormulaError(self._errors.get((row, column), f"Cell ({row}, {column}) does not hold a number"))
+
+    def range_numbers(self, min_row, min_column, max_row, max_column):
+        """The numbers in a block of cells, formulas computed, as a flat array (text and blanks skipped)."""
+        block = _Range(*self._block(min_row, min_column, max_row, max_column))
+        return _numbers([block])
+
+    def _block(self, min_row, min_column, max_row, max_column):
+        """(kinds, numbers) views of a block, with its formulas evaluated."""
+        if min_row < 1 or min_column < 1:
+            raise FormulaError("Reference outside the sheet")
+        self._load(max_row, max_column)
+        kinds = self.kinds[min_row:max_row + 1, min_column:max_column + 1]
+        if (kinds == PENDING).any():
+            self._evaluate_block(min_row, min_column, kinds)
+            # Evaluating may have read more cells and so replaced the arrays
+            kinds = self.kinds[min_row:max_row + 1, min_column:max_column + 1]
+        if (kinds == OUTSIDE).any():
+            raise FormulaError("Reference outside the cells that were read")
+        if (kinds == ACTIVE).any():
+            raise FormulaError("Circular reference")
+        return kinds, self.numbers[min_row:max_row + 1, min_column:max_column + 1]
+
+    def _evaluate_block(self, min_row, min_column, kinds):
+        rows, columns = np.nonzero(kinds == PENDING)
+        groups = {}
+        for row, column in zip((rows + min_row).tolist(), (columns + min_column).tolist()):
+            if self.kinds[row, column] != PENDING:
+                # Filled in while evaluating an earlier group
+                continue
+            try:
+                tree, elementwise = _program(self._formulas[row, column], row, column)
+            except FormulaError as e:
+                self._fail(row, column, e)
+                continue
+            if elementwise:
+                groups.setdefault((column, id(tree)), (tree, []))[1].append(row)
+            else:
+                self._evaluate_cell(row, column)
+        for (column, _), (tree, group) in groups.items():
+            group = np.array([row for row in group if self.kinds[row, column] == PENDING])
+            if len(group) > 1:
+                try:
+                    self._evaluate_rows(tree, group, column)
+                    continue
+                except _Fallback:
+                    pass
+            for row in group.tolist():
+                if self.kinds[row, column] == PENDING:
+                    self._evaluate_cell(row, column)
+
+    def _fail(self, row, column, error):
+        self.kinds[row, column] = ERROR
+        self._errors[row, column] = str(error)
+
+    def _evaluate_cell(self, row, column):
+        self.kinds[row, column] = ACTIVE
+        try:
+            tree, _ = _program(self._formulas[row, column], row, column)
+            result = self._scalar(self._evaluate(tree, row, column))
+        except FormulaError as e:
+            self._fail(row, column, e)
+        except RecursionError:
+            self._fail(row, column, "Formula chain is too deep")
+        else:
+            self.kinds[row, column] = NUMBER
+            self.numbers[row, column] = result
+
+    def _scalar(self, value):
+        if isinstance(value, _Range):
+            if value.kinds.size != 1:
+                raise FormulaError("#VALUE!")
+            kind = value.kinds[0]
+            if kind == EMPTY:
+                return 0.0
+            if kind != NUMBER:
+                raise FormulaError("#VALUE!")
+            return float(value.numbers[0])
+        value = float(value)
+        if not np.isfinite(value):
+            raise FormulaError("#NUM!")
+        return value
+
+    def _evaluate(self, node, row, column):
+        tag = node[0]
+        if tag == "number":
+            return node[1]
+        if tag == "ref":
+            min_row, min_column, max_row, max_column = node[1].bounds(row, column)
+            return _Range(*self._block(min_row, min_column, max_row, max_column))
+        if tag == "neg":
+            return -self._scalar(self._evaluate(node[1], row, column))
+        if tag == "percent":
+            return self._scalar(self._evaluate(node[1], row, column)) / 100
+        if tag == "op":
+            return _arithmetic(node[1], self._scalar(self._evaluate(node[2], row, column)),
+                               self._scalar(self._evaluate(node[3], row, column)))
+        arguments = [self._evaluate(argument, row, column) for argument in node[2]]
+        if node[1] in _ELEMENTWISE_CALLS:
+            arguments = [self._scalar(argument) for argument in arguments]
+        return FUNCTIONS[node[1]](arguments)
+
+    def _evaluate_rows(self, tree, rows, column):
+        """Evaluate one elementwise formula for many rows of a column at once."""
+        self.kinds[rows, column] = ACTIVE
+        try:
+            result = np.broadcast_to(self._evaluate_vector(tree, rows, column), rows.shape).astype(float)
+        except (_Fallback, FormulaError):
+            self.kinds[rows, column] = PENDING
+            raise _Fallback()
+        if not np.isfinite(result).all():
+            self.kinds[rows, column] = PENDING
+            raise _Fallback()
+        self.kinds[rows, column] = NUMBER
+        self.numbers[rows, column] = result
+
+    def _evaluate_vector(self, node, rows, column):
+        tag = node[0]
+        if tag == "number":
+            return node[1]
+        if tag == "ref":
+            (row_absolute, r), (column_absolute, c) = node[1].corners[0]
+            targets = np.full(rows.shape, r) if row_absolute else rows + r
+            target_column = c if column_absolute else column + c
+            self._block(int(targets.min()), target_column, int(targets.max()), target_column)
+            kinds = self.kinds[targets, target_column]
+            if not np.isin(kinds, (EMPTY, NUMBER)).all():
+                raise _Fallback()
+            return np.where(kinds == NUMBER, self.numbers[targets, target_column], 0.0)
+        if tag == "neg":
+            return -self._evaluate_vector(node[1], rows, column)
+        if tag == "percent":
+            return self._evaluate_vector(node[1], rows, column) / 100
+        if tag == "op":
+            return _arithmetic(node[1], self._evaluate_vector(node[2], rows, column),
+                               self._evaluate_vector(node[3], rows, column))
+        return FUNCTIONS[node[1]]([self._evaluate_vector(argument, rows, column) for argument in node[2]])
+
+
+def formula_evaluator(sheet):
+    """The SheetEvaluator for a snapshot, rubric SheetView or worksheet, built once and kept on it."""
+    source = getattr(sheet, "snapshot", sheet)
+    evaluator = getattr(source, "_formula_evaluator", None)
+    if evaluator is None:
+        if hasattr(source, "data_types"):
+            evaluator = SheetEvaluator.from_snapshot(source)
+        else:
+            evaluator = SheetEvaluator.from_sheet(source)
+        source._formula_evaluator = evaluator
+    return evaluator
@@ -1,115 +1,93 @@
-from openpyxl.styles import Alignment, Font, PatternFill
+from checkers.rubric import Criterion, Rubric
+from utils.ranges import sheet_ranges
 
-def check_excel_1(workbook):
-    sheet = workbook.active
-    checklist_data = {
-        "Grading Criteria": [
-            "Does the dataset have exactly 7 columns (A-G)?",
-            "Are there exactly 10 rows of data in the dataset?",
-            "Are the first 6 column headers named ID, First Name, Last Name, Date of Birth, Hometown, Occupation?",
-            "Does the 7th column have a meaningful header and consistent data?",
-            "Are styles applied (e.g., alternating row colors or banded table)?",
-            "Are the headers in row 1 bolded with a background color?",
-            "Are the columns properly aligned (text, dates, and numbers)?",
-            "Is the ChatGPT hyperlink centered in row 13?",
-            "Are cells A13:G13 merged in row 13?",
-            "Does row 13 have a background color and meaningful hyperlink text?"
-        ],
-        "Completed": []
-    }
-
-    # 1. Check if there are exactly 7 columns
-    num_columns = sheet.max_column
-    checklist_data["Completed"].append("Yes" if num_columns == 7 else "No")
-
-    # 2. Check if there are exactly 10 rows of data
-    data_rows = sum(1 for row in range(2, 12) if any(sheet.cell(row=row, column=col).value for col in range(1, 8)))
-    checklist_data["Completed"].append("Yes" if data_rows == 10 else "No")
-
-    # 3. Check first 6 column headers
+
+# 1. Check if there are exactly 7 columns
+def has_seven_columns(view):
+    return view.max_column == 7
+
+
+# 2. Check if there are exactly 10 rows of data
+def has_ten_rows(view):
+    data_rows = sum(1 for row in range(2, 12) if any(view.value(row, col) for col in range(1, 8)))
+    return data_rows == 10
+
+
+# 3. Check first 6 column headers
+def headers_match(view):
     expected_headers = ["ID", "First Name", "Last Name", "Date of Birth", "Hometown", "Occupation"]
-    headers = [sheet.cell(row=1, column=i).value for i in range(1, 7)]
-    headers_match = all(a == b for a, b in zip(headers, expected_headers))
-    checklist_data["Completed"].append("Yes" if headers_match else "No")
-
-    # 4. Check 7th column header and data
-    last_col_header = sheet.cell(row=1, column=7).value
-    last_col_has_data = all(sheet.cell(row=i, column=7).value for i in range(2, 12))
-    checklist_data["Completed"].append("Yes" if last_col_header and last_col_has_data else "No")
-
-    # 5. Check if styles are applied
-    has_styles = False
-    for row in range(2, 12):  # Check rows 2-11 for banded or alternate row styling
-        if (sheet.cell(row=row, column=1).fill.fill_type !=
-            sheet.cell(row=row-1, column=1).fill.fill_type):
-            has_styles = True
-            break
-    checklist_data["Completed"].append("Yes" if has_styles else "No")
-
-    # 6. Check if headers in row 1 are bold and have a background color
-    headers_bold = all(sheet.cell(row=1, column=col).font.bold for col in range(1, 8))
-    headers_colored = all(sheet.cell(row=1, column=col).fill.fill_type for col in range(1, 8))
-    checklist_data["Completed"].append("Yes" if headers_bold and headers_colored else "No")
-
-    # 7. Check if columns are properly aligned
-    correct_alignment = True
+    headers = [view.value(1, i) for i in range(1, 7)]
+    return all(a == b for a, b in zip(headers, expected_headers))
+
+
+# 4. Check 7th column header and data
+def last_column_filled(view):
+    last_col_header = view.value(1, 7)
+    last_col_has_data = all(view.value(i, 7) for i in range(2, 12))
+    return bool(last_col_header and last_col_has_data)
+
+
+# 5. Check if styles are applied (banded or alternating row styling in rows 2-11,
+# or the data formatted as an Excel table with banded rows)
+def has_row_styles(view):
+    table = sheet_ranges(view.sheet).tables.covering(2, 1)
+    if table is not None and table.value.tableStyleInfo is not None and table.value.tableStyleInfo.showRowStripes:
+        return True
+    return any(view.fill_type(row, 1) != view.fill_type(row - 1, 1) for row in range(2, 12))
+
+
+# 6. Check if headers in row 1 are bold and have a background color
+def headers_bold_and_colored(view):
+    headers_bold = all(view.bold(1, col) for col in range(1, 8))
+    headers_colored = all(view.fill_type(1, col) for col in range(1, 8))
+    return headers_bold and headers_colored
+
+
+# 7. Check if columns are properly aligned
+def columns_aligned(view):
     for row in range(2, 12):  # Data rows
         for col in range(1, 8):  # All 7 columns
-            cell = sheet.cell(row=row, column=col)
-            alignment = cell.alignment.horizontal
-            cell_value = cell.value
-            
-            # Define expected alignment based on column index
-            if col in [2, 3, 5, 6, 7]:  # Text columns
-                expected_alignment = "left"
-            elif col == 1:  # ID column
-                expected_alignment = "right"
-            elif col == 4:  # Date of Birth column
-                expected_alignment = "right"
-            else:
-                expected_alignment = "left"  # Default to left alignment
-            
-            # Handle cases where alignment is None or 'general'
+            # ID and Date of Birth are right-aligned, text columns left-aligned
+            expected_alignment = "right" if col in (1, 4) else "left"
+            alignment = view.horizontal(row, col)
+
+            # No alignment or 'general' lets Excel align by type, which is fine
             if alignment is None or alignment == 'general':
-                if col == 1:  # ID column
-                    alignment = "right"
-                elif col == 4:  # Date column
-                    alignment = "right"
-                else:
-                    alignment = "left"
-            
-            # Convert alignment strings to lowercase for comparison
-            if alignment and expected_alignment:
-                alignment = alignment.lower()
-                expected_alignment = expected_alignment.lower()
-            
-            # Debug prints (uncomment when needed)
-            # print(f"Row: {row}, Col: {col}, Value: {cell_value}")
-            # print(f"Current alignment: {alignment}")
-            # print(f"Expected alignment: {expected_alignment}")
-            
-            # Check if alignment matches expected values
-            valid_alignments = [expected_alignment, 'general', None]
-            if alignment not in valid_alignments:
-                correct_alignment = False
-                break
-                
-        if not correct_alignment:
-            break
-    
-    checklist_data["Completed"].append("Yes" if correct_alignment else "No")
-
-    # 8. Check if ChatGPT hyperlink is centered in row 13
-    center_aligned = sheet['A13'].alignment.horizontal == 'center'
-    checklist_data["Completed"].append("Yes" if center_aligned else "No")
-
-    # 9. Check if cells A13:G13 are merged
-    merged_in_row_13 = any("A13:G13" in str(range) for range in sheet.merged_cells.ranges)
-    checklist_data["Completed"].append("Yes" if merged_in_row_13 else "No")
-
-    # 10. Check if row 13 has a background color and meaningful hyperlink
-    background_color_present = sheet['A13'].fill.fill_type is not None
-    meaningful_hyperlink = sheet['A13'].value is not None
-    checklist_data["Completed"].append("Yes" if background_color_present and meaningful_hyperlink else "No")
-
-    return checklist_data
+                continue
+            if alignment.lower() != expected_alignment:
+                return False
+    return True
+
+
+# 8. Check if ChatGPT hyperlink is centered in row 13
+def link_centered(view):
+    return view.horizontal(13, 1) == 'center'
+
+
+# 9. Check if cells A13:G13 are merged
+def link_merged(view):
+    return sheet_ranges(view.sheet).is_merged("A13:G13")
+
+
+# 10. Check if row 13 has a background color and meaningful hyperlink
+def link_filled(view):
+    return view.fill_type(13, 1) is not None and view.value(13, 1) is not None
+
+
+RUBRIC = Rubric([
+    Criterion("Does the dataset have exactly 7 columns (A-G)?", has_seven_columns),
+    Criterion("Are there exactly 10 rows of data in the dataset?", has_ten_rows, cells="A2:G11"),
+    Criterion("Are the first 6 column headers named ID, First Name, Last Name, Date of Birth, Hometown, Occupation?",
+              headers_match, cells="A1:F1"),
+    Criterion("Does the 7th column have a meaningful header and consistent data?", last_column_filled, cells="G1:G11"),
+    Criterion("Are styles applied (e.g., alternating row colors or banded table)?", has_row_styles, cells="A1:A11"),
+    Criterion("Are the headers in row 1 bolded with a background color?", headers_bold_and_colored, cells="A1:G1"),
+    Criterion("Are the columns properly aligned (text, dates, and numbers)?", columns_aligned, cells="A2:G11"),
+    Criterion("Is the ChatGPT hyperlink centered in row 13?", link_centered, cells="A13"),
+    Criterion("Are cells A13:G13 merged in row 13?", link_merged),
+    Criterion("Does row 13 have a background color and meaningful hyperlink text?", link_filled, cells="A13"),
+])
+
+
+def check_excel_1(workbook):
+    return RUBRIC.grade(workbook)
@@ -1,5 +1,10 @@
 import pandas as pd
 from openpyxl.styles import Alignment, Font, PatternFill
+from checkers.excel.aggregates import aggregate_matches
+from checkers.excel.formulas import column_formulas, is_aggregate_formula
+from utils.ranges import sheet_ranges
+from utils.snapshot import StyleSnapshot
+from utils.instrumentation import debug, timed_criteria
 
 def check_excel_2(workbook):
     sheet_names = workbook.sheetnames
@@ -27,16 +32,18 @@ def check_excel_2(workbook):
         ],
         "Completed": []
     }
+    # Times each criterion when a trace is active (see utils.instrumentation)
+    checklist_data["Completed"] = timed_criteria(checklist_data["Grading Criteria"])
 
     # Load the Alumni sheet
     sheet = workbook[sheet_names[0]] if alumni_sheet_present else workbook[sheet_names[0]]
 
-    # Determine the last row and last column with data
-    max_row = sheet.max_row
-    max_column = sheet.max_column
+    # Read values and style ids for A1:I35 once; every criterion below
+    # works off this snapshot instead of going back to the sheet
+    snapshot = StyleSnapshot(sheet, max_row=35, max_column=9)
 
     # Load data into DataFrame up to the last filled cell
-    data = sheet.iter_rows(min_row=1, max_row=max_row, max_col=max_column, values_only=True)
+    data = snapshot.rows(max_row=sheet.max_row, max_column=sheet.max_column)
     alumni_df = pd.DataFrame(data)
 
     # Set headers and drop any fully empty rows
@@ -69,17 +76,20 @@ def check_excel_2(workbook):
     id_column_valid = are_unique and all_above_1001
     checklist_data["Completed"].append("Yes" if id_column_valid else "No")
 
-    # Check if Graduation Year calculation formula is in column G (Experience)
-    graduation_year_formula_present = all(
-        sheet.cell(row=row, column=7).data_type == 'f'  # 'f' indicates a formula
-        for row in range(2, 33)  # Rows G2 to G32
+    # Check if Graduation Year calculation formula is in column G (Experience):
+    # every row of G2:G32 must compute from the Graduation Year in its own row
+    graduation_year_formula_present = column_formulas(
+        snapshot, 7, 2, 32, lambda formula: formula.refers_to(formula.row, 6)
     )
     checklist_data["Completed"].append("Yes" if graduation_year_formula_present else "No")
 
-    # Check if Income Earned calculation formula is in column I (Income Earned)
-    income_earned_formula_present = all(
-        sheet.cell(row=row, column=9).data_type == 'f'
-        for row in range(2, 33)  # Rows I2 to I32
+    # Check if Income Earned calculation formula is in column I (Income Earned):
+    # every row of I2:I32 must compute from its own row's Salary and Experience
+    # (or the Graduation Year it comes from)
+    income_earned_formula_present = column_formulas(
+        snapshot, 9, 2, 32,
+        lambda formula: formula.refers_to(formula.row, 8)
+        and (formula.refers_to(formula.row, 7) or formula.refers_to(formula.row, 6)),
     )
     checklist_data["Completed"].append("Yes" if income_earned_formula_present else "No")
 
@@ -87,9 +97,8 @@ def check_excel_2(workbook):
     try:
         accounting_format = True  # Start with True assumption
         for row in range(2, 33):
-            cell_format = sheet.cell(row=row, column=9).number_format
-            # Print for debugging
-            print(f"Row {row} format: {cell_format}")
+            cell_format = snapshot.number_format(row, 9)
+            debug(f"Row {row} format: {cell_format}")
 
             # Check if the format matches accounting criteria
             is_valid_format = (
@@ -107,7 +116,7 @@ def check_excel_2(workbook):
         checklist_data["Completed"].append("Yes" if accounting_format else "No")
 
     except Exception as e:
-        print(f"Error checking accounting format: {e}")
+        debug(f"Error checking accounting format: {e}")
         checklist_data["Completed"].append("No")
 
     # Check column order
@@ -115,7 +124,7 @@ def check_excel_2(workbook):
 
     # Check different row styles based on Experience
     different_styles = any(
-        sheet.cell(row=row, column=7).fill != sheet.cell(row=row+1, column=7).fill
+        snapshot.fill_id(row, 7) != snapshot.fill_id(row + 1, 7)
         for row in range(2, 33)
     )
     checklist_data["Completed"].append("Yes" if different_styles else "No")
@@ -125,50 +134,60 @@ def check_excel_2(workbook):
 
     # Check center alignment for columns A, F, G, and H
     numeric_columns_aligned = all(
-        sheet.cell(row=row, column=col).alignment.horizontal == 'center'
+        snapshot.horizontal(row, col) == 'center'
         for col in [1, 6, 7, 8]  # Columns A (ID), F (Graduation Year), G (Experience), H (Salary)
         for row in range(2, 33)
     )
     checklist_data["Completed"].append("Yes" if numeric_columns_aligned else "No")
 
+    # Totals and averages must be bold SUM/AVERAGE formulas over rows 2-32 of
+    # their column; when the file has cached results, the value shown must
+    # also match those rows
+    def summary_cell_correct(row, col, function):
+        if not is_aggregate_formula(snapshot, row, col, function, 2, 32) or not snapshot.bold(row, col):
+            return False
+        return aggregate_matches(snapshot, row, col, function, 2, 32) is not False
+
     # Check total Salary in H33 is bold and contains a formula
-    total_salary_bold = sheet['H33'].font.bold if sheet['H33'].data_type == 'f' else False
+    total_salary_bold = summary_cell_correct(33, 8, "SUM")
     checklist_data["Completed"].append("Yes" if total_salary_bold else "No")
 
     # Check average Salary in H34 is bold and contains a formula
-    average_salary_bold = sheet['H34'].font.bold if sheet['H34'].data_type == 'f' else False
+    average_salary_bold = summary_cell_correct(34, 8, "AVERAGE")
     checklist_data["Completed"].append("Yes" if average_salary_bold else "No")
 
     # Check total Income Earned in I33 is bold and contains a formula
-    total_income_bold = sheet['I33'].font.bold if sheet['I33'].data_type == 'f' else False
+    total_income_bold = summary_cell_correct(33, 9, "SUM")
     checklist_data["Completed"].append("Yes" if total_income_bold else "No")
 
     # Check average Income Earned in I34 is bold and contains a formula
-    average_income_bold = sheet['I34'].font.bold if sheet['I34'].data_type == 'f' else False
+    average_income_bold = summary_cell_correct(34, 9, "AVERAGE")
     checklist_data["Completed"].append("Yes" if average_income_bold else "No")
 
     # Check if headers are bold
     headers_bold = all(
-        sheet.cell(row=1, column=col).font.bold
+        snapshot.bold(1, col)
         for col in range(1, len(expected_columns) + 1)
     )
     checklist_data["Completed"].append("Yes" if headers_bold else "No")
 
     # Check borders and thick outside border
     all_borders_applied = all(
-        sheet.cell(row=row, column=col).border is not None
+        snapshot.has_border(row, col)
         for row in range(1, 33)
         for col in range(1, len(expected_columns) + 1)
     )
     checklist_data["Completed"].append("Yes" if all_borders_applied else "No")
 
-    # Check if cells in row 35 are merged and center-aligned
-    merged_in_row_35 = any("A35" in str(range) for range in sheet.merged_cells.ranges)
-    center_aligned = sheet['A35'].alignment.horizontal == 'center' if merged_in_row_35 else False
+    # Check if cells in row 35 are merged (a range starting at A35 within the
+    # row) and center-aligned
+    link_range = sheet_ranges(sheet).merged.starts_at(35, 1)
+    merged_in_row_35 = link_range is not None and link_range.max_row == 35 and link_range.max_col > 1
+    center_aligned = snapshot.horizontal(35, 1) == 'center' if merged_in_row_35 else False
     checklist_data["Completed"].append("Yes" if merged_in_row_35 and center_aligned else "No")
 
     # Check if row 35 has a background color
-    background_color_present = sheet['A35'].fill is not None and sheet['A35'].fill.fill_type is not None
+    background_color_present = snapshot.fill_type(35, 1) is not None
     checklist_data["Completed"].append("Yes" if background_color_present else "No")
 
     return checklist_data
@@ -1,121 +1,153 @@
-from openpyxl.styles import Alignment, Font, PatternFill
+from checkers.excel.aggregates import aggregate_matches
+from checkers.excel.formulas import is_aggregate_formula
+from checkers.rubric import Criterion, Rubric
+from utils.charts import chart_index
+from utils.ranges import sheet_ranges
 
-def check_excel_3(workbook):
-    checklist_data = {
-        "Grading Criteria": [
-            "Is the worksheet named 'Countries'?",
-            "Are there 4 columns (Country, Continent, Population, GDP per Capita)?",
-            "Does the table contain exactly 20 countries with data?",
-            "Are the rows styled by continent?",
-            "Is there a Population column chart positioned correctly?",
-            "Is the Population chart titled 'POPULATION OF THE 20 SAMPLE COUNTRIES'?",
-            "Is there a GDP per Capita chart with gradient fill?",
-            "Is the GDP chart positioned below the Population chart?",
-            "Is the table sorted by Population (largest to smallest)?",
-            "Does row 22 contain SUM formulas for Population and GDP?",
-            "Does row 23 contain AVERAGE formulas for Population and GDP?",
-            "Is the ChatGPT link in merged cells A26:E26?",
-            "Is the ChatGPT link centered?",
-            "Does the ChatGPT link cell have a background color?"
-        ],
-        "Completed": []
-    }
-
-    # Check worksheet name
-    sheet_name_correct = 'Countries' in workbook.sheetnames
-    sheet = workbook['Countries'] if sheet_name_correct else workbook.active
-    checklist_data["Completed"].append("Yes" if sheet_name_correct else "No")
-
-    # Check column headers
+
+def countries_sheet(workbook):
+    """Grade the 'Countries' sheet, or the active sheet if it was not renamed."""
+    return 'Countries' if 'Countries' in workbook.sheetnames else None
+
+
+# Check worksheet name
+def sheet_named_countries(view):
+    return 'Countries' in view.workbook.sheetnames
+
+
+# Check column headers
+def headers_match(view):
     expected_headers = ["Country", "Continent", "Population", "GDP per Capita"]
-    headers = [sheet.cell(row=1, column=i).value for i in range(1, 5)]
-    headers_match = all(a == b for a, b in zip(headers, expected_headers))
-    checklist_data["Completed"].append("Yes" if headers_match else "No")
+    headers = [view.value(1, i) for i in range(1, 5)]
+    return all(a == b for a, b in zip(headers, expected_headers))
+
 
-    # Check for 20 countries with data
-    data_rows = sum(1 for row in range(2, 22) if all(sheet.cell(row=row, column=col).value 
-               for col in range(1, 5)))
-    checklist_data["Completed"].append("Yes" if data_rows == 20 else "No")
+# Check for 20 countries with data
+def has_twenty_countries(view):
+    data_rows = sum(1 for row in range(2, 22) if all(view.value(row, col) for col in range(1, 5)))
+    return data_rows == 20
 
-    # Check for continent-based styling
-    different_styles = False
+
+# Check for continent-based styling
+def styled_by_continent(view):
     current_continent = None
     current_fill = None
     for row in range(2, 22):
-        continent = sheet.cell(row=row, column=2).value
-        fill = sheet.cell(row=row, column=1).fill
+        continent = view.value(row, 2)
+        fill = view.fill_id(row, 1)
         if continent != current_continent:
             if current_continent is not None and fill != current_fill:
-                different_styles = True
+                return True
             current_continent = continent
             current_fill = fill
-    checklist_data["Completed"].append("Yes" if different_styles else "No")
-
-    # Check for Population chart
-    has_population_chart = False
-    for chart in sheet._charts:
-        if hasattr(chart, 'title') and chart.title is not None:
-            has_population_chart = True
-            break
-    checklist_data["Completed"].append("Yes" if has_population_chart else "No")
-
-    # Check Population chart title
-    correct_title = False
-    for chart in sheet._charts:
-        if hasattr(chart, 'title') and chart.title is not None:
-            if hasattr(chart.title, 'tx') and hasattr(chart.title.tx, 'rich'):
-                for p in chart.title.tx.rich.paragraphs:
-                    if hasattr(p, 'r'):
-                        for run in p.r:
-                            if hasattr(run, 't'):
-                                chart_title = str(run.t).strip()
-                                expected_title = "Population of the 20 sample countries"
-                                # Case-insensitive comparison
-                                if chart_title.lower() == expected_title.lower():
-                                    correct_title = True
-                                    break
-    checklist_data["Completed"].append("Yes" if correct_title else "No")
-
-    # Check for GDP chart with gradient fill
-    has_gdp_chart = len(sheet._charts) >= 2
-    checklist_data["Completed"].append("Yes" if has_gdp_chart else "No")
-
-    # Check GDP chart position (below Population chart)
-    charts_positioned_correctly = len(sheet._charts) >= 2
-    checklist_data["Completed"].append("Yes" if charts_positioned_correctly else "No")
-
-    # Check if sorted by Population (largest to smallest)
-    is_sorted = True
+    return False
+
+
+POPULATION_TITLE = "Population of the 20 sample countries"
+
+
+def population_chart(charts):
+    """The Population chart: the one with its title, else one plotting column C."""
+    return charts.find(POPULATION_TITLE) or next((chart for chart in charts if chart.references_column(3)), None)
+
+
+def gdp_chart(charts):
+    """The GDP per Capita chart: another chart plotting column D or titled with GDP."""
+    population = population_chart(charts)
+    return next(
+        (chart for chart in charts
+         if chart is not population and (chart.references_column(4) or "gdp" in (chart.title or ""))),
+        None,
+    )
+
+
+# Check for Population chart
+def has_population_chart(view):
+    return bool(chart_index(view.sheet).titled())
+
+
+# Check Population chart title (case-insensitive)
+def population_chart_titled(view):
+    return chart_index(view.sheet).find(POPULATION_TITLE) is not None
+
+
+# Check for GDP chart with gradient fill
+def has_gdp_chart(view):
+    chart = gdp_chart(chart_index(view.sheet))
+    return chart is not None and chart.fill_type == "gradient"
+
+
+# Check GDP chart position (below Population chart)
+def charts_positioned(view):
+    charts = chart_index(view.sheet)
+    population, gdp = population_chart(charts), gdp_chart(charts)
+    return population is not None and gdp is not None and gdp.is_below(population)
+
+
+# Check if sorted by Population (largest to smallest)
+def sorted_by_population(view):
     prev_value = float('inf')
     for row in range(2, 22):
-        current_value = sheet.cell(row=row, column=3).value
+        current_value = view.value(row, 3)
         if isinstance(current_value, (int, float)) and current_value > prev_value:
-            is_sorted = False
-            break
+            return False
         prev_value = current_value if isinstance(current_value, (int, float)) else float('inf')
-    checklist_data["Completed"].append("Yes" if is_sorted else "No")
+    return True
+
 
-    # Check for SUM formulas in row 22
-    total_population_formula = sheet['C22'].data_type == 'f'
-    total_gdp_formula = sheet['D22'].data_type == 'f'
-    checklist_data["Completed"].append("Yes" if total_population_formula and total_gdp_formula else "No")
+# Check for SUM formulas over rows 2-21 in row 22 and, when the file has
+# cached results, that they total C2:D21
+def has_sum_row(view):
+    return all(
+        is_aggregate_formula(view, 22, col, "SUM", 2, 21)
+        and aggregate_matches(view, 22, col, "SUM", 2, 21) is not False
+        for col in (3, 4)
+    )
 
-    # Check for AVERAGE formulas in row 23
-    avg_population_formula = sheet['C23'].data_type == 'f'
-    avg_gdp_formula = sheet['D23'].data_type == 'f'
-    checklist_data["Completed"].append("Yes" if avg_population_formula and avg_gdp_formula else "No")
 
-    # Check ChatGPT link merged cells
-    merged_link = any("A26:E26" in str(range) for range in sheet.merged_cells.ranges)
-    checklist_data["Completed"].append("Yes" if merged_link else "No")
+# Check for AVERAGE formulas over rows 2-21 in row 23, with the same cached-result check
+def has_average_row(view):
+    return all(
+        is_aggregate_formula(view, 23, col, "AVERAGE", 2, 21)
+        and aggregate_matches(view, 23, col, "AVERAGE", 2, 21) is not False
+        for col in (3, 4)
+    )
 
-    # Check ChatGPT link alignment
-    center_aligned = sheet['A26'].alignment.horizontal == 'center'
-    checklist_data["Completed"].append("Yes" if center_aligned else "No")
 
-    # Check ChatGPT link background color
-    background_color_present = (sheet['A26'].fill is not None and 
-                              sheet['A26'].fill.fill_type is not None)
-    checklist_data["Completed"].append("Yes" if background_color_present else "No")
+# Check ChatGPT link merged cells
+def link_merged(view):
+    return sheet_ranges(view.sheet).is_merged("A26:E26")
 
-    return checklist_data
+
+# Check ChatGPT link alignment
+def link_centered(view):
+    return view.horizontal(26, 1) == 'center'
+
+
+# Check ChatGPT link background color
+def link_filled(view):
+    return view.fill_type(26, 1) is not None
+
+
+RUBRIC = Rubric([
+    Criterion("Is the worksheet named 'Countries'?", sheet_named_countries, countries_sheet),
+    Criterion("Are there 4 columns (Country, Continent, Population, GDP per Capita)?",
+              headers_match, countries_sheet, "A1:D1"),
+    Criterion("Does the table contain exactly 20 countries with data?", has_twenty_countries, countries_sheet, "A2:D21"),
+    Criterion("Are the rows styled by continent?", styled_by_continent, countries_sheet, "A2:B21"),
+    Criterion("Is there a Population column chart positioned correctly?", has_population_chart, countries_sheet),
+    Criterion("Is the Population chart titled 'POPULATION OF THE 20 SAMPLE COUNTRIES'?",
+              population_chart_titled, countries_sheet),
+    Criterion("Is there a GDP per Capita chart with gradient fill?", has_gdp_chart, countries_sheet),
+    Criterion("Is the GDP chart positioned below the Population chart?", charts_positioned, countries_sheet),
+    Criterion("Is the table sorted by Population (largest to smallest)?", sorted_by_population, countries_sheet, "C2:C21"),
+    Criterion("Does row 22 contain SUM formulas for Population and GDP?", has_sum_row, countries_sheet, "C2:D22"),
+    Criterion("Does row 23 contain AVERAGE formulas for Population and GDP?", has_average_row, countries_sheet, "C2:D23"),
+    Criterion("Is the ChatGPT link in merged cells A26:E26?", link_merged, countries_sheet),
+    Criterion("Is the ChatGPT link centered?", link_centered, countries_sheet, "A26"),
+    Criterion("Does the ChatGPT link cell have a background color?", link_filled, countries_sheet, "A26"),
+])
+
+
+def check_excel_3(workbook):
+    return RUBRIC.grade(workbook)
@@ -1,5 +1,9 @@
 from openpyxl.styles import Alignment, Font, PatternFill
 from openpyxl import load_workbook
+from checkers.excel.aggregates import aggregate_matches
+from checkers.excel.formulas import cell_formula, is_aggregate_formula
+from utils.charts import chart_index
+from utils.instrumentation import debug, timed_criteria
 
 def check_excel_final(workbook):
     checklist_data = {
@@ -17,6 +21,8 @@ def check_excel_final(workbook):
         ],
         "Completed": []
     }
+    # Times each criterion when a trace is active (see utils.instrumentation)
+    checklist_data["Completed"] = timed_criteria(checklist_data["Grading Criteria"])
 
     # Check worksheet names
     required_sheets = ['Workplace Productivity', 'Department Distribution']
@@ -48,43 +54,37 @@ def check_excel_final(workbook):
     checklist_data["Completed"].append("Yes" if summary_row_correct else "No")
 
 
-    # Check for charts in 'Workplace Productivity'
-    wp_charts = [chart for chart in wp_sheet._charts]
-
-    def check_chart_title(chart, expected_title):
-        """Check chart titles in a case-insensitive manner."""
-        if hasattr(chart, 'title') and chart.title is not None:
-            if isinstance(chart.title, str):
-                return chart.title.strip().lower() == expected_title.strip().lower()
-            elif hasattr(chart.title, 'tx') and hasattr(chart.title.tx, 'rich'):
-                for p in chart.title.tx.rich.paragraphs:
-                    for run in p.r:
-                        if hasattr(run, 't') and run.t.strip().lower() == expected_title.strip().lower():
-                            return True
-        return False
-
-    has_digital_skills_chart = any(check_chart_title(chart, "Digital Skills Scores by Department") for chart in wp_charts)
-    has_training_output_chart = any(check_chart_title(chart, "Hours of Training Completed and Reported Weekly Output") for chart in wp_charts)
+    # Check for charts in 'Workplace Productivity' (titles are matched
+    # case-insensitively through each sheet's chart index)
+    wp_charts = chart_index(wp_sheet)
+    has_digital_skills_chart = wp_charts.find("Digital Skills Scores by Department") is not None
+    has_training_output_chart = wp_charts.find("Hours of Training Completed and Reported Weekly Output") is not None
     checklist_data["Completed"].append("Yes" if has_digital_skills_chart and has_training_output_chart else "No")
 
     # Check 'Department Distribution' table and chart
     table_correct = (dd_sheet.cell(row=1, column=1).value == 'Department' and
                      dd_sheet.cell(row=1, column=2).value == 'Number of Employees')
-    pie_chart_correct = any(check_chart_title(chart, "Department Distribution") for chart in dd_sheet._charts)
+    pie_chart_correct = chart_index(dd_sheet).find("Department Distribution") is not None
     checklist_data["Completed"].append("Yes" if table_correct and pie_chart_correct else "No")
 
     # Check data completeness
     data_complete = all(all(wp_sheet.cell(row=row, column=col).value is not None for col in range(1, 12)) for row in range(2, 17))
     checklist_data["Completed"].append("Yes" if data_complete else "No")
 
-    # Validate the presence of formulas in C17:J17
+    # Validate the formulas in C17:J17 are AVERAGEs of rows 2-16 and, when
+    # the file has cached results, that each one shows that average
     formulas_present = True
     
     for col in range(3, 11):  # Columns C (3) to J (10)
-        cell = wp_sheet.cell(row=17, column=col)
-        if cell.data_type != 'f':  # 'f' indicates the cell contains a formula
+        if cell_formula(wp_sheet, 17, col) is None:
+            formulas_present = False
+            debug(f"Missing formula in Column {col}, Row 17")
+        elif not is_aggregate_formula(wp_sheet, 17, col, "AVERAGE", 2, 16):
+            formulas_present = False
+            debug(f"Formula in Column {col}, Row 17 is not an AVERAGE of rows 2-16")
+        elif aggregate_matches(wp_sheet, 17, col, "AVERAGE", 2, 16) is False:
             formulas_present = False
-            print(f"Missing formula in Column {col}, Row 17")
+            debug(f"Average in Column {col}, Row 17 does not match rows 2-16")
     
     checklist_data["Completed"].append("Yes" if formulas_present else "No")
 
@@ -0,0 +1,241 @@
+"""What a cell's formula computes, not just that it has one.
+
+A cell with data_type 'f' only says "there is a formula": =1 passes that.
+Formula checks here look at the functions a formula calls and the ranges it
+reads, e.g. that H33 is SUM(H2:H32) or that every row of G2:G32 reads the
+Graduation Year in its own row.
+
+Formulas are analysed in relative R1C1 form, where =2024-F2 in G2 and
+=2024-F3 in G3 are both =2024-RC[-1]. A filled-down column is therefore
+one formula, which is tokenized (with openpyxl's Tokenizer) and checked
+once for all its rows. The analyses are kept in a module-level cache, so a
+worker grading a cohort tokenizes each formula shape the class writes once.
+"""
+import re
+
+from openpyxl.formula.tokenizer import Token, Tokenizer, TokenizerError
+from openpyxl.utils.cell import column_index_from_string, get_column_letter, range_boundaries
+
+# Formula shapes kept; a cohort writes a few dozen, so this is never reached
+# in practice and only guards against a file full of distinct formulas
+MAX_CACHED = 65536
+
+# Quoted strings and sheet names are kept as they are; anything else that
+# looks like a cell reference (not a function name such as LOG10) is made
+# relative to the formula's cell
+_A1_CELL = re.compile(
+    r"(\"(?:[^\"]|\"\")*\"|'(?:[^']|'')*')"
+    r"|(?<![\w.$])(\$?)([A-Za-z]{1,3})(\$?)([0-9]+)(?![\w(!])"
+)
+_REFERENCE_CELL = re.compile(r"(\$?)([A-Za-z]{1,3})(\$?)([0-9]+)")
+
+_analyses = {}
+
+
+def to_r1c1(formula, row, column):
+    """Rewrite an A1 formula in R1C1 form relative to the cell (row, column) it is in."""
+    def relative(match):
+        if match.group(1):
+            return match.group(1)
+        column_absolute, letters, row_absolute, digits = match.group(2, 3, 4, 5)
+        target_row, target_column = int(digits), column_index_from_string(letters.upper())
+        row_part = f"R{target_row}" if row_absolute else _offset("R", target_row - row)
+        column_part = f"C{target_column}" if column_absolute else _offset("C", target_column - column)
+        return row_part + column_part
+
+    return _A1_CELL.sub(relative, formula)
+
+
+def _offset(axis, delta):
+    return axis if delta == 0 else f"{axis}[{delta}]"
+
+
+class Reference:
+    """A range operand, stored relative to the formula's cell."""
+
+    __slots__ = ("sheet", "corners")
+
+    def __init__(self, text, row, column):
+        sheet, _, cells = text.rpartition("!")
+        if sheet.startswith("'"):
+            sheet = sheet[1:-1].replace("''", "'")
+        self.sheet = sheet or None
+        self.corners = []
+        for match in _REFERENCE_CELL.finditer(cells):
+            column_absolute, letters, row_absolute, digits = match.groups()
+            target_row, target_column = int(digits), column_index_from_string(letters.upper())
+            self.corners.append((
+                (True, target_row) if row_absolute else (False, target_row - row),
+                (True, target_column) if column_absolute else (False, target_column - column),
+            ))
+
+    def bounds(self, row, column):
+        """(min_row, min_col, max_row, max_col) for a formula in (row, column), or None.
+
+        Whole-column or whole-row ranges and defined names have no bounds.
+        """
+        if not self.corners:
+            return None
+        rows, columns = [], []
+        for (row_absolute, r), (column_absolute, c) in self.corners:
+            rows.append(r if row_absolute else row + r)
+            columns.append(c if column_absolute else column + c)
+        return min(rows), min(columns), max(rows), max(columns)
+
+
+class FormulaAnalysis:
+    """The parts of a formula shape that checks look at, independent of its cell.
+
+    `functions` are the function names called, in order. `calls` pairs each
+    call's name with its arguments, where an argument that is one range is
+    that Reference and anything else is None. `tokens` is the token stream
+    with each range operand replaced by its Reference.
+    """
+
+    __slots__ = ("r1c1", "tokens", "functions", "calls", "references", "error")
+
+    def __init__(self, r1c1, formula, row, column):
+        self.r1c1 = r1c1
+        self.tokens = []
+        self.functions = []
+        self.calls = []
+        self.references = []
+        self.error = None
+        try:
+            items = Tokenizer(formula).items
+        except TokenizerError as e:
+            self.error = str(e)
+            return
+
+        # Each open call collects its arguments as lists of tokens
+        open_calls = []
+        for token in items:
+            value = token.value
+            if token.type == Token.OPERAND and token.subtype == Token.RANGE:
+                value = Reference(token.value, row, column)
+                self.references.append(value)
+            self.tokens.append((value, token.type, token.subtype))
+
+            if token.type == Token.FUNC and token.subtype == Token.OPEN:
+                name = token.value[:-1].upper()
+                self.functions.append(name)
+                open_calls.append((name, [[]]))
+            elif token.type == Token.FUNC and token.subtype == Token.CLOSE and open_calls:
+                name, arguments = open_calls.pop()
+                self.calls.append((name, tuple(_single_reference(argument) for argument in arguments if argument)))
+                if open_calls:
+                    open_calls[-1][1][-1].append((None, token.type))
+            elif token.type == Token.SEP and token.subtype == Token.ARG and open_calls:
+                open_calls[-1][1].append([])
+            elif open_calls and token.type != Token.WSPACE:
+                open_calls[-1][1][-1].append((value, token.type))
+
+
+def _single_reference(argument):
+    if len(argument) == 1 and isinstance(argument[0][0], Reference):
+        return argument[0][0]
+    return None
+
+
+def analyse(formula, row, column):
+    """The (cached) FormulaAnalysis of an A1 formula in the cell (row, column)."""
+    r1c1 = to_r1c1(formula, row, column)
+    analysis = _analyses.get(r1c1)
+    if analysis is None:
+        if len(_analyses) >= MAX_CACHED:
+            _analyses.clear()
+        analysis = _analyses[r1c1] = FormulaAnalysis(r1c1, formula, row, column)
+    return analysis
+
+
+class Formula:
+    """A formula in a particular cell: its shared analysis plus where it is.
+
+    `sheet` is the name of the sheet the cell is on, so a reference
+    qualified with it (=SUM(Alumni!H2:H32) on Alumni) counts as one to the
+    formula's own sheet.
+    """
+
+    __slots__ = ("text", "row", "column", "sheet", "analysis")
+
+    def __init__(self, text, row, column, sheet=None):
+        self.text = text
+        self.row = row
+        self.column = column
+        self.sheet = sheet
+        self.analysis = analyse(text, row, column)
+
+    def _own_bounds(self, reference):
+        """The reference's bounds if it reads the formula's own sheet, else None."""
+        if reference.sheet is not None and (
+                self.sheet is None or reference.sheet.lower() != self.sheet.lower()):
+            return None
+        return reference.bounds(self.row, self.column)
+
+    @property
+    def functions(self):
+        return self.analysis.functions
+
+    def calls(self, function, coord):
+        """True if the formula calls `function` with `coord` (e.g. "H2:H32") as its only argument."""
+        coord = coord.replace("$", "")
+        min_col, min_row, max_col, max_row = range_boundaries(coord if ":" in coord else f"{coord}:{coord}")
+        function, bounds = function.upper(), (min_row, min_col, max_row, max_col)
+        return any(
+            name == function and len(arguments) == 1 and arguments[0] is not None
+            and self._own_bounds(arguments[0]) == bounds
+            for name, arguments in self.analysis.calls
+        )
+
+    def refers_to(self, row, column):
+        """True if a range the formula reads on its own sheet includes the cell (row, column)."""
+        for reference in self.analysis.references:
+            bounds = self._own_bounds(reference)
+            if bounds and bounds[0] <= row <= bounds[2] and bounds[1] <= column <= bounds[3]:
+                return True
+        return False
+
+
+def cell_formula(sheet, row, column):
+    """The Formula in a cell, or None if it holds a value.
+
+    `sheet` is a snapshot or SheetView (with value() and data_type()) or a
+    worksheet (with cell()); its title names the sheet the formula is on.
+    """
+    if hasattr(sheet, "data_type"):
+        data_type, value = sheet.data_type(row, column), sheet.value(row, column)
+    else:
+        cell = sheet.cell(row=row, column=column)
+        data_type, value = cell.data_type, cell.value
+    if data_type != "f" or not isinstance(value, str):
+        return None
+    return Formula(value if value.startswith("=") else f"={value}", row, column, getattr(sheet, "title", None))
+
+
+def column_formulas(sheet, column, first_row, last_row, check):
+    """True if every cell of a column range holds a formula that passes `check`.
+
+    `check` takes a Formula and must only depend on the formula's relative
+    shape (e.g. "reads the cell to its left"), since it runs once per
+    distinct R1C1 formula rather than once per row.
+    """
+    results = {}
+    for row in range(first_row, last_row + 1):
+        formula = cell_formula(sheet, row, column)
+        if formula is None:
+            return False
+        shape = formula.analysis.r1c1
+        if shape not in results:
+            results[shape] = formula.analysis.error is None and bool(check(formula))
+        if not results[shape]:
+            return False
+    return True
+
+
+def is_aggregate_formula(sheet, row, column, function, first_row, last_row):
+    """True if the cell's formula applies `function` (e.g. "SUM") to its column's rows first_row..last_row."""
+    formula = cell_formula(sheet, row, column)
+    if formula is None:
+        return False
+    letter = get_column_letter(column)
+    return formula.calls(function, f"{letter}{first_row}:{letter}{last_row}")
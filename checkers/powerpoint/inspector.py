@@ -0,0 +1,159 @@
+"""Read the facts check_ppt_1 needs straight from a .pptx package.
+
+Only ppt/presentation.xml, the slide parts and their relationship files are
+read. Pictures, charts and media are recognised from the relationship types
+their shapes point at, so embedded images and videos are never loaded.
+"""
+import posixpath
+import zipfile
+from xml.etree.ElementTree import iterparse, fromstring
+
+PRESENTATION_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+DRAWINGML_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CHART_NS = "http://schemas.openxmlformats.org/drawingml/2006/chart"
+
+IMAGE_REL = f"{REL_NS}/image"
+CHART_REL = f"{REL_NS}/chart"
+
+
+def _tag(ns, name):
+    return f"{{{ns}}}{name}"
+
+
+def _rels_path(part):
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", f"{name}.rels")
+
+
+def _read_rels(archive, part):
+    """Return {relationship id: (type, resolved target)} for a part."""
+    path = _rels_path(part)
+    if path not in archive.namelist():
+        return {}
+    rels = {}
+    for rel in fromstring(archive.read(path)).iter(_tag(PKG_REL_NS, "Relationship")):
+        target = rel.get("Target")
+        if rel.get("TargetMode") != "External":
+            if target.startswith("/"):
+                target = target.lstrip("/")
+            else:
+                target = posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+        rels[rel.get("Id")] = (rel.get("Type"), target)
+    return rels
+
+
+class SlideFacts:
+    """What one slide contains, read from its XML in a single walk."""
+
+    def __init__(self):
+        # Text of each top-level shape that has a text frame
+        self.texts = []
+        # Explicit run font sizes, in points
+        self.font_sizes = []
+        self.has_bullets = False
+        self.has_picture = False
+        self.has_chart = False
+        self.has_transition = False
+
+
+def _read_slide(archive, path):
+    rels = _read_rels(archive, path)
+    facts = SlideFacts()
+
+    sp_tree_tag = _tag(PRESENTATION_NS, "spTree")
+    sp_tag, pic_tag = _tag(PRESENTATION_NS, "sp"), _tag(PRESENTATION_NS, "pic")
+    frame_tag = _tag(PRESENTATION_NS, "graphicFrame")
+    transition_tag = _tag(PRESENTATION_NS, "transition")
+    tx_body_tag = _tag(PRESENTATION_NS, "txBody")
+    p_tag, r_tag, t_tag = _tag(DRAWINGML_NS, "p"), _tag(DRAWINGML_NS, "r"), _tag(DRAWINGML_NS, "t")
+    ppr_tag, rpr_tag = _tag(DRAWINGML_NS, "pPr"), _tag(DRAWINGML_NS, "rPr")
+    blip_tag, chart_tag = _tag(DRAWINGML_NS, "blip"), _tag(CHART_NS, "chart")
+    media_tags = {_tag(DRAWINGML_NS, "videoFile"), _tag(DRAWINGML_NS, "audioFile")}
+    embed_attr, id_attr = _tag(REL_NS, "embed"), _tag(REL_NS, "id")
+
+    depth = 0
+    tree_depth = None
+    with archive.open(path) as src:
+        for event, element in iterparse(src, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if element.tag == sp_tree_tag and tree_depth is None:
+                    tree_depth = depth
+                continue
+            depth -= 1
+            tag = element.tag
+
+            if tag == transition_tag:
+                facts.has_transition = True
+            # Only shapes directly on the slide count, as with slide.shapes
+            if tree_depth is None or depth != tree_depth:
+                continue
+
+            if tag == sp_tag:
+                body = element.find(tx_body_tag)
+                if body is not None:
+                    paragraphs = []
+                    for paragraph in body.iter(p_tag):
+                        ppr = paragraph.find(ppr_tag)
+                        if ppr is not None and int(ppr.get("lvl", 0)) > 0:
+                            facts.has_bullets = True
+                        for run in paragraph.iter(r_tag):
+                            rpr = run.find(rpr_tag)
+                            if rpr is not None and rpr.get("sz"):
+                                facts.font_sizes.append(int(rpr.get("sz")) / 100)
+                        paragraphs.append("".join(t.text or "" for t in paragraph.iter(t_tag)))
+                    facts.texts.append("\n".join(paragraphs))
+            elif tag == pic_tag:
+                is_media = any(child.tag in media_tags for child in element.iter())
+                blip = element.find(f".//{blip_tag}")
+                if not is_media and blip is not None and rels.get(blip.get(embed_attr), (None,))[0] == IMAGE_REL:
+                    facts.has_picture = True
+            elif tag == frame_tag:
+                chart = element.find(f".//{chart_tag}")
+                if chart is not None and rels.get(chart.get(id_attr), (None,))[0] == CHART_REL:
+                    facts.has_chart = True
+
+            if tag in (sp_tag, pic_tag, frame_tag):
+                element.clear()
+    return facts
+
+
+class DeckInspection:
+    """Per-slide facts for a deck, in slide order."""
+
+    def __init__(self, file):
+        with zipfile.ZipFile(file) as archive:
+            root_rels = _read_rels(archive, "")
+            presentation = next(
+                (target for rel_type, target in root_rels.values() if rel_type.endswith("/officeDocument")),
+                "ppt/presentation.xml",
+            )
+            rels = _read_rels(archive, presentation)
+            root = fromstring(archive.read(presentation))
+            slide_paths = [
+                rels[slide.get(_tag(REL_NS, "id"))][1]
+                for slide in root.iter(_tag(PRESENTATION_NS, "sldId"))
+            ]
+            self.slides = [_read_slide(archive, path) for path in slide_paths]
+
+    def to_features(self):
+        """The slide facts as a JSON-safe dict."""
+        return {"slides": [vars(slide) for slide in self.slides]}
+
+    @classmethod
+    def from_features(cls, features):
+        """Rebuild an inspection from to_features() without the .pptx."""
+        deck = cls.__new__(cls)
+        deck.slides = []
+        for values in features["slides"]:
+            slide = SlideFacts()
+            vars(slide).update(values)
+            deck.slides.append(slide)
+        return deck
+
+
+def inspect_deck(file):
+    """Read a .pptx submission's slide facts without loading its media."""
+    return DeckInspection(file)
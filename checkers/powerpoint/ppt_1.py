@@ -1,8 +1,6 @@
-from pptx.enum.shapes import MSO_SHAPE_TYPE
-from pptx.enum.dml import MSO_THEME_COLOR
-from pptx.util import Inches, Pt
+from utils.instrumentation import timed_criteria
 
-def check_ppt_1(prs):
+def check_ppt_1(deck):
     checklist_data = {
         "Grading Criteria": [
             "Does the presentation have at least 5 slides?",
@@ -18,98 +16,58 @@ def check_ppt_1(prs):
         ],
         "Completed": []
     }
+    # Times each criterion when a trace is active (see utils.instrumentation)
+    checklist_data["Completed"] = timed_criteria(checklist_data["Grading Criteria"])
 
     try:
+        # Slide facts were collected in one walk by the deck inspector
+        slides = deck.slides
+
         # Check number of slides
-        sufficient_slides = len(prs.slides) >= 5
+        sufficient_slides = len(slides) >= 5
         checklist_data["Completed"].append("Yes" if sufficient_slides else "No")
 
         # Check for titles on each slide
-        slides_with_titles = 0
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    if shape.text.strip() != "":
-                        slides_with_titles += 1
-                        break
-        all_slides_have_titles = slides_with_titles == len(prs.slides)
+        slides_with_titles = sum(
+            1 for slide in slides if any(text.strip() != "" for text in slide.texts)
+        )
+        all_slides_have_titles = slides_with_titles == len(slides)
         checklist_data["Completed"].append("Yes" if all_slides_have_titles else "No")
 
         # Check font size
-        appropriate_font_size = True
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    for paragraph in shape.text_frame.paragraphs:
-                        for run in paragraph.runs:
-                            if hasattr(run.font, 'size') and run.font.size is not None:
-                                if run.font.size < Pt(24):
-                                    appropriate_font_size = False
+        appropriate_font_size = all(size >= 24 for slide in slides for size in slide.font_sizes)
         checklist_data["Completed"].append("Yes" if appropriate_font_size else "No")
 
         # Check for images
-        slides_with_images = 0
-        for slide in prs.slides:
-            has_image = False
-            for shape in slide.shapes:
-                if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-                    has_image = True
-                    break
-            if has_image:
-                slides_with_images += 1
+        slides_with_images = sum(1 for slide in slides if slide.has_picture)
         sufficient_images = slides_with_images >= 2
         checklist_data["Completed"].append("Yes" if sufficient_images else "No")
 
         # Check for charts
-        has_chart = False
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if shape.shape_type == MSO_SHAPE_TYPE.CHART:
-                    has_chart = True
-                    break
-            if has_chart:
-                break
+        has_chart = any(slide.has_chart for slide in slides)
         checklist_data["Completed"].append("Yes" if has_chart else "No")
 
         # Check for consistent theme (basic check for now)
         checklist_data["Completed"].append("Yes")  # Placeholder
 
         # Check for bullet points
-        has_bullets = False
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    for paragraph in shape.text_frame.paragraphs:
-                        if paragraph.level > 0:
-                            has_bullets = True
-                            break
+        has_bullets = any(slide.has_bullets for slide in slides)
         checklist_data["Completed"].append("Yes" if has_bullets else "No")
 
         # Check for title slide (basic check)
-        has_title_slide = False
-        if len(prs.slides) > 0:
-            first_slide = prs.slides[0]
-            for shape in first_slide.shapes:
-                if shape.has_text_frame:
-                    if len(shape.text.strip()) > 0:
-                        has_title_slide = True
-                        break
+        has_title_slide = bool(slides) and any(len(text.strip()) > 0 for text in slides[0].texts)
         checklist_data["Completed"].append("Yes" if has_title_slide else "No")
 
         # Check for conclusion slide (basic check)
-        has_conclusion = False
-        if len(prs.slides) > 0:
-            last_slide = prs.slides[-1]
-            for shape in last_slide.shapes:
-                if shape.has_text_frame:
-                    text = shape.text.lower()
-                    if "conclusion" in text or "summary" in text or "thank" in text:
-                        has_conclusion = True
-                        break
+        has_conclusion = bool(slides) and any(
+            "conclusion" in text.lower() or "summary" in text.lower() or "thank" in text.lower()
+            for text in slides[-1].texts
+        )
         checklist_data["Completed"].append("Yes" if has_conclusion else "No")
 
-        # Check for transitions (basic check - assumes if there are any transition settings)
-        checklist_data["Completed"].append("Yes")  # Placeholder for now
+        # Check for transitions (any slide with a <p:transition> element)
+        has_transitions = any(slide.has_transition for slide in slides)
+        checklist_data["Completed"].append("Yes" if has_transitions else "No")
 
     except Exception as e:
         # If any check fails, fill remaining checks with "No"
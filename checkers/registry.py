@@ -0,0 +1,141 @@
+import functools
+import importlib
+import os
+
+from utils.instrumentation import profiled, stage
+
+# Which reader opens .xlsx submissions: "openpyxl" (read-only, bounded) or
+# "xml" (parses the sheet, style and chart XML directly, see utils.xlsx_fast)
+XLSX_BACKENDS = ("openpyxl", "xml")
+DEFAULT_XLSX_BACKEND = os.environ.get("GRADER_XLSX_BACKEND", "openpyxl")
+
+# Every gradable assignment: its display title, the file type it accepts and
+# the dotted path of the function that grades it. Bump "version" whenever a
+# checker's criteria change so cached results for it are not reused. Excel
+# assignments also list the cell range their checker reads, so nothing
+# outside it is parsed, and a "signature" of the sheet names and row 1
+# headers the assignment asks for, which utils.detect uses to tell
+# workbooks apart when a file arrives without a slot (e.g. in an LMS export).
+ASSIGNMENTS = {
+    "excel_1": {
+        "title": "Excel Assignment 1",
+        "extension": "xlsx",
+        "checker": "checkers.excel.excel_1.check_excel_1",
+        "version": 2,
+        "bounds": "A1:G13",
+        "signature": {
+            "sheets": [],
+            "headers": ["ID", "First Name", "Last Name", "Date of Birth", "Hometown", "Occupation"],
+        },
+    },
+    "excel_2": {
+        "title": "Excel Assignment 2",
+        "extension": "xlsx",
+        "checker": "checkers.excel.excel_2.check_excel_2",
+        "version": 6,
+        "bounds": "A1:I35",
+        "signature": {
+            "sheets": ["Alumni"],
+            "headers": ["ID", "First Name", "Last Name", "Bachelor's Degree", "Current Profession",
+                        "Graduation Year", "Experience", "Salary", "Income Earned"],
+        },
+    },
+    "excel_3": {
+        "title": "Excel Assignment 3",
+        "extension": "xlsx",
+        "checker": "checkers.excel.excel_3.check_excel_3",
+        "version": 7,
+        "bounds": "A1:E26",
+        "signature": {
+            "sheets": ["Countries"],
+            "headers": ["Country", "Continent", "Population", "GDP per Capita"],
+        },
+    },
+    "excel_final": {
+        "title": "Excel Final Assignment",
+        "extension": "xlsx",
+        "checker": "checkers.excel.excel_final.check_excel_final",
+        "version": 6,
+        "bounds": "A1:K17",
+        "signature": {
+            "sheets": ["Workplace Productivity", "Department Distribution"],
+            "headers": ["Employee ID", "Department", "Digital Skills Score (1-10)", "Productivity Rating (1-5)",
+                        "Hours of Training Completed"],
+        },
+    },
+    "word_1": {
+        "title": "Word Assignment 1",
+        "extension": "docx",
+        "checker": "checkers.word.word_1.check_word_1",
+        "version": 2,
+    },
+    "ppt_1": {
+        "title": "PowerPoint Assignment 1",
+        "extension": "pptx",
+        "checker": "checkers.powerpoint.ppt_1.check_ppt_1",
+        "version": 2,
+    },
+}
+
+
+# Extra assignments can be plugged in without editing this file: list the
+# modules in GRADER_PLUGINS (comma separated). Each defines its own
+# ASSIGNMENTS dict in the format above and should import nothing heavy at
+# module level, since it is imported whenever the registry is.
+for _plugin in filter(None, (name.strip() for name in os.environ.get("GRADER_PLUGINS", "").split(","))):
+    ASSIGNMENTS.update(importlib.import_module(_plugin).ASSIGNMENTS)
+
+
+@functools.cache
+def get_checker(assignment):
+    """Import and return the check_* function for an assignment.
+
+    Nothing is imported until an assignment is first graded, so the app
+    starts without openpyxl, python-docx, python-pptx or pandas loaded.
+    """
+    module_name, _, function_name = ASSIGNMENTS[assignment]["checker"].rpartition(".")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def get_rubric(assignment):
+    """Return the assignment's checkers.rubric.Rubric, or None for a hand-written checker."""
+    module_name = ASSIGNMENTS[assignment]["checker"].rpartition(".")[0]
+    return getattr(importlib.import_module(module_name), "RUBRIC", None)
+
+
+def load_submission(assignment, file, backend=None):
+    """Open a submission with the library its assignment's file type needs."""
+    extension = ASSIGNMENTS[assignment]["extension"]
+    if extension == "xlsx":
+        backend = backend or DEFAULT_XLSX_BACKEND
+        if backend == "xml":
+            from utils.xlsx_fast import load_fast_workbook
+            return load_fast_workbook(file, ASSIGNMENTS[assignment]["bounds"])
+        if backend != "openpyxl":
+            raise ValueError(f"Unknown xlsx backend: {backend}")
+        from utils.workbook import load_bounded_workbook
+        return load_bounded_workbook(file, ASSIGNMENTS[assignment]["bounds"])
+    if extension == "docx":
+        from docx import Document
+        return Document(file)
+    if extension == "pptx":
+        from checkers.powerpoint.inspector import inspect_deck
+        return inspect_deck(file)
+    raise ValueError(f"Unsupported file type: {extension}")
+
+
+def grade_submission(assignment, file, backend=None):
+    """Load a submission and run its checker, returning the checklist data."""
+    checker = get_checker(assignment)
+    with profiled(assignment):
+        with stage("parse"):
+            submission = load_submission(assignment, file, backend)
+        try:
+            with stage("check"):
+                checklist_data = checker(submission)
+        finally:
+            if hasattr(submission, "close"):
+                submission.close()
+    # Hand back a plain list even if the checker's was timing its appends
+    checklist_data["Completed"] = list(checklist_data["Completed"])
+    return checklist_data
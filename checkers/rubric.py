@@ -0,0 +1,248 @@
+import hashlib
+import sys
+import time
+import types
+from pathlib import Path
+
+from openpyxl.utils.cell import range_boundaries
+
+from utils.instrumentation import current_trace, debug, stage
+from utils.snapshot import StyleSnapshot
+
+
+class Criterion:
+    """One line of a rubric.
+
+    `check` receives a SheetView of the sheet the criterion targets and
+    returns True when the criterion is met. `sheet` picks that sheet: a
+    sheet name, a position in the workbook, None for the active sheet, or a
+    function of the workbook returning one of those. `cells` is the range
+    (e.g. "A1:G11") the check reads, which the rubric uses to plan its reads.
+    Together they declare what the criterion depends on, see fingerprint.
+    """
+
+    def __init__(self, text, check, sheet=None, cells=None):
+        self.text = text
+        self.check = check
+        self.sheet = sheet
+        self.cells = cells
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self):
+        """A hash of the text, sheet, cells and check code.
+
+        It changes whenever the criterion is edited, including the helper
+        functions and constants its check uses and the source of the modules
+        defining the classes it reaches (whose methods have no code of their
+        own to follow), so a stored result can be reused for exactly as long
+        as the criterion stays the same.
+        """
+        if self._fingerprint is None:
+            hasher = hashlib.sha1(f"{self.text}\0{self.cells}".encode())
+            for part in (self.sheet, self.check):
+                if callable(part):
+                    _hash_function(part, hasher, set())
+                else:
+                    hasher.update(repr(part).encode())
+            self._fingerprint = hasher.hexdigest()
+        return self._fingerprint
+
+
+# Modules under this folder are the project's own; classes from anywhere
+# else (openpyxl, numpy ...) are hashed by name only
+_PROJECT = Path(__file__).resolve().parent.parent
+
+_source_digests = {}
+
+
+def _hash_function(function, hasher, seen):
+    """Hash a function's code and, recursively, the globals it refers to."""
+    code = getattr(function, "__code__", None)
+    if code is None or code in seen:
+        # Hashed already (or not Python code); the name keeps the hash stable
+        hasher.update(getattr(function, "__qualname__", type(function).__name__).encode())
+        return
+    seen.add(code)
+    _hash_code(code, getattr(function, "__globals__", {}), hasher, seen)
+
+
+def _hash_code(code, namespace, hasher, seen):
+    hasher.update(code.co_code)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _hash_code(const, namespace, hasher, seen)
+        else:
+            hasher.update(_stable_repr(const).encode())
+    for name in code.co_names:
+        hasher.update(name.encode())
+        target = namespace.get(name)
+        if isinstance(target, types.FunctionType):
+            _hash_function(target, hasher, seen)
+        elif isinstance(target, (type, types.ModuleType)):
+            _hash_module(target, hasher, seen)
+        elif isinstance(target, (int, float, str, tuple, frozenset)):
+            hasher.update(_stable_repr(target).encode())
+
+
+def _hash_module(target, hasher, seen):
+    """Hash the source of the project module a class or module comes from."""
+    module = target if isinstance(target, types.ModuleType) else sys.modules.get(target.__module__)
+    path = getattr(module, "__file__", None)
+    if path is None or not Path(path).resolve().is_relative_to(_PROJECT):
+        hasher.update(getattr(target, "__qualname__", target.__name__).encode())
+        return
+    if path in seen:
+        return
+    seen.add(path)
+    if path not in _source_digests:
+        with open(path, "rb") as f:
+            _source_digests[path] = hashlib.sha1(f.read()).digest()
+    hasher.update(_source_digests[path])
+
+
+def _stable_repr(value):
+    # Set order depends on string hashing, which changes between processes
+    if isinstance(value, frozenset):
+        return f"frozenset({sorted(map(_stable_repr, value))})"
+    return repr(value)
+
+
+class SheetView:
+    """What a criterion sees: the snapshot of the cells the plan read for this
+    sheet, plus the sheet and workbook for merged ranges, charts and names.
+
+    max_row and max_column are the sheet's size before it was read, since
+    reading cells of a fully loaded sheet can grow it.
+    """
+
+    def __init__(self, workbook, sheet, snapshot, max_row, max_column):
+        self.workbook = workbook
+        self.sheet = sheet
+        self.snapshot = snapshot
+        self.max_row = max_row
+        self.max_column = max_column
+
+    def __getattr__(self, name):
+        # value(), bold(), fill_id(), horizontal() ... come from the snapshot
+        return getattr(self.snapshot, name)
+
+
+def resolve_sheet(workbook, selector):
+    """Return the sheet name a criterion's `sheet` selector points at."""
+    if callable(selector):
+        selector = selector(workbook)
+    if selector is None:
+        return workbook.active.title
+    if isinstance(selector, int):
+        return workbook.sheetnames[selector]
+    return selector
+
+
+class Rubric:
+    """A list of criteria graded together from one read per sheet.
+
+    On first use the rubric compiles an access plan: the criteria are grouped
+    by the sheet they target and the cell ranges they declare are merged into
+    one bounding block per sheet. Grading then snapshots each block once and
+    runs every criterion against it, so adding criteria adds no extra passes
+    over the workbook.
+    """
+
+    def __init__(self, criteria):
+        self.criteria = list(criteria)
+        self._plan = None
+
+    @property
+    def plan(self):
+        if self._plan is None:
+            self._plan = self._compile(self.criteria)
+        return self._plan
+
+    @staticmethod
+    def _compile(criteria):
+        """Map each sheet selector to the block of cells its criteria read."""
+        plan = {}
+        for criterion in criteria:
+            min_col, min_row, max_col, max_row = range_boundaries(criterion.cells or "A1")
+            bounds = (min_row, min_col, max_row, max_col)
+            key = criterion.sheet
+            plan[key] = _union(plan[key], bounds) if key in plan else bounds
+        return plan
+
+    def _read(self, workbook, plan):
+        """Snapshot each planned block once and return a view per selector."""
+        # Different selectors can land on the same sheet (e.g. None and 0),
+        # so merge their blocks by sheet name before reading
+        names = {}
+        blocks = {}
+        for key, bounds in plan.items():
+            name = resolve_sheet(workbook, key)
+            names[key] = name
+            if name in workbook:
+                blocks[name] = _union(blocks[name], bounds) if name in blocks else bounds
+
+        views = {}
+        for name, (min_row, min_col, max_row, max_col) in blocks.items():
+            sheet = workbook[name]
+            sheet_max_row, sheet_max_column = sheet.max_row, sheet.max_column
+            snapshot = StyleSnapshot(sheet, max_row, max_col, min_row=min_row, min_column=min_col)
+            views[name] = SheetView(workbook, sheet, snapshot, sheet_max_row, sheet_max_column)
+        return {key: views.get(name) for key, name in names.items()}
+
+    def grade(self, workbook, memo=None):
+        """Grade a workbook, returning the checklist data.
+
+        `memo` maps criterion fingerprints to earlier results for the same
+        submission (see grading.features). Criteria found there are not run
+        again and only the cells of the others are read; the memo is updated
+        in place and loses the results of criteria no longer in the rubric.
+        """
+        checklist_data = {
+            "Grading Criteria": [criterion.text for criterion in self.criteria],
+            "Completed": [],
+        }
+        if memo is None:
+            pending, plan = self.criteria, self.plan
+        else:
+            pending = [criterion for criterion in self.criteria if criterion.fingerprint not in memo]
+            plan = self._compile(pending)
+        with stage("read"):
+            views = self._read(workbook, plan) if pending else {}
+        trace = current_trace()
+        for criterion in self.criteria:
+            if memo is not None and criterion.fingerprint in memo:
+                checklist_data["Completed"].append("Yes" if memo[criterion.fingerprint] else "No")
+                continue
+            start = time.perf_counter()
+            view = views[criterion.sheet]
+            failed = False
+            if view is None:
+                # The sheet the criterion targets is missing
+                passed = False
+            else:
+                try:
+                    passed = criterion.check(view)
+                except (KeyError, IndexError, ValueError):
+                    # Unexpected content (e.g. a sheet or name the check
+                    # looks up is missing) fails only this criterion
+                    passed, failed = False, True
+                except Exception as e:
+                    debug(f"Criterion {criterion.text!r} raised {e!r}")
+                    passed, failed = False, True
+            if trace is not None:
+                trace.add_criterion(criterion.text, time.perf_counter() - start)
+            # A failure from an exception may be a bug in the check, so it is
+            # worked out again next time rather than stored
+            if memo is not None and not failed:
+                memo[criterion.fingerprint] = bool(passed)
+            checklist_data["Completed"].append("Yes" if passed else "No")
+        if memo is not None:
+            current = {criterion.fingerprint for criterion in self.criteria}
+            for fingerprint in set(memo) - current:
+                del memo[fingerprint]
+        return checklist_data
+
+
+def _union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
@@ -0,0 +1,178 @@
+import re
+from types import SimpleNamespace
+
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
+from docx.shared import Length, Pt
+
+# Any year from 1900 to 2024 appearing in the text
+YEAR_PATTERN = re.compile(r"19\d\d|20[01]\d|202[0-4]")
+
+
+class StyleResolver:
+    """Effective font name, font size and line spacing per paragraph style.
+
+    Values not set on a style are inherited from its base style chain and
+    finally from the document defaults. Each style is resolved once.
+    """
+
+    def __init__(self, doc):
+        self._doc = doc
+        self._resolved = {}
+        self._defaults = self._read_defaults(doc)
+
+    @staticmethod
+    def _read_defaults(doc):
+        font_name = font_size = line_spacing = None
+        defaults = doc.styles.element.find(qn("w:docDefaults"))
+        if defaults is not None:
+            fonts = defaults.find(f"{qn('w:rPrDefault')}/{qn('w:rPr')}/{qn('w:rFonts')}")
+            if fonts is not None:
+                font_name = fonts.get(qn("w:ascii"))
+            size = defaults.find(f"{qn('w:rPrDefault')}/{qn('w:rPr')}/{qn('w:sz')}")
+            if size is not None:
+                font_size = Pt(int(size.get(qn("w:val"))) / 2)
+            spacing = defaults.find(f"{qn('w:pPrDefault')}/{qn('w:pPr')}/{qn('w:spacing')}")
+            if spacing is not None and spacing.get(qn("w:line")) and spacing.get(qn("w:lineRule"), "auto") == "auto":
+                line_spacing = int(spacing.get(qn("w:line"))) / 240
+        return font_name, font_size, line_spacing
+
+    def resolve(self, paragraph):
+        """Return (font name, font size, line spacing) for a paragraph's style."""
+        style_id = paragraph._p.style
+        if style_id not in self._resolved:
+            self._resolved[style_id] = self._resolve_style(paragraph.style)
+        return self._resolved[style_id]
+
+    def _resolve_style(self, style):
+        font_name = font_size = line_spacing = None
+        while style is not None:
+            font_name = font_name or style.font.name
+            font_size = font_size or style.font.size
+            if line_spacing is None:
+                line_spacing = style.paragraph_format.line_spacing
+            style = style.base_style
+
+        default_name, default_size, default_spacing = self._defaults
+        return (
+            font_name or default_name,
+            font_size or default_size,
+            line_spacing if line_spacing is not None else default_spacing,
+        )
+
+
+class DocumentFacts:
+    """The paragraph and section facts check_word_1 reads, as plain data.
+
+    Each paragraph keeps its text, alignment, whether any run is bold, the
+    effective (font name, size) of its runs and its effective line spacing;
+    each section keeps its margins. to_features() gives a JSON-safe dict and
+    from_features() rebuilds the facts from one without the .docx.
+    """
+
+    def __init__(self, paragraphs, margins):
+        self.paragraphs = paragraphs
+        self.margins = margins
+
+    @classmethod
+    def from_document(cls, doc):
+        styles = StyleResolver(doc)
+        paragraphs = []
+        for paragraph in doc.paragraphs:
+            text = paragraph.text
+            alignment = paragraph.alignment
+            facts = {
+                "text": text,
+                "alignment": int(alignment) if alignment is not None else None,
+                "bold": any(run.bold for run in paragraph.runs),
+                "fonts": [],
+                "spacing": None,
+            }
+            # Blank paragraphs are skipped by every font and spacing check
+            if text.strip():
+                font_name, font_size, line_spacing = styles.resolve(paragraph)
+                fonts = []
+                for run in paragraph.runs:
+                    font = [run.font.name or font_name, run.font.size or font_size]
+                    if font not in fonts:
+                        fonts.append(font)
+                facts["fonts"] = fonts
+                spacing = paragraph.paragraph_format.line_spacing
+                facts["spacing"] = line_spacing if spacing is None else spacing
+            paragraphs.append(facts)
+        margins = [
+            [section.left_margin, section.right_margin, section.top_margin, section.bottom_margin]
+            for section in doc.sections
+        ]
+        return cls(paragraphs, margins)
+
+    @classmethod
+    def from_features(cls, features):
+        return cls(features["paragraphs"], features["margins"])
+
+    def to_features(self):
+        return {"paragraphs": self.paragraphs, "margins": self.margins}
+
+    @property
+    def sections(self):
+        """Sections shaped like python-docx's, with Length margins."""
+        return [
+            SimpleNamespace(**{
+                name: Length(value) if value is not None else None
+                for name, value in zip(("left_margin", "right_margin", "top_margin", "bottom_margin"), margins)
+            })
+            for margins in self.margins
+        ]
+
+
+class DocumentAnalysis:
+    """Everything check_word_1 needs, collected in one pass over the paragraphs.
+
+    Takes a python-docx Document or the DocumentFacts already read from one.
+    """
+
+    def __init__(self, doc):
+        facts = doc if isinstance(doc, DocumentFacts) else DocumentFacts.from_document(doc)
+        paragraphs = facts.paragraphs
+
+        self.correct_font = True
+        self.correct_spacing = True
+        self.title_centered = False
+        self.body_paragraphs = []
+        self.has_references = False
+        self.has_parenthetical = False
+        self.has_citations = False
+
+        if paragraphs:
+            title = paragraphs[0]
+            self.title_centered = title["alignment"] == WD_ALIGN_PARAGRAPH.CENTER and not title["bold"]
+
+        found_references = False
+        header_done = False
+        for paragraph in paragraphs:
+            text = paragraph["text"]
+            # The References check looks for any parenthesised text anywhere
+            if '(' in text and ')' in text:
+                self.has_parenthetical = True
+
+            text = text.strip()
+            if not text:
+                continue
+
+            if any(name != 'Times New Roman' or size != Pt(12) for name, size in paragraph["fonts"]):
+                self.correct_font = False
+
+            if paragraph["spacing"] not in [None, 2.0]:
+                self.correct_spacing = False
+
+            # Body paragraphs start after the header block and stop at References
+            if not header_done and len(text) > 100:
+                header_done = True
+            if text.lower() == 'references':
+                self.has_references = True
+                found_references = True
+                continue
+            if header_done and not found_references and len(text) > 100 and not text.lower().startswith('in conclusion'):
+                self.body_paragraphs.append(text)
+                if '(' in text and ')' in text and YEAR_PATTERN.search(text):
+                    self.has_citations = True
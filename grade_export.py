@@ -0,0 +1,4 @@
+from grading.archive import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Initialize grading package
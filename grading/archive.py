@@ -0,0 +1,254 @@
+"""Grade an LMS export: one zip holding every student's submission.
+
+The export is never extracted. A reader thread walks the zip's members and
+ingests each one straight from the archive (see utils.ingest) into a
+bounded queue, while the caller's side of the queue works out which
+assignment each file is from its contents (utils.detect) and hands it to a
+worker pool (grading.workers), under the same time and memory limits as the
+app. Reading the export, sniffing and grading all overlap. At most
+`queue_size` ingested members wait in the queue (plus the one being
+sniffed), each holding at most utils.ingest.SPOOL_MEMORY_BYTES in memory
+before its spooled file moves to disk. Members handed to the pool are
+saved as temporary files for the workers to open, at most
+`queue_size + workers` at a time, so they take disk rather than memory.
+
+Students are named from the member's file name, which each LMS builds its
+own way; see parse_member_name.
+"""
+import argparse
+import queue
+import re
+import threading
+import zipfile
+from collections import Counter
+from pathlib import Path, PurePosixPath
+
+from checkers.registry import ASSIGNMENTS
+from grading.batch import write_gradebook
+from grading.pool import WORKERS, submit_saved
+from grading.workers import LimitExceeded, WorkerPool
+from utils.detect import detect_assignment
+from utils.ingest import ingest
+from utils.scoring import score_results
+
+# Members read ahead of the graders
+QUEUE_SIZE = 8
+
+# Local file header signature: every Office file is a zip
+ZIP_MAGIC = b"PK\x03\x04"
+
+# How LMSs name the files in a submissions export, most specific first
+MEMBER_PATTERNS = [
+    # Canvas: smithjohn_LATE_12345_67890_Budget.xlsx
+    re.compile(r"(?P<student>[^_/]+?)(?:_LATE)?_(?P<student_id>\d+)_\d+_(?P<original>.+)"),
+    # Moodle: John Smith_12345_assignsubmission_file_/Budget.xlsx (folder or flattened)
+    re.compile(r"(?P<student>[^_/]+)_(?P<student_id>\d+)_assignsubmission_file_/?(?P<original>.*)"),
+    # Blackboard: Budget Project_jsmith_attempt_2024-03-01-10-15-00_Budget.xlsx
+    re.compile(r"[^/]*_(?P<student>[^_/]+)_attempt_[\d-]+(?:_(?P<original>.+))?"),
+]
+
+
+class ExportMember:
+    """One file in an export, and who submitted it."""
+
+    def __init__(self, name, student, student_id=None, original=None, late=False):
+        self.name = name
+        self.student = student
+        self.student_id = student_id
+        self.original = original or PurePosixPath(name).name
+        self.late = late
+
+    def __repr__(self):
+        return f"ExportMember({self.name!r}, student={self.student!r})"
+
+
+def parse_member_name(name):
+    """Return the ExportMember for a member name, falling back to its file stem."""
+    for pattern in MEMBER_PATTERNS:
+        match = pattern.fullmatch(name) or pattern.fullmatch(PurePosixPath(name).name)
+        if match:
+            fields = match.groupdict()
+            return ExportMember(name, fields["student"], fields.get("student_id"), fields.get("original"),
+                                late="_LATE_" in name)
+    return ExportMember(name, PurePosixPath(name).stem)
+
+
+def _is_submission(archive, info):
+    """Skip folders, OS debris and anything that isn't itself a zip (e.g. LMS receipt .txt files)."""
+    path = PurePosixPath(info.filename)
+    if info.is_dir() or path.parts[0] == "__MACOSX" or path.name.startswith(("~$", ".")):
+        return False
+    with archive.open(info) as member:
+        return member.read(len(ZIP_MAGIC)) == ZIP_MAGIC
+
+
+def _read_members(export, items, stop):
+    """Reader thread: ingest each member into `items`, then put None."""
+    def put(item):
+        # Give up if the consumer has gone away instead of blocking forever
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        with zipfile.ZipFile(export) as archive:
+            for info in archive.infolist():
+                if not _is_submission(archive, info):
+                    continue
+                member = parse_member_name(info.filename)
+                try:
+                    with archive.open(info) as source:
+                        item = (member, ingest(source), None)
+                except Exception as e:
+                    item = (member, None, e)
+                if not put(item):
+                    if item[1] is not None:
+                        item[1].close()
+                    return
+    except Exception as e:
+        put((None, None, e))
+    finally:
+        put(None)
+
+
+def read_export(export, queue_size=QUEUE_SIZE):
+    """Yield (ExportMember, Submission or None, error or None) for each file in an export.
+
+    `export` is a path or seekable file. Members are read on a background
+    thread at most `queue_size` ahead of the caller. The caller closes each
+    Submission. A broken export is reported as one item with no member.
+    """
+    items = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    reader = threading.Thread(target=_read_members, args=(export, items, stop), daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = items.get()
+            if item is None:
+                return
+            yield item
+    finally:
+        stop.set()
+        # Close whatever the reader had queued but the caller never took
+        while True:
+            try:
+                item = items.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1] is not None:
+                item[1].close()
+        reader.join()
+
+
+def _record(member, assignment):
+    return {
+        "student": member.student,
+        "student_id": member.student_id,
+        "file": member.original,
+        "member": member.name,
+        "late": member.late,
+        "assignment": assignment,
+        "digest": None,
+        "percentage": None,
+        "points": None,
+        "error": "",
+        "warnings": "",
+        "Grading Criteria": [],
+        "Completed": [],
+    }
+
+
+def grade_export(export, workers=None, queue_size=QUEUE_SIZE, assignment=None):
+    """Grade every submission in an LMS export zip, returning gradebook records in archive order.
+
+    Each file's assignment is detected from its contents unless `assignment`
+    is given. Files that can't be matched to an assignment, or fail to
+    ingest or grade, get a record with the error.
+    """
+    records = []
+    jobs = []
+    workers = workers or WORKERS
+    # Jobs handed to the pool at once, each a temporary file on disk: enough
+    # to keep every worker busy without copying the whole export out
+    in_flight = threading.BoundedSemaphore(queue_size + workers)
+    pool = WorkerPool(workers)
+    try:
+        for member, submission, error in read_export(export, queue_size):
+            if member is None:
+                raise error
+            record = _record(member, assignment)
+            records.append(record)
+            if error is not None:
+                record["error"] = str(error)
+                continue
+            with submission:
+                record["digest"] = submission.digest
+                record["warnings"] = "; ".join(submission.warnings)
+                record["assignment"] = assignment or detect_assignment(submission.file)
+                if record["assignment"] is None:
+                    record["error"] = "Could not tell which assignment this file is for."
+                    continue
+                in_flight.acquire()
+                job = submit_saved(pool, record["assignment"], submission, member.original)
+            job.add_done_callback(lambda _: in_flight.release())
+            jobs.append((record, job))
+
+        for record, job in jobs:
+            try:
+                checklist_data, _ = job.result()
+            except LimitExceeded as e:
+                record["error"] = str(e)
+                record["limit"] = e.limit
+                continue
+            except Exception as e:
+                record["error"] = str(e)
+                continue
+            percentage_complete, points = score_results(checklist_data)
+            record["percentage"] = round(percentage_complete, 1)
+            record["points"] = round(points, 1)
+            record["Grading Criteria"] = checklist_data["Grading Criteria"]
+            record["Completed"] = checklist_data["Completed"]
+    finally:
+        pool.shutdown()
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade every submission in an LMS export zip.")
+    parser.add_argument("export", help="The LMS export (.zip)")
+    parser.add_argument("-o", "--output", default="gradebook.csv",
+                        help="Gradebook file to write (.csv or .json); one per assignment is written"
+                             " as NAME-ASSIGNMENT.csv when the export mixes assignments")
+    parser.add_argument("-a", "--assignment", choices=sorted(ASSIGNMENTS), default=None,
+                        help="Grade every file as this assignment instead of detecting it")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: all cores)")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE,
+                        help="Files read ahead of the graders")
+    args = parser.parse_args(argv)
+
+    records = grade_export(args.export, args.workers, args.queue_size, args.assignment)
+    by_assignment = {}
+    for record in records:
+        by_assignment.setdefault(record["assignment"] or "unknown", []).append(record)
+
+    if len(by_assignment) == 1:
+        outputs = {args.output: records}
+    else:
+        output = Path(args.output)
+        outputs = {str(output.with_name(f"{output.stem}-{name}{output.suffix}")): group
+                   for name, group in by_assignment.items()}
+    for output, group in outputs.items():
+        write_gradebook(group, output)
+
+    failed = sum(1 for r in records if r["error"])
+    summary = ", ".join(f"{len(group)} {name}" for name, group in sorted(by_assignment.items()))
+    print(f"Graded {len(records)} submissions ({summary}; {failed} failed) -> {', '.join(outputs)}")
+    limits = Counter(r["limit"] for r in records if r.get("limit"))
+    if limits:
+        print("Stopped for exceeding limits: " + ", ".join(f"{count} {limit}" for limit, count in sorted(limits.items())))
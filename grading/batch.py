@@ -0,0 +1,201 @@
+import argparse
+import csv
+import json
+import os
+from collections import Counter
+from pathlib import Path
+
+from checkers.registry import ASSIGNMENTS, XLSX_BACKENDS, grade_submission
+from grading.features import FeatureStore, grade_with_features
+from grading.gradebook import Gradebook
+from grading.workers import LimitExceeded, WorkerPool
+from utils.ingest import digest_file, ingest
+from utils.instrumentation import Trace, stage, tracing
+from utils.scoring import score_results
+
+
+def _new_record(assignment, path):
+    return {
+        "student": path.stem,
+        "file": path.name,
+        "assignment": assignment,
+        "digest": None,
+        "percentage": None,
+        "points": None,
+        "error": "",
+        "warnings": "",
+        "Grading Criteria": [],
+        "Completed": [],
+    }
+
+
+def grade_file(assignment, path, backend=None, features=None):
+    """Grade one submission file and return a gradebook record.
+
+    With a `features` folder the file is graded from its stored feature
+    record (see grading.features), which is extracted and saved first if
+    this content has not been seen before.
+    """
+    path = Path(path)
+    record = _new_record(assignment, path)
+    try:
+        # Stage timings go to GRADER_TIMINGS_LOG when it is set
+        with tracing(Trace(assignment, path.name)) as trace:
+            with stage("ingest"):
+                submission = ingest(path)
+            with submission:
+                trace.digest = record["digest"] = submission.digest
+                record["warnings"] = "; ".join(submission.warnings)
+                if features is None:
+                    checklist_data = grade_submission(assignment, submission.file, backend)
+                else:
+                    checklist_data = grade_with_features(assignment, submission.file, submission.digest,
+                                                         FeatureStore(features), backend)
+        percentage_complete, points = score_results(checklist_data)
+        record["percentage"] = round(percentage_complete, 1)
+        record["points"] = round(points, 1)
+        record["Grading Criteria"] = checklist_data["Grading Criteria"]
+        record["Completed"] = checklist_data["Completed"]
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def find_submissions(directory, assignment):
+    """List the files in a directory that match the assignment's file type."""
+    extension = ASSIGNMENTS[assignment]["extension"]
+    return sorted(
+        path for path in Path(directory).rglob(f"*.{extension}")
+        # Skip Office lock files left behind by open documents
+        if path.is_file() and not path.name.startswith("~$")
+    )
+
+
+def grade_paths(assignment, paths, workers=None, backend=None, features=None):
+    """Grade a list of submission files in worker processes.
+
+    Each file is graded under the time and memory limits of grading.workers.
+    A file that breaks one gets a record with the error and the limit hit
+    ("limit") while the rest of the run carries on.
+    """
+    if not paths:
+        return []
+
+    pool = WorkerPool(workers or os.cpu_count() or 1)
+    try:
+        jobs = [pool.submit(grade_file, assignment, path, backend, features) for path in paths]
+        records = []
+        for path, job in zip(paths, jobs):
+            try:
+                records.append(job.result())
+            except Exception as e:
+                record = _new_record(assignment, Path(path))
+                record["error"] = str(e)
+                if isinstance(e, LimitExceeded):
+                    record["limit"] = e.limit
+                records.append(record)
+    finally:
+        pool.shutdown()
+    return records
+
+
+def grade_directory(assignment, directory, workers=None, backend=None, gradebook=None, features=None):
+    """Grade every submission in a directory in worker processes.
+
+    With a Gradebook, files whose content and checker version already have
+    stored results are not graded again; their stored records are returned
+    instead, and the newly graded records are saved in one batch.
+    """
+    paths = find_submissions(directory, assignment)
+    if gradebook is None:
+        return grade_paths(assignment, paths, workers, backend, features)
+
+    graded = gradebook.graded(assignment)
+    digests = {path: digest_file(path) for path in paths}
+    pending = [path for path in paths if (path.stem, digests[path]) not in graded]
+
+    fresh = dict(zip(pending, grade_paths(assignment, pending, workers, backend, features)))
+    for path, record in fresh.items():
+        # Files rejected before hashing still get a row under their raw digest
+        record["digest"] = record["digest"] or digests[path]
+    gradebook.record(fresh.values())
+
+    return [
+        fresh[path] if path in fresh else gradebook.lookup(path.stem, assignment, digests[path])
+        for path in paths
+    ]
+
+
+# Gradebook columns written when any record has them (e.g. LMS exports, see
+# grading.archive), so grades can be matched back to the LMS's students
+OPTIONAL_FIELDS = ["student_id", "member", "late", "limit"]
+
+
+def write_gradebook(records, output):
+    """Write graded records as JSON or CSV, chosen by the output extension."""
+    output = Path(output)
+    if output.suffix.lower() == ".json":
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=2)
+        return
+
+    criteria = next((r["Grading Criteria"] for r in records if r["Grading Criteria"]), [])
+    columns = ["student"] + [name for name in OPTIONAL_FIELDS if any(name in r for r in records)]
+    columns += ["file", "assignment", "percentage", "points", "error", "warnings"]
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns + criteria)
+        writer.writeheader()
+        for record in records:
+            row = {name: record.get(name) for name in columns}
+            row.update(zip(record["Grading Criteria"], record["Completed"]))
+            writer.writerow(row)
+
+
+def print_statistics(matrix, hardest=5):
+    """Print a cohort's score histogram and its least-passed criteria."""
+    if not len(matrix):
+        return
+    counts, edges = matrix.score_histogram()
+    print(f"Mean points {matrix.scores().mean():.1f}/20 over {len(matrix)} graded submissions")
+    for count, low, high in zip(counts, edges, edges[1:]):
+        print(f"  {low:4.0f}-{high:<4.0f} {count:6d} {'#' * round(40 * count / len(matrix))}")
+    print("Least-passed criteria:")
+    for text, rate in matrix.hardest(hardest):
+        print(f"  {rate:6.1%}  {text}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade a folder of submissions for one assignment.")
+    parser.add_argument("assignment", choices=sorted(ASSIGNMENTS))
+    parser.add_argument("directory", help="Folder containing the submissions")
+    parser.add_argument("-o", "--output", default="gradebook.csv",
+                        help="Gradebook file to write (.csv or .json)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: all cores)")
+    parser.add_argument("--backend", choices=XLSX_BACKENDS, default=None,
+                        help="Reader for .xlsx files (default: openpyxl)")
+    parser.add_argument("--db", default=None,
+                        help="SQLite gradebook to store results in; files already graded there are skipped")
+    parser.add_argument("--features", default=None,
+                        help="Folder of extracted features; files seen before are graded without being parsed")
+    parser.add_argument("--stats", action="store_true",
+                        help="Print score histogram and the least-passed criteria")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        with Gradebook(args.db) as gradebook:
+            records = grade_directory(args.assignment, args.directory, args.workers, args.backend, gradebook,
+                                      args.features)
+    else:
+        records = grade_directory(args.assignment, args.directory, args.workers, args.backend,
+                                  features=args.features)
+    write_gradebook(records, args.output)
+
+    failed = sum(1 for r in records if r["error"])
+    print(f"Graded {len(records)} submissions ({failed} failed) -> {args.output}")
+    limits = Counter(r["limit"] for r in records if r.get("limit"))
+    if limits:
+        print("Stopped for exceeding limits: " + ", ".join(f"{count} {limit}" for limit, count in sorted(limits.items())))
+    if args.stats:
+        from grading.results import ResultMatrix
+        print_statistics(ResultMatrix.from_records(args.assignment, records))
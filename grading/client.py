@@ -0,0 +1,126 @@
+"""A small client for the grading service, for local testing and scripts.
+
+    client = GradingClient("http://127.0.0.1:8000")
+    result = client.grade("excel_1", "smith.xlsx")
+    batch = client.submit_batch("word_1", ["a.docx", "b.docx"])
+    results = client.wait_for_batch(batch["id"])
+
+running() starts a service in a background thread on a free port, so the
+whole round trip can be exercised without deploying anything:
+
+    with running(GradingService(GradingPool(2))) as url:
+        GradingClient(url).grade("ppt_1", "deck.pptx")
+"""
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from grading.service import make_server
+
+
+class ServiceError(Exception):
+    """The service answered with an error status."""
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _multipart(paths):
+    """Encode files as multipart/form-data "file" fields; return (content type, body)."""
+    boundary = uuid.uuid4().hex
+    body = bytearray()
+    for path in paths:
+        path = Path(path)
+        body += (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{path.name}\"\r\n"
+                 "Content-Type: application/octet-stream\r\n\r\n").encode("utf-8")
+        body += path.read_bytes() + b"\r\n"
+    body += f"--{boundary}--\r\n".encode("ascii")
+    return f"multipart/form-data; boundary={boundary}", bytes(body)
+
+
+class GradingClient:
+    """Calls a grading service over HTTP; every method returns the decoded JSON."""
+
+    def __init__(self, url, timeout=120):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method, path, body=None, content_type=None):
+        request = Request(f"{self.url}{path}", data=body, method=method)
+        if content_type:
+            request.add_header("Content-Type", content_type)
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except HTTPError as e:
+            try:
+                message = json.load(e).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            retry_after = e.headers.get("Retry-After")
+            raise ServiceError(e.code, message, int(retry_after) if retry_after else None) from None
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def assignments(self):
+        return self._request("GET", "/assignments")
+
+    def grade(self, assignment, path, wait=True):
+        """Upload one file; the result, or the pending job when wait is False."""
+        content_type, body = _multipart([path])
+        return self._request("POST", f"/grade/{assignment}?wait={int(wait)}", body, content_type)
+
+    def grade_path(self, assignment, path, wait=True):
+        """Grade a file the service reads itself, relative to its --root."""
+        body = json.dumps({"path": str(path)}).encode("utf-8")
+        return self._request("POST", f"/grade/{assignment}?wait={int(wait)}", body, "application/json")
+
+    def submit_batch(self, assignment, paths, upload=True):
+        """Queue several files at once; returns {"id": batch id, "jobs": [job ids]}.
+
+        With upload=False the paths are sent for the service to read under its root.
+        """
+        if upload:
+            content_type, body = _multipart(paths)
+        else:
+            content_type, body = "application/json", json.dumps({"paths": [str(p) for p in paths]}).encode("utf-8")
+        return self._request("POST", f"/batches/{assignment}", body, content_type)
+
+    def job(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def batch(self, batch_id):
+        return self._request("GET", f"/batches/{batch_id}")
+
+    def wait_for_batch(self, batch_id, interval=0.5, timeout=None):
+        """Poll a batch until every job has finished; return its job results."""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            batch = self.batch(batch_id)
+            if batch["finished"] == batch["total"]:
+                return batch["jobs"]
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Batch {batch_id} still has {batch['total'] - batch['finished']} jobs pending")
+            time.sleep(interval)
+
+
+@contextmanager
+def running(service, host="127.0.0.1"):
+    """Serve `service` on a free port in a background thread; yields its URL."""
+    server = make_server(service, host, 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
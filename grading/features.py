@@ -0,0 +1,142 @@
+"""Grade from extracted features instead of re-parsing submission files.
+
+Grading is split in two stages. extract() opens a submission once and keeps
+only what the checkers read, as a small JSON-safe record: for workbooks the
+header and data cells inside the assignment's bounds with their style ids,
+merged ranges and chart titles (utils.feature_workbook); for documents the
+paragraph and margin facts (checkers.word.analysis.DocumentFacts); for
+decks the slide facts (checkers.powerpoint.inspector). evaluate() runs the
+checker over a record alone.
+
+Rubric-based checkers also keep a memo of criterion results in the record,
+keyed by each criterion's fingerprint, so after a rubric edit only the
+criteria that changed are evaluated again; bumping an assignment's
+"version" in the registry discards the memo but keeps the features.
+FeatureStore keeps the records on disk by FEATURES_VERSION, the
+assignment's bounds and content hash (all that changes what is extracted),
+so re-grading a cohort after a rubric change never opens a submission file.
+"""
+import gzip
+import json
+import os
+from pathlib import Path
+
+from checkers.registry import ASSIGNMENTS, get_checker, get_rubric, load_submission
+from utils.instrumentation import stage
+
+# Bump when the shape of a record changes so stored ones are extracted again
+FEATURES_VERSION = 4
+
+
+def checker_version(assignment):
+    return ASSIGNMENTS[assignment]["version"]
+
+
+def _extracted_with(assignment):
+    """What a record's features depend on besides the file: the record format and cell bounds."""
+    return FEATURES_VERSION, ASSIGNMENTS[assignment].get("bounds")
+
+
+def extract(assignment, file, backend=None):
+    """Open a submission and return its feature record."""
+    extension = ASSIGNMENTS[assignment]["extension"]
+    submission = load_submission(assignment, file, backend)
+    try:
+        if extension == "xlsx":
+            from utils.feature_workbook import workbook_features
+            features = workbook_features(submission, ASSIGNMENTS[assignment]["bounds"])
+        elif extension == "docx":
+            from checkers.word.analysis import DocumentFacts
+            features = DocumentFacts.from_document(submission).to_features()
+        else:
+            features = submission.to_features()
+    finally:
+        if hasattr(submission, "close"):
+            submission.close()
+    return {"version": FEATURES_VERSION, "assignment": assignment, "bounds": ASSIGNMENTS[assignment].get("bounds"),
+            "checker_version": checker_version(assignment), "features": features, "memo": {}}
+
+
+def load_features(record):
+    """Rebuild what an assignment's checker takes from a feature record."""
+    extension = ASSIGNMENTS[record["assignment"]]["extension"]
+    if extension == "xlsx":
+        from utils.feature_workbook import FeatureWorkbook
+        return FeatureWorkbook(record["features"])
+    if extension == "docx":
+        from checkers.word.analysis import DocumentFacts
+        return DocumentFacts.from_features(record["features"])
+    from checkers.powerpoint.inspector import DeckInspection
+    return DeckInspection.from_features(record["features"])
+
+
+def evaluate(assignment, record):
+    """Run an assignment's checker over a feature record, returning the checklist data.
+
+    A rubric only runs the criteria missing from the record's memo and
+    stores their results there; hand-written checkers run in full. A memo
+    kept under another checker version is discarded first.
+    """
+    submission = load_features(record)
+    rubric = get_rubric(assignment)
+    if rubric is not None:
+        memo = record.setdefault("memo", {})
+        if record.get("checker_version") != checker_version(assignment):
+            memo.clear()
+            record["checker_version"] = checker_version(assignment)
+        checklist_data = rubric.grade(submission, memo)
+    else:
+        checklist_data = get_checker(assignment)(submission)
+    checklist_data["Completed"] = list(checklist_data["Completed"])
+    return checklist_data
+
+
+class FeatureStore:
+    """Feature records saved as gzipped JSON files in a folder."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, assignment, digest):
+        version, bounds = _extracted_with(assignment)
+        bounds = f"-{bounds.replace(':', '-')}" if bounds else ""
+        return self.directory / f"{assignment}-f{version}{bounds}-{digest}.json.gz"
+
+    def get(self, assignment, digest):
+        """Return the stored record, or None if it is missing or was extracted differently.
+
+        A record from another checker version is still returned; evaluate()
+        drops its memo.
+        """
+        try:
+            with gzip.open(self._path(assignment, digest), "rt", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (record.get("version"), record.get("bounds")) != _extracted_with(assignment):
+            return None
+        return record
+
+    def put(self, assignment, digest, record):
+        path = self._path(assignment, digest)
+        # Write then rename, so a parallel reader never sees half a file
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with gzip.open(temporary, "wt", encoding="utf-8") as f:
+            json.dump(record, f, separators=(",", ":"))
+        os.replace(temporary, path)
+
+
+def grade_with_features(assignment, file, digest, store, backend=None):
+    """Grade a submission from its stored features, extracting them on first sight."""
+    record = store.get(assignment, digest)
+    changed = record is None
+    if record is None:
+        with stage("extract"):
+            record = extract(assignment, file, backend)
+    before = (record.get("checker_version"), dict(record["memo"]))
+    with stage("evaluate"):
+        checklist_data = evaluate(assignment, record)
+    if changed or (record.get("checker_version"), record["memo"]) != before:
+        store.put(assignment, digest, record)
+    return checklist_data
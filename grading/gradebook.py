@@ -0,0 +1,206 @@
+"""A SQLite gradebook that keeps every graded submission.
+
+submissions holds one row per (student, assignment, content hash, checker
+version), with the score and any error. criteria holds each assignment
+version's criterion texts in order. results holds one pass/fail row per
+submission and criterion. A submission whose bytes and checker version
+already have results is never graded again, so re-running a cohort only
+grades the files that changed.
+"""
+import sqlite3
+import threading
+
+from checkers.registry import ASSIGNMENTS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY,
+    student TEXT NOT NULL,
+    assignment TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    file TEXT,
+    percentage REAL,
+    points REAL,
+    error TEXT NOT NULL DEFAULT '',
+    warnings TEXT NOT NULL DEFAULT '',
+    graded_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- Leads with student, so it also serves per-student queries
+    UNIQUE (student, assignment, digest, version)
+);
+CREATE INDEX IF NOT EXISTS submissions_by_assignment ON submissions (assignment, version);
+
+CREATE TABLE IF NOT EXISTS criteria (
+    id INTEGER PRIMARY KEY,
+    assignment TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    UNIQUE (assignment, version, position)
+);
+
+CREATE TABLE IF NOT EXISTS results (
+    submission_id INTEGER NOT NULL REFERENCES submissions (id) ON DELETE CASCADE,
+    criterion_id INTEGER NOT NULL REFERENCES criteria (id),
+    passed INTEGER NOT NULL,
+    PRIMARY KEY (submission_id, criterion_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_by_criterion ON results (criterion_id, passed);
+"""
+
+
+class Gradebook:
+    """Graded submissions stored in a SQLite file (or ":memory:").
+
+    Safe to share between threads; access is serialised by a lock.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA foreign_keys = ON")
+            if self.path != ":memory:":
+                self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _criterion_ids(self, assignment, version, texts):
+        """Return the criterion ids for an assignment version, adding new texts."""
+        self._db.executemany(
+            "INSERT OR IGNORE INTO criteria (assignment, version, position, text) VALUES (?, ?, ?, ?)",
+            [(assignment, version, position, text) for position, text in enumerate(texts)],
+        )
+        rows = self._db.execute(
+            "SELECT position, id FROM criteria WHERE assignment = ? AND version = ?",
+            (assignment, version),
+        )
+        ids = dict(rows.fetchall())
+        return [ids[position] for position in range(len(texts))]
+
+    def record(self, records):
+        """Store gradebook records (as built by grading.batch.grade_file) in one transaction.
+
+        Each record needs student, assignment and digest. A record for a key
+        already stored replaces it, so a retried error overwrites the failure.
+        """
+        with self._lock, self._db:
+            for record in records:
+                assignment = record["assignment"]
+                version = ASSIGNMENTS[assignment]["version"]
+                key = (record["student"], assignment, record["digest"], version)
+                self._db.execute(
+                    "DELETE FROM submissions WHERE student = ? AND assignment = ? AND digest = ? AND version = ?",
+                    key,
+                )
+                cursor = self._db.execute(
+                    "INSERT INTO submissions (student, assignment, digest, version, file, percentage, points, error, warnings)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    key + (record.get("file"), record.get("percentage"), record.get("points"),
+                           record.get("error", ""), record.get("warnings", "")),
+                )
+                if record["Grading Criteria"]:
+                    criterion_ids = self._criterion_ids(assignment, version, record["Grading Criteria"])
+                    self._db.executemany(
+                        "INSERT INTO results (submission_id, criterion_id, passed) VALUES (?, ?, ?)",
+                        [(cursor.lastrowid, criterion_id, status == "Yes")
+                         for criterion_id, status in zip(criterion_ids, record["Completed"])],
+                    )
+
+    def graded(self, assignment, version=None):
+        """Return {(student, digest)} already graded without error at a checker version."""
+        version = ASSIGNMENTS[assignment]["version"] if version is None else version
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT student, digest FROM submissions WHERE assignment = ? AND version = ? AND error = ''",
+                (assignment, version),
+            ).fetchall()
+        return {(row["student"], row["digest"]) for row in rows}
+
+    def lookup(self, student, assignment, digest, version=None):
+        """Return the stored record for a submission, or None."""
+        version = ASSIGNMENTS[assignment]["version"] if version is None else version
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM submissions WHERE student = ? AND assignment = ? AND digest = ? AND version = ?",
+                (student, assignment, digest, version),
+            ).fetchone()
+            return self._to_record(row) if row is not None else None
+
+    def student_history(self, student):
+        """Every stored record for a student, newest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM submissions WHERE student = ? ORDER BY graded_at DESC, id DESC", (student,)
+            ).fetchall()
+            return [self._to_record(row) for row in rows]
+
+    def criterion_pass_rates(self, assignment, version=None):
+        """Return [(criterion text, submissions passing, submissions graded)] in rubric order."""
+        version = ASSIGNMENTS[assignment]["version"] if version is None else version
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT c.text, COALESCE(SUM(r.passed), 0), COUNT(r.passed) FROM criteria c"
+                " LEFT JOIN results r ON r.criterion_id = c.id"
+                " WHERE c.assignment = ? AND c.version = ? GROUP BY c.id ORDER BY c.position",
+                (assignment, version),
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def result_matrix(self, assignment, version=None):
+        """Every error-free submission's results for an assignment version, as a ResultMatrix."""
+        import numpy as np
+        from grading.results import ResultMatrix
+
+        version = ASSIGNMENTS[assignment]["version"] if version is None else version
+        with self._lock:
+            criteria = [row[0] for row in self._db.execute(
+                "SELECT text FROM criteria WHERE assignment = ? AND version = ? ORDER BY position",
+                (assignment, version),
+            )]
+            submissions = self._db.execute(
+                "SELECT id, student FROM submissions WHERE assignment = ? AND version = ? AND error = ''"
+                " ORDER BY id",
+                (assignment, version),
+            ).fetchall()
+            results = self._db.execute(
+                "SELECT r.submission_id, c.position, r.passed FROM results r"
+                " JOIN submissions s ON s.id = r.submission_id JOIN criteria c ON c.id = r.criterion_id"
+                " WHERE s.assignment = ? AND s.version = ? AND s.error = ''",
+                (assignment, version),
+            ).fetchall()
+        rows = {row["id"]: i for i, row in enumerate(submissions)}
+        passed = np.zeros((len(submissions), len(criteria)), dtype=bool)
+        if results:
+            ids, positions, values = np.array(results, dtype=np.int64).T
+            passed[[rows[i] for i in ids.tolist()], positions] = values.astype(bool)
+        return ResultMatrix(assignment, criteria, [row["student"] for row in submissions], passed)
+
+    def _to_record(self, row):
+        results = self._db.execute(
+            "SELECT c.text, r.passed FROM results r JOIN criteria c ON c.id = r.criterion_id"
+            " WHERE r.submission_id = ? ORDER BY c.position",
+            (row["id"],),
+        ).fetchall()
+        return {
+            "student": row["student"],
+            "file": row["file"],
+            "assignment": row["assignment"],
+            "digest": row["digest"],
+            "percentage": row["percentage"],
+            "points": row["points"],
+            "error": row["error"],
+            "warnings": row["warnings"],
+            "Grading Criteria": [text for text, _ in results],
+            "Completed": ["Yes" if passed else "No" for _, passed in results],
+        }
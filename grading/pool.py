@@ -0,0 +1,108 @@
+"""Grade uploads on a process pool shared by every session of the app.
+
+The app ingests each upload itself (spooling, hashing and size checks are
+cheap), then saves it to a temporary file that a worker process opens by
+path, so neither side holds the whole upload in memory, and several submissions
+grade at once without holding up the Streamlit script thread. Jobs are
+tracked by cache key: the same file uploaded twice, or seen again when a
+rerun interrupts the page, attaches to the job already in flight instead of
+being graded again. Finished results go into the shared result cache.
+
+Workers run under the time and memory limits of grading.workers: a
+submission that breaks one fails with LimitExceeded ("could not grade:
+exceeded limits") and its worker is replaced, while the other submissions
+carry on. limit_hits counts how often each limit was hit.
+"""
+import os
+import threading
+from concurrent.futures import Future
+
+from checkers.registry import grade_submission
+from grading.workers import WorkerPool
+from utils.cache import cache_key, default_cache
+from utils.instrumentation import Trace, stage, tracing
+
+# Worker processes for the app; 0 or unset uses every core
+WORKERS = int(os.environ.get("GRADER_WORKERS", 0)) or os.cpu_count() or 1
+
+
+def _grade_path(assignment, path, name, digest):
+    """Grade a submission saved at `path` in a worker, returning (checklist data, trace)."""
+    trace = Trace(assignment, name)
+    trace.digest = digest
+    with tracing(trace, log=False):
+        with stage("grade"), open(path, "rb") as f:
+            checklist_data = grade_submission(assignment, f)
+    return checklist_data, trace
+
+
+def submit_saved(pool, assignment, submission, name):
+    """Save an ingested submission to disk and queue it on a WorkerPool.
+
+    The file is deleted once the job finishes. Returns the job's Future.
+    """
+    path = submission.to_path()
+    try:
+        job = pool.submit(_grade_path, assignment, path, name, submission.digest)
+    except BaseException:
+        os.remove(path)
+        raise
+    job.add_done_callback(lambda _: os.remove(path))
+    return job
+
+
+class GradingPool:
+    """A process pool plus the grading jobs it has in flight."""
+
+    def __init__(self, workers=WORKERS, cache=None):
+        self.workers = workers
+        self.cache = cache or default_cache
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn, not fork: the Streamlit server process is multi-threaded
+            self._executor = WorkerPool(self.workers, context="spawn")
+        return self._executor
+
+    @property
+    def limit_hits(self):
+        """{"time" | "memory" | "crashed": submissions stopped} since the pool started."""
+        return dict(self._executor.limit_hits) if self._executor is not None else {}
+
+    def submit(self, assignment, submission, name=None):
+        """Queue an ingested submission and return a Future of (checklist data, trace).
+
+        A cached result comes back as an already finished Future.
+        """
+        key = cache_key(assignment, submission.digest)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                return job
+
+            checklist_data = self.cache.get(key)
+            if checklist_data is not None:
+                trace = Trace(assignment, name)
+                trace.digest = submission.digest
+                done = Future()
+                done.set_result(({k: list(v) for k, v in checklist_data.items()}, trace))
+                return done
+
+            job = submit_saved(self._pool(), assignment, submission, name)
+            self._jobs[key] = job
+        job.add_done_callback(lambda future: self._finish(key, future))
+        return job
+
+    def _finish(self, key, future):
+        with self._lock:
+            self._jobs.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result()[0])
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,156 @@
+"""Grading results for a cohort as one boolean matrix.
+
+A checklist is two parallel lists of strings; thousands of them take a lot
+of memory and every cohort question means counting "Yes" strings again.
+ResultMatrix keeps one row per submission and one column per criterion in
+a NumPy bool array, so pass rates, scores and histograms are single
+vectorized reductions, and to_bytes() packs it to one bit per result.
+
+Criterion ids are stable: a short hash of the assignment and criterion
+text, so a criterion keeps its id across checker versions (and moves
+between positions) for as long as its wording is unchanged.
+
+    matrix = ResultMatrix.from_records("excel_3", records)
+    matrix.pass_rates()
+    hardest_criteria([matrix, word_matrix])
+"""
+import hashlib
+import json
+import struct
+
+import numpy as np
+
+from checkers.registry import ASSIGNMENTS
+
+
+def criterion_id(assignment, text):
+    """A stable id for a criterion: 12 hex digits of a hash of its assignment and text."""
+    return hashlib.sha1(f"{assignment}\0{text}".encode("utf-8")).hexdigest()[:12]
+
+
+class ResultMatrix:
+    """Pass/fail results of one assignment's criteria for many submissions."""
+
+    def __init__(self, assignment, criteria, students=(), passed=None):
+        self.assignment = assignment
+        self.criteria = list(criteria)
+        self.ids = [criterion_id(assignment, text) for text in self.criteria]
+        self._column = {criterion: i for i, criterion in enumerate(self.ids)}
+        self.students = list(students)
+        width = len(self.criteria)
+        if passed is None or width == 0:
+            # With no criteria there is nothing to reshape: every row is empty
+            passed = np.zeros((len(self.students), width), dtype=bool)
+        self._passed = np.asarray(passed, dtype=bool).reshape(-1, width) if width else passed
+        self._rows = len(self.students)
+
+    @property
+    def passed(self):
+        """The (submissions x criteria) bool array."""
+        return self._passed[:self._rows]
+
+    def __len__(self):
+        return self._rows
+
+    def add(self, student, checklist_data):
+        """Append one submission's checklist; its criteria are matched by text."""
+        if self._rows == len(self._passed):
+            # Grow geometrically so appending a cohort stays linear
+            grown = np.zeros((max(16, 2 * self._rows), len(self.criteria)), dtype=bool)
+            grown[:self._rows] = self._passed[:self._rows]
+            self._passed = grown
+        row = self._passed[self._rows]
+        row[:] = False
+        for text, status in zip(checklist_data["Grading Criteria"], checklist_data["Completed"]):
+            column = self._column.get(criterion_id(self.assignment, text))
+            if column is not None:
+                row[column] = status == "Yes"
+        self.students.append(student)
+        self._rows += 1
+
+    @classmethod
+    def from_records(cls, assignment, records):
+        """Build a matrix from gradebook records (see grading.batch), skipping failed ones."""
+        graded = [record for record in records if record["Grading Criteria"] and not record["error"]]
+        criteria = graded[0]["Grading Criteria"] if graded else []
+        matrix = cls(assignment, criteria)
+        for record in graded:
+            matrix.add(record["student"], record)
+        return matrix
+
+    def row(self, student):
+        """One submission's results as checklist data."""
+        passed = self.passed[self.students.index(student)]
+        return {
+            "Grading Criteria": list(self.criteria),
+            "Completed": ["Yes" if value else "No" for value in passed],
+        }
+
+    def column(self, criterion):
+        """The results of one criterion, given by its id or text."""
+        if criterion not in self._column:
+            criterion = criterion_id(self.assignment, criterion)
+        return self.passed[:, self._column[criterion]]
+
+    def pass_rates(self):
+        """Fraction of submissions passing each criterion, in criterion order."""
+        if not self._rows:
+            return np.zeros(len(self.criteria))
+        return self.passed.mean(axis=0)
+
+    def scores(self, max_points=20):
+        """Each submission's points, as utils.scoring.score_results computes them."""
+        if not self.criteria:
+            return np.zeros(self._rows)
+        return self.passed.sum(axis=1) * (max_points / len(self.criteria))
+
+    def score_histogram(self, bins=10, max_points=20):
+        """(counts, bin edges) of the submission scores over 0..max_points."""
+        return np.histogram(self.scores(max_points), bins=bins, range=(0, max_points))
+
+    def hardest(self, count=3):
+        """[(criterion text, pass rate)] for the least-passed criteria."""
+        rates = self.pass_rates()
+        order = np.argsort(rates, kind="stable")[:count]
+        return [(self.criteria[i], float(rates[i])) for i in order]
+
+    def to_bytes(self):
+        """A header of assignment, criteria and students, then one bit per result."""
+        header = json.dumps({
+            "assignment": self.assignment,
+            "criteria": self.criteria,
+            "students": self.students,
+        }).encode("utf-8")
+        return struct.pack("<I", len(header)) + header + np.packbits(self.passed, axis=None).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        (length,) = struct.unpack_from("<I", data)
+        header = json.loads(data[4:4 + length])
+        shape = (len(header["students"]), len(header["criteria"]))
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8, offset=4 + length), count=shape[0] * shape[1])
+        return cls(header["assignment"], header["criteria"], header["students"], bits.reshape(shape))
+
+
+def hardest_criteria(matrices, count=3, section=None):
+    """The least-passed criteria per section, across several assignments' matrices.
+
+    `section` maps an assignment id to its section; by default assignments
+    are grouped by file type, as the app groups its uploaders. Returns
+    {section: [(assignment, criterion text, pass rate)]}, hardest first.
+    """
+    section = section or (lambda assignment: ASSIGNMENTS[assignment]["extension"])
+    grouped = {}
+    for matrix in matrices:
+        if not len(matrix):
+            continue
+        rates = matrix.pass_rates()
+        entries = grouped.setdefault(section(matrix.assignment), ([], []))
+        entries[0].extend((matrix.assignment, text) for text in matrix.criteria)
+        entries[1].append(rates)
+    hardest = {}
+    for name, (labels, rates) in grouped.items():
+        rates = np.concatenate(rates)
+        order = np.argsort(rates, kind="stable")[:count]
+        hardest[name] = [(*labels[i], float(rates[i])) for i in order]
+    return hardest
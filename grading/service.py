@@ -0,0 +1,464 @@
+"""A headless HTTP service that grades submissions for an LMS.
+
+Submissions are ingested in the request thread (size and zip-bomb checks,
+hashing) and graded on the shared worker pool of grading.pool, so repeated
+files hit the result cache. At most `max_pending` submissions may be
+waiting or grading at once; past that, requests get 429 Too Many Requests
+with a Retry-After header instead of queueing without bound. Capacity is
+checked before a request body is read, and uploaded files are streamed into
+spooled temporary files rather than buffered, so a rush of requests costs
+neither memory nor disk just to be turned away.
+
+Endpoints (all responses are JSON):
+
+    GET  /health                       pool size, submissions in flight and limit hits
+    GET  /assignments                  gradable assignment ids and titles
+    POST /grade/<assignment>           grade one file; waits for the result
+                                       unless ?wait=0, then 202 with a job id
+    POST /batches/<assignment>         queue several files, 202 with a batch id
+    GET  /jobs/<id>                    one job's status and result
+    GET  /batches/<id>                 every job of a batch
+
+Files are sent as multipart/form-data "file" fields, or as a JSON body
+{"path": ...} / {"paths": [...]} naming files under the folder given by
+--root (GRADER_SERVICE_ROOT); paths are refused when no root is set.
+A finished job's result is the checklist plus "percentage" and "points".
+
+    python grading_service.py --port 8000 --workers 4
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from email import policy
+from email.parser import BytesParser
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from checkers.registry import ASSIGNMENTS
+from grading.pool import WORKERS, GradingPool
+from utils.ingest import CHUNK_SIZE, SPOOL_MEMORY_BYTES, SubmissionRejected, ingest
+from utils.instrumentation import logger
+from utils.scoring import score_results
+
+MAX_PENDING = int(os.environ.get("GRADER_SERVICE_MAX_PENDING", 256))
+# A request body: room for one large submission, or a batch of typical ones
+MAX_REQUEST_BYTES = int(os.environ.get("GRADER_SERVICE_MAX_REQUEST_BYTES", 64 * 1024 * 1024))
+MAX_JSON_BYTES = 1024 * 1024
+MAX_PART_HEADER_BYTES = 16 * 1024
+# How long POST /grade waits for a result before answering 202 with the job id
+WAIT_SECONDS = float(os.environ.get("GRADER_SERVICE_WAIT_SECONDS", 60))
+# Finished jobs kept for polling; the oldest are forgotten first
+KEEP_JOBS = int(os.environ.get("GRADER_SERVICE_KEEP_JOBS", 10000))
+RETRY_AFTER_SECONDS = 5
+
+
+class ServiceBusy(Exception):
+    """Too many submissions are in flight to accept more now."""
+
+
+class BadRequest(Exception):
+    """The request cannot be graded as sent."""
+
+    def __init__(self, message, status=HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+
+class Job:
+    """One submission queued on the pool."""
+
+    def __init__(self, assignment, name):
+        self.id = uuid.uuid4().hex
+        self.assignment = assignment
+        self.name = name
+        self.warnings = []
+        self.future = None
+        self.submitted = time.time()
+
+    def to_json(self):
+        job = {"id": self.id, "assignment": self.assignment, "file": self.name, "submitted": self.submitted}
+        if self.future is None or not self.future.done():
+            return {**job, "status": "pending"}
+        try:
+            checklist_data, _ = self.future.result()
+        except Exception as e:
+            return {**job, "status": "error", "error": str(e)}
+        percentage_complete, points = score_results(checklist_data)
+        return {
+            **job,
+            "status": "done",
+            "percentage": round(percentage_complete, 1),
+            "points": round(points, 1),
+            "warnings": self.warnings,
+            "Grading Criteria": checklist_data["Grading Criteria"],
+            "Completed": checklist_data["Completed"],
+        }
+
+
+class GradingService:
+    """Accepts submissions, grades them on a GradingPool and keeps jobs for polling."""
+
+    def __init__(self, pool=None, max_pending=MAX_PENDING, root=None):
+        self.pool = pool or GradingPool(WORKERS)
+        self.max_pending = max_pending
+        self.root = Path(root).resolve() if root else None
+        self._pending = 0
+        self._jobs = OrderedDict()
+        self._batches = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def check_capacity(self, assignment):
+        """Refuse a request before its body is read: unknown assignment or no free slot."""
+        if assignment not in ASSIGNMENTS:
+            raise BadRequest(f"Unknown assignment: {assignment}", HTTPStatus.NOT_FOUND)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ServiceBusy(f"{self._pending} submissions are already being graded.")
+
+    def _reserve(self, count):
+        with self._lock:
+            if count > self.max_pending:
+                raise BadRequest(f"A batch may hold at most {self.max_pending} files.",
+                                 HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            if self._pending + count > self.max_pending:
+                raise ServiceBusy(f"{self._pending} submissions are already being graded.")
+            self._pending += count
+
+    def _release(self, count=1):
+        with self._lock:
+            self._pending -= count
+
+    def _remember(self, job):
+        with self._lock:
+            self._jobs[job.id] = job
+            evicted = False
+            while len(self._jobs) > KEEP_JOBS:
+                oldest = next(iter(self._jobs))
+                if self._jobs[oldest].future is not None and not self._jobs[oldest].future.done():
+                    break
+                del self._jobs[oldest]
+                evicted = True
+            # Batches go once every job in them has been forgotten
+            while evicted and self._batches:
+                oldest = next(iter(self._batches))
+                if any(job_id in self._jobs for job_id in self._batches[oldest]):
+                    break
+                del self._batches[oldest]
+
+    def resolve_path(self, path):
+        """A submission path under the service root; anything else is refused."""
+        if self.root is None:
+            raise BadRequest("Grading by path is disabled; start the service with --root.", HTTPStatus.FORBIDDEN)
+        resolved = (self.root / path).resolve()
+        if not resolved.is_relative_to(self.root) or not resolved.is_file():
+            raise BadRequest(f"No submission at {path}.", HTTPStatus.NOT_FOUND)
+        return resolved
+
+    def _start(self, assignment, source, name):
+        """Ingest one reserved submission and queue it; releases its slot on failure."""
+        job = Job(assignment, name)
+        try:
+            with ingest(source) as submission:
+                job.warnings = submission.warnings
+                job.future = self.pool.submit(assignment, submission, name)
+        except SubmissionRejected as e:
+            self._release()
+            raise BadRequest(f"{name}: {e}", HTTPStatus.UNPROCESSABLE_ENTITY)
+        except Exception:
+            self._release()
+            raise
+        job.future.add_done_callback(lambda _: self._release())
+        self._remember(job)
+        return job
+
+    def submit(self, assignment, source, name):
+        """Queue one submission (a file object or path); return its Job."""
+        if assignment not in ASSIGNMENTS:
+            raise BadRequest(f"Unknown assignment: {assignment}", HTTPStatus.NOT_FOUND)
+        self._reserve(1)
+        return self._start(assignment, source, name)
+
+    def submit_batch(self, assignment, sources):
+        """Queue [(source, name)] as one batch; return (batch id, jobs).
+
+        The whole batch is admitted or refused at once. A file that fails
+        ingest becomes an error job rather than failing the batch.
+        """
+        if assignment not in ASSIGNMENTS:
+            raise BadRequest(f"Unknown assignment: {assignment}", HTTPStatus.NOT_FOUND)
+        if not sources:
+            raise BadRequest("The batch has no files.")
+        self._reserve(len(sources))
+        jobs = []
+        for source, name in sources:
+            try:
+                jobs.append(self._start(assignment, source, name))
+            except Exception as e:
+                jobs.append(self._failed(assignment, name, e))
+        batch_id = uuid.uuid4().hex
+        with self._lock:
+            self._batches[batch_id] = [job.id for job in jobs]
+        return batch_id, jobs
+
+    def _failed(self, assignment, name, error):
+        job = Job(assignment, name)
+        job.future = Future()
+        job.future.set_exception(error)
+        self._remember(job)
+        return job
+
+    def job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def batch(self, batch_id):
+        """The batch's jobs (forgotten ones are left out), or None."""
+        with self._lock:
+            ids = self._batches.get(batch_id)
+            if ids is None:
+                return None
+            return [self._jobs[job_id] for job_id in ids if job_id in self._jobs]
+
+
+def _chunks(stream, length):
+    """Read `length` bytes of a request body in chunks."""
+    while length > 0:
+        chunk = stream.read(min(CHUNK_SIZE, length))
+        if not chunk:
+            return
+        length -= len(chunk)
+        yield chunk
+
+
+def _parse_multipart(content_type, stream, length):
+    """Stream every "file" field of a form body into a spooled temp file.
+
+    Returns [(file, file name)]; the caller closes the files. Only the
+    current chunk and the part being written (up to SPOOL_MEMORY_BYTES
+    before it moves to disk) are held in memory.
+    """
+    boundary = BytesParser(policy=policy.HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n").get_boundary()
+    if not boundary:
+        raise BadRequest("Expected multipart/form-data.")
+    delimiter = b"\r\n--" + boundary.encode("latin-1")
+    keep = len(delimiter) - 1
+    chunks = _chunks(stream, length)
+    # The first boundary has no line break before it; start with one so it matches too
+    buffer = b"\r\n"
+
+    def more(buffer):
+        chunk = next(chunks, b"")
+        if not chunk:
+            raise BadRequest("The form body ended early.")
+        return buffer + chunk
+
+    files = []
+    try:
+        while (start := buffer.find(delimiter)) < 0:
+            buffer = more(buffer[-keep:])
+        buffer = buffer[start + len(delimiter):]
+        while True:
+            while len(buffer) < 2:
+                buffer = more(buffer)
+            if buffer.startswith(b"--"):
+                return files
+            while (end := buffer.find(b"\r\n\r\n")) < 0:
+                if len(buffer) > MAX_PART_HEADER_BYTES:
+                    raise BadRequest("A form part's headers are too long.")
+                buffer = more(buffer)
+            headers = BytesParser(policy=policy.HTTP).parsebytes(buffer[2:end + 4], headersonly=True)
+            buffer = buffer[end + 4:]
+            target = None
+            if headers.get_param("name", header="content-disposition") == "file":
+                target = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+                files.append((target, headers.get_filename() or "upload"))
+            while (end := buffer.find(delimiter)) < 0:
+                # Keep enough to recognise a delimiter split across chunks
+                if target is not None and len(buffer) > keep:
+                    target.write(buffer[:-keep])
+                buffer = more(buffer[-keep:])
+            if target is not None:
+                target.write(buffer[:end])
+                target.seek(0)
+            buffer = buffer[end + len(delimiter):]
+    except Exception:
+        _close_sources(files)
+        raise
+
+
+def _close_sources(sources):
+    for source, _ in sources:
+        if hasattr(source, "close"):
+            source.close()
+
+
+class GradingHandler(BaseHTTPRequestHandler):
+    """Routes requests to the server's GradingService."""
+
+    server_version = "AssignmentChecker/1.0"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
+
+    def _send(self, status, payload, headers=()):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        return parts, parse_qs(url.query)
+
+    def _sources(self, assignment, many):
+        """The submitted files as [(file object or path, name)]; the caller closes them.
+
+        The body is only read once the service has room for the request.
+        """
+        self.service.check_capacity(assignment)
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            raise BadRequest("Request body is too large.", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            sources = _parse_multipart(content_type, self.rfile, length)
+        elif content_type.startswith("application/json"):
+            if length > MAX_JSON_BYTES:
+                raise BadRequest("Request body is too large.", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                raise BadRequest("Body is not valid JSON.")
+            paths = request.get("paths", []) if many else [request["path"]] if "path" in request else []
+            sources = [(self.service.resolve_path(path), Path(path).name) for path in paths]
+        else:
+            raise BadRequest("Send multipart/form-data files or a JSON body with paths.",
+                             HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        if not sources:
+            raise BadRequest("No file was sent.")
+        if not many and len(sources) > 1:
+            _close_sources(sources)
+            raise BadRequest("Send one file, or use /batches for several.")
+        return sources
+
+    def _handle(self, method):
+        try:
+            parts, query = self._route()
+            if method == "GET" and parts == ["health"]:
+                return self._send(HTTPStatus.OK, {"status": "ok", "workers": self.service.pool.workers,
+                                                  "pending": self.service.pending,
+                                                  "max_pending": self.service.max_pending,
+                                                  "limit_hits": self.service.pool.limit_hits})
+            if method == "GET" and parts == ["assignments"]:
+                return self._send(HTTPStatus.OK, [
+                    {"id": name, "title": spec["title"], "extension": spec["extension"]}
+                    for name, spec in ASSIGNMENTS.items()
+                ])
+            if method == "GET" and len(parts) == 2 and parts[0] == "jobs":
+                job = self.service.job(parts[1])
+                if job is None:
+                    return self._send(HTTPStatus.NOT_FOUND, {"error": "Unknown job."})
+                return self._send(HTTPStatus.OK, job.to_json())
+            if method == "GET" and len(parts) == 2 and parts[0] == "batches":
+                jobs = self.service.batch(parts[1])
+                if jobs is None:
+                    return self._send(HTTPStatus.NOT_FOUND, {"error": "Unknown batch."})
+                payload = [job.to_json() for job in jobs]
+                done = sum(1 for job in payload if job["status"] != "pending")
+                return self._send(HTTPStatus.OK, {"id": parts[1], "total": len(payload), "finished": done,
+                                                  "jobs": payload})
+            if method == "POST" and len(parts) == 2 and parts[0] == "grade":
+                sources = self._sources(parts[1], many=False)
+                try:
+                    (source, name), = sources
+                    job = self.service.submit(parts[1], source, name)
+                finally:
+                    _close_sources(sources)
+                if query.get("wait", ["1"])[0] != "0":
+                    try:
+                        job.future.result(timeout=WAIT_SECONDS)
+                    except Exception:
+                        # Errors are reported in the job; a timeout leaves it pending
+                        pass
+                payload = job.to_json()
+                status = HTTPStatus.ACCEPTED if payload["status"] == "pending" else HTTPStatus.OK
+                return self._send(status, payload, [("Location", f"/jobs/{job.id}")])
+            if method == "POST" and len(parts) == 2 and parts[0] == "batches":
+                sources = self._sources(parts[1], many=True)
+                try:
+                    batch_id, jobs = self.service.submit_batch(parts[1], sources)
+                finally:
+                    _close_sources(sources)
+                return self._send(HTTPStatus.ACCEPTED, {"id": batch_id, "jobs": [job.id for job in jobs]},
+                                  [("Location", f"/batches/{batch_id}")])
+            return self._send(HTTPStatus.NOT_FOUND, {"error": "No such endpoint."})
+        except ServiceBusy as e:
+            # The body may not have been read; don't parse it as the next request
+            self.close_connection = True
+            return self._send(HTTPStatus.TOO_MANY_REQUESTS, {"error": str(e)},
+                              [("Retry-After", str(RETRY_AFTER_SECONDS))])
+        except BadRequest as e:
+            self.close_connection = True
+            return self._send(e.status, {"error": str(e)})
+        except Exception as e:
+            return self._send(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+def make_server(service, host="127.0.0.1", port=8000):
+    """An HTTP server for `service`; port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), GradingHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve automatic grading over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("-j", "--workers", type=int, default=WORKERS,
+                        help="Number of worker processes (default: GRADER_WORKERS or all cores)")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                        help="Submissions in flight before new ones get 429")
+    parser.add_argument("--root", default=os.environ.get("GRADER_SERVICE_ROOT"),
+                        help="Folder that JSON path submissions must be inside")
+    args = parser.parse_args(argv)
+
+    service = GradingService(GradingPool(args.workers), args.max_pending, args.root)
+    server = make_server(service, args.host, args.port)
+    print(f"Grading on http://{args.host}:{server.server_port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.pool.shutdown()
@@ -0,0 +1,305 @@
+"""Flag near-duplicate submissions across a cohort with MinHash and LSH.
+
+Each submission is reduced to a set of shingles taken from its feature
+record (see grading.features): overlapping word n-grams of the Word body
+paragraphs or the slide text, and one shingle per data row of a workbook's
+typed values (formulas are left out, since every student writes the same
+ones). A MinHash signature of NUM_PERM values estimates the Jaccard
+similarity of two shingle sets, and splitting it into BANDS bands for
+locality-sensitive hashing means only submissions sharing a band bucket are
+ever compared, so building the candidate pairs is close to linear in the
+cohort size rather than quadratic.
+
+A submission with no shingles (a blank or unreadable file) has nothing to
+compare on. It is kept in the index but never bucketed, and it is reported
+on its own rather than as a duplicate of every other blank file.
+
+SimilarityIndex takes submissions one at a time, so a saved index is simply
+topped up as new files arrive:
+
+    python find_duplicates.py word_1 submissions/ --index word_1.npz -o clusters.json
+"""
+import argparse
+import hashlib
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+from checkers.registry import ASSIGNMENTS
+from grading.batch import find_submissions
+from grading.features import FeatureStore, extract, load_features
+from utils.ingest import digest_file
+
+NUM_PERM = 128
+# 16 bands of 8 rows: pairs above ~0.7 similarity almost always share a bucket
+BANDS = 16
+DEFAULT_THRESHOLD = 0.8
+# Words per text shingle
+SHINGLE_WORDS = 3
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD = re.compile(r"\w+")
+
+
+def _word_shingles(texts):
+    shingles = set()
+    for text in texts:
+        words = _WORD.findall(text.lower())
+        if 0 < len(words) < SHINGLE_WORDS:
+            shingles.add(" ".join(words))
+        for i in range(len(words) - SHINGLE_WORDS + 1):
+            shingles.add(" ".join(words[i:i + SHINGLE_WORDS]))
+    return shingles
+
+
+def _row_shingles(workbook):
+    shingles = set()
+    for name in workbook.sheetnames:
+        sheet = workbook[name]
+        # Row 1 holds the headers every submission shares
+        for row in sheet.iter_rows(min_row=2):
+            values = [
+                str(cell.value).strip().lower() for cell in row
+                if cell.value is not None and cell.data_type != "f"
+            ]
+            if values:
+                shingles.add("\x1f".join(values))
+    return shingles
+
+
+def shingles(assignment, record):
+    """The shingle set of a submission's feature record."""
+    extension = ASSIGNMENTS[assignment]["extension"]
+    submission = load_features(record)
+    if extension == "xlsx":
+        return _row_shingles(submission)
+    if extension == "docx":
+        from checkers.word.analysis import DocumentAnalysis
+        return _word_shingles(DocumentAnalysis(submission).body_paragraphs)
+    return _word_shingles(text for slide in submission.slides for text in slide.texts)
+
+
+class MinHasher:
+    """MinHash signatures from a fixed family of NUM_PERM hash permutations."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        generator = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = generator.integers(1, int(_MERSENNE_PRIME), num_perm, dtype=np.uint64)
+        self._b = generator.integers(0, int(_MERSENNE_PRIME), num_perm, dtype=np.uint64)
+
+    def signature(self, shingles):
+        if not shingles:
+            # Nothing to compare on; SimilarityIndex recognises this all-max
+            # signature and leaves it out of the buckets
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64, count=len(shingles),
+        )
+        # One row per shingle, one column per permutation
+        with np.errstate(over="ignore"):
+            permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+
+class SimilarityIndex:
+    """MinHash signatures of a cohort, bucketed by LSH band for candidate lookup.
+
+    Keys are whatever identifies a submission (the batch CLI uses the
+    student name). Adding a key again replaces its earlier signature.
+    `empty` holds the keys of submissions with no shingles, which are
+    never candidates for any other.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM, bands=BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self.signatures = {}
+        self.digests = {}
+        self.empty = set()
+        self._buckets = [{} for _ in range(bands)]
+
+    def __contains__(self, key):
+        return key in self.signatures
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def _bands(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, shingles, digest=None):
+        """Index a submission's shingles; return the keys it may be similar to."""
+        self.add_signature(key, self.hasher.signature(shingles), digest)
+        return self.candidates(key)
+
+    def add_signature(self, key, signature, digest=None):
+        if key in self.signatures:
+            self.remove(key)
+        self.signatures[key] = signature
+        self.digests[key] = digest
+        if (signature == _MAX_HASH).all():
+            self.empty.add(key)
+            return
+        for band, bucket in self._bands(signature):
+            self._buckets[band].setdefault(bucket, set()).add(key)
+
+    def remove(self, key):
+        signature = self.signatures.pop(key)
+        self.digests.pop(key, None)
+        if key in self.empty:
+            self.empty.discard(key)
+            return
+        for band, bucket in self._bands(signature):
+            members = self._buckets[band][bucket]
+            members.discard(key)
+            if not members:
+                del self._buckets[band][bucket]
+
+    def candidates(self, key):
+        """Keys sharing at least one band bucket with `key`."""
+        found = set()
+        if key in self.empty:
+            return found
+        for band, bucket in self._bands(self.signatures[key]):
+            found |= self._buckets[band][bucket]
+        found.discard(key)
+        return found
+
+    def similarity(self, a, b):
+        """Estimated Jaccard similarity of two indexed submissions."""
+        if a in self.empty or b in self.empty:
+            return 0.0
+        return float(np.mean(self.signatures[a] == self.signatures[b]))
+
+    def pairs(self):
+        """Return [(a, b, similarity)] for candidate pairs at or above the threshold."""
+        found = {}
+        for band in self._buckets:
+            for members in band.values():
+                if len(members) < 2:
+                    continue
+                members = sorted(members)
+                for i, a in enumerate(members):
+                    for b in members[i + 1:]:
+                        if (a, b) not in found:
+                            found[(a, b)] = self.similarity(a, b)
+        return sorted(
+            ((a, b, score) for (a, b), score in found.items() if score >= self.threshold),
+            key=lambda pair: -pair[2],
+        )
+
+    def clusters(self):
+        """Group similar submissions, most similar first.
+
+        Each cluster is {"members": [...], "similarity": highest pair score,
+        "pairs": [[a, b, score], ...]}; submissions join a cluster through
+        any pair above the threshold.
+        """
+        pairs = self.pairs()
+        parent = {}
+
+        def root(key):
+            while parent.setdefault(key, key) != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        for a, b, _ in pairs:
+            parent[root(a)] = root(b)
+        groups = {}
+        for a, b, score in pairs:
+            groups.setdefault(root(a), []).append([a, b, round(score, 3)])
+        clusters = [
+            {
+                "members": sorted({key for pair in group for key in pair[:2]}),
+                "similarity": max(pair[2] for pair in group),
+                "pairs": group,
+            }
+            for group in groups.values()
+        ]
+        return sorted(clusters, key=lambda cluster: (-cluster["similarity"], cluster["members"]))
+
+    def save(self, path):
+        keys = sorted(self.signatures)
+        np.savez_compressed(
+            path,
+            keys=np.array(keys, dtype=str),
+            digests=np.array([self.digests[key] or "" for key in keys], dtype=str),
+            signatures=np.array([self.signatures[key] for key in keys], dtype=np.uint64).reshape(len(keys), -1),
+            settings=np.array([self.hasher.num_perm, self.bands]),
+        )
+
+    @classmethod
+    def load(cls, path, threshold=DEFAULT_THRESHOLD):
+        with np.load(path) as data:
+            num_perm, bands = (int(value) for value in data["settings"])
+            index = cls(threshold, num_perm, bands)
+            for key, digest, signature in zip(data["keys"], data["digests"], data["signatures"]):
+                index.add_signature(str(key), signature, str(digest) or None)
+        return index
+
+
+def update_index(index, assignment, paths, store=None, backend=None):
+    """Add submission files to an index, skipping those whose content it already has.
+
+    Files are keyed by student (the file name stem). With a FeatureStore,
+    stored feature records are reused and new ones saved.
+    """
+    for path in paths:
+        path = Path(path)
+        digest = digest_file(path)
+        if index.digests.get(path.stem) == digest:
+            continue
+        record = store.get(assignment, digest) if store is not None else None
+        if record is None:
+            try:
+                record = extract(assignment, path, backend)
+            except Exception:
+                # Unreadable files are reported by grading, not here
+                continue
+            if store is not None:
+                store.put(assignment, digest, record)
+        index.add(path.stem, shingles(assignment, record), digest)
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find near-duplicate submissions for one assignment.")
+    parser.add_argument("assignment", choices=sorted(ASSIGNMENTS))
+    parser.add_argument("directory", help="Folder containing the submissions")
+    parser.add_argument("-o", "--output", default=None, help="Write the clusters here as JSON (default: stdout)")
+    parser.add_argument("--index", default=None,
+                        help="Saved index (.npz) to update; only new or changed files are read")
+    parser.add_argument("--features", default=None, help="Folder of extracted features to reuse")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Lowest estimated similarity reported (0-1)")
+    args = parser.parse_args(argv)
+
+    index_path = Path(args.index) if args.index else None
+    if index_path is not None and index_path.exists():
+        index = SimilarityIndex.load(index_path, args.threshold)
+    else:
+        index = SimilarityIndex(args.threshold)
+    store = FeatureStore(args.features) if args.features else None
+    update_index(index, args.assignment, find_submissions(args.directory, args.assignment), store)
+    if index_path is not None:
+        index.save(index_path)
+
+    clusters = index.clusters()
+    text = json.dumps({"clusters": clusters, "empty": sorted(index.empty)}, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+        print(f"{len(clusters)} clusters among {len(index)} submissions"
+              f" ({len(index.empty)} with no content to compare) -> {args.output}")
+    else:
+        print(text)
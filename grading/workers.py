@@ -0,0 +1,249 @@
+"""Worker processes that can be killed when one submission runs away.
+
+A ProcessPoolExecutor cannot stop a single task: a workbook with a huge
+shared-string table or a chart nested a thousand levels deep keeps its
+worker busy (or swapping) for as long as it likes, and killing that worker
+breaks the whole pool. WorkerPool instead gives each worker process its own
+pipe and a supervising thread in the parent. The supervisor hands the
+worker one task at a time and watches it:
+
+- a task still running after `time_limit` seconds,
+- a worker whose resident memory passes `memory_limit` bytes, or that
+  runs into its `address_space_limit` (set with RLIMIT_AS where the
+  platform has it, so one huge allocation fails at once instead of
+  between two RSS checks),
+- a worker that dies outright (e.g. killed by the OOM killer)
+
+all end the same way: the worker is killed, a fresh one is started for the
+next task, the task's Future fails with LimitExceeded and the hit is
+counted in `limit_hits`, so the limits can be tuned from real cohorts.
+"""
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from multiprocessing import get_context
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Wall-clock seconds one submission may take; 0 turns the limit off
+TIME_LIMIT = float(os.environ.get("GRADER_TIME_LIMIT_SECONDS", 60))
+# Resident memory a worker may use, and the address space it may map
+MEMORY_LIMIT = int(os.environ.get("GRADER_MEMORY_LIMIT_MB", 1024)) * 1024 * 1024
+ADDRESS_SPACE_LIMIT = int(os.environ.get("GRADER_ADDRESS_SPACE_LIMIT_MB", 4096)) * 1024 * 1024
+
+# How often a supervisor checks its worker's clock and memory
+POLL_INTERVAL = 0.05
+
+
+class LimitExceeded(Exception):
+    """A submission was stopped for using too much time or memory.
+
+    `limit` is "time", "memory" or "crashed".
+    """
+
+    def __init__(self, limit, detail):
+        super().__init__(f"Could not grade: exceeded limits ({detail})")
+        self.limit = limit
+
+
+def _worker_main(conn, address_space_limit):
+    """Run tasks from the pipe until told to stop; runs in the worker process."""
+    if resource is not None and address_space_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (address_space_limit, address_space_limit))
+    # Tell the supervisor start-up is over, so it isn't counted against the first task
+    conn.send(True)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args = task
+        out_of_memory = False
+        try:
+            outcome = (True, fn(*args))
+        except MemoryError:
+            out_of_memory = True
+            outcome = (False, None)
+        except Exception as e:
+            outcome = (False, e)
+        try:
+            conn.send(outcome)
+        except Exception as e:
+            # The result or exception could not be pickled
+            conn.send((False, RuntimeError(f"Could not return the result: {e!r}")))
+        if out_of_memory:
+            # The heap may be in a bad state; let the supervisor start a fresh worker
+            return
+
+
+def _resident_bytes(pid):
+    """A process's resident set size, or None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Worker:
+    """One worker process and the parent's end of its pipe."""
+
+    def __init__(self, context, address_space_limit):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, address_space_limit), daemon=True)
+        self.process.start()
+        child.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """Runs picklable functions in worker processes under time and memory limits.
+
+    submit() returns a concurrent.futures.Future, like an executor's.
+    Workers are started on first use.
+    """
+
+    def __init__(self, workers, time_limit=TIME_LIMIT, memory_limit=MEMORY_LIMIT,
+                 address_space_limit=ADDRESS_SPACE_LIMIT, context="spawn"):
+        self.workers = workers
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.address_space_limit = address_space_limit
+        self.limit_hits = Counter()
+        self._context = get_context(context)
+        self._tasks = queue.SimpleQueue()
+        self._supervisors = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit to a pool that has been shut down")
+            if not self._supervisors:
+                self._supervisors = [threading.Thread(target=self._supervise, daemon=True)
+                                     for _ in range(self.workers)]
+                for supervisor in self._supervisors:
+                    supervisor.start()
+        self._tasks.put((future, fn, args))
+        return future
+
+    def _hit(self, limit, detail):
+        with self._lock:
+            self.limit_hits[limit] += 1
+        return LimitExceeded(limit, detail)
+
+    def _crashed(self, worker):
+        # Reap the process so its exit code is known
+        worker.process.join(1)
+        return self._hit("crashed", f"worker exited with code {worker.process.exitcode}")
+
+    def _supervise(self):
+        worker = None
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    return
+                future, fn, args = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if worker is None:
+                        worker = _Worker(self._context, self.address_space_limit)
+                        self._started(worker)
+                    try:
+                        worker.conn.send((fn, args))
+                    except OSError:
+                        raise self._crashed(worker) from None
+                    ok, value = self._wait(worker)
+                except LimitExceeded as e:
+                    worker.kill()
+                    worker = None
+                    future.set_exception(e)
+                    continue
+                except Exception as e:
+                    future.set_exception(e)
+                    continue
+                if ok:
+                    future.set_result(value)
+                elif value is None:
+                    # The worker ran out of address space and is exiting
+                    worker.kill()
+                    worker = None
+                    future.set_exception(self._hit("memory", f"needed more than "
+                                                   f"{self.address_space_limit // (1024 * 1024)} MB"))
+                else:
+                    future.set_exception(value)
+        finally:
+            if worker is not None:
+                worker.stop()
+
+    def _started(self, worker):
+        """Wait for a new worker to report it is ready for tasks."""
+        while not worker.conn.poll(POLL_INTERVAL):
+            if not worker.process.is_alive() and not worker.conn.poll():
+                raise self._crashed(worker)
+        try:
+            worker.conn.recv()
+        except (EOFError, OSError):
+            raise self._crashed(worker) from None
+
+    def _wait(self, worker):
+        """Wait for the worker's answer, raising LimitExceeded if it breaks a limit."""
+        started = time.monotonic()
+        while not worker.conn.poll(POLL_INTERVAL):
+            if not worker.process.is_alive():
+                # It may have answered just before exiting
+                if worker.conn.poll():
+                    break
+                raise self._crashed(worker)
+            if self.time_limit and time.monotonic() - started > self.time_limit:
+                raise self._hit("time", f"took longer than {self.time_limit:g} seconds")
+            resident = _resident_bytes(worker.process.pid) if self.memory_limit else None
+            if resident is not None and resident > self.memory_limit:
+                raise self._hit("memory", f"used more than {self.memory_limit // (1024 * 1024)} MB")
+        try:
+            return worker.conn.recv()
+        except (EOFError, OSError):
+            raise self._crashed(worker) from None
+
+    def shutdown(self, cancel_futures=True):
+        """Stop the workers; tasks not yet started are cancelled."""
+        with self._lock:
+            self._shutdown = True
+            supervisors, self._supervisors = self._supervisors, []
+        if cancel_futures:
+            while True:
+                try:
+                    task = self._tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is not None:
+                    task[0].cancel()
+        for _ in supervisors:
+            self._tasks.put(None)
+        for supervisor in supervisors:
+            supervisor.join()
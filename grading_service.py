@@ -0,0 +1,4 @@
+from grading.service import main
+
+if __name__ == "__main__":
+    main()
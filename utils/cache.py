@@ -0,0 +1,76 @@
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+from checkers.registry import ASSIGNMENTS
+
+
+class ResultCache:
+    """Checklist results keyed by submission content.
+
+    Results live in an in-memory LRU of `max_entries` items. When `directory`
+    is set they are also written there as JSON, and the oldest files are
+    removed once the folder grows past `max_bytes`.
+    """
+
+    def __init__(self, max_entries=256, directory=None, max_bytes=50 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory else None
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        if self.directory:
+            path = self.directory / f"{key}.json"
+            try:
+                with open(path, encoding="utf-8") as f:
+                    value = json.load(f)
+            except (OSError, ValueError):
+                return None
+            # Touch the file so disk eviction is least-recently-used too
+            os.utime(path)
+            self._remember(key, value)
+            return value
+        return None
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.directory:
+            with open(self.directory / f"{key}.json", "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            self._evict_disk()
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _evict_disk(self):
+        files = [(p, p.stat()) for p in self.directory.glob("*.json")]
+        total = sum(stat.st_size for _, stat in files)
+        for path, stat in sorted(files, key=lambda item: item[1].st_mtime):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+
+
+def cache_key(assignment, digest):
+    """Key a submission by its assignment, checker version and SHA-256 of its bytes."""
+    return f"{assignment}-v{ASSIGNMENTS[assignment]['version']}-{digest}"
+
+
+# Shared by every Streamlit rerun in this process. Set GRADER_CACHE_DIR to
+# keep results on disk as well, capped at GRADER_CACHE_MAX_BYTES.
+default_cache = ResultCache(
+    directory=os.environ.get("GRADER_CACHE_DIR"),
+    max_bytes=int(os.environ.get("GRADER_CACHE_MAX_BYTES", 50 * 1024 * 1024)),
+)
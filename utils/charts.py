@@ -0,0 +1,172 @@
+"""One index of a sheet's charts, shared by every chart criterion.
+
+Charts reach the checkers in three shapes: openpyxl chart objects (bounded
+backend), the SimpleNamespaces of utils.xlsx_fast and those rebuilt from
+feature records. chart_index() reads each chart of a sheet once into a
+ChartEntry holding its normalized title, chart type, anchor, series
+references and fill type, and keys the entries by title, so criteria look
+charts up instead of walking title runs again.
+"""
+import re
+
+from openpyxl.utils.cell import range_boundaries
+
+# Height of a default row (15pt) in EMU, for charts anchored by size only
+DEFAULT_ROW_HEIGHT_EMU = 190500
+
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_title(text):
+    """Case- and whitespace-insensitive form of a chart title."""
+    return _SPACE.sub(" ", text).strip().casefold()
+
+
+def chart_title(chart):
+    """A chart's title text, or None when it has no title.
+
+    openpyxl charts carry a Title object whose rich text is split into runs;
+    the XML backend already gives the joined text.
+    """
+    title = getattr(chart, "title", None)
+    if title is None or isinstance(title, str):
+        return title
+    rich = getattr(getattr(title, "tx", None), "rich", None)
+    if rich is None:
+        return ""
+    return "".join(run.t or "" for paragraph in rich.paragraphs for run in paragraph.r or [])
+
+
+def _fill_kind(properties):
+    if properties is None:
+        return None
+    for kind, attribute in (("gradient", "gradFill"), ("pattern", "pattFill"), ("solid", "solidFill"),
+                            ("none", "noFill")):
+        if getattr(properties, attribute, None) is not None:
+            return kind
+    return None
+
+
+def chart_fill_kinds(chart):
+    """Fill kinds of a chart's series, data points and chart area, in that order."""
+    if hasattr(chart, "fill_kinds"):
+        return list(chart.fill_kinds)
+    kinds = []
+    for series in getattr(chart, "series", None) or []:
+        kinds.append(_fill_kind(series.graphicalProperties))
+        kinds.extend(_fill_kind(point.graphicalProperties) for point in series.dPt or [])
+    kinds.append(_fill_kind(getattr(chart, "graphical_properties", None)))
+    return [kind for kind in kinds if kind is not None]
+
+
+def series_refs(chart):
+    """The range formulas of each series' name, categories and values."""
+    if hasattr(chart, "series_refs"):
+        return list(chart.series_refs)
+    refs = []
+    for series in getattr(chart, "series", None) or []:
+        for part in ("tx", "cat", "val", "xVal", "yVal"):
+            source = getattr(series, part, None)
+            for kind in ("strRef", "numRef"):
+                ref = getattr(source, kind, None)
+                if ref is not None and ref.f:
+                    refs.append(ref.f)
+    return refs
+
+
+def _marker(marker):
+    return None if marker is None else (marker.col, marker.colOff, marker.row, marker.rowOff)
+
+
+class ChartEntry:
+    """What the criteria need to know about one chart.
+
+    Anchor markers are (column, column offset, row, row offset) with
+    0-based cells and EMU offsets; `end` is None for charts anchored by
+    position and size, whose height is kept in `height` (EMU) instead.
+    """
+
+    __slots__ = ("title", "text", "type", "start", "end", "height", "series", "fill_kinds")
+
+    def __init__(self, chart):
+        self.text = chart_title(chart)
+        self.title = normalize_title(self.text) if self.text is not None else None
+        self.type = getattr(chart, "tagname", None)
+        anchor = getattr(chart, "anchor", None)
+        self.start = _marker(getattr(anchor, "_from", None))
+        self.end = _marker(getattr(anchor, "to", None))
+        ext = getattr(anchor, "ext", None)
+        self.height = getattr(ext, "cy", None)
+        self.series = series_refs(chart)
+        self.fill_kinds = chart_fill_kinds(chart)
+
+    @property
+    def fill_type(self):
+        """"gradient" if any part is gradient filled, else the first fill found, or None."""
+        if "gradient" in self.fill_kinds:
+            return "gradient"
+        return self.fill_kinds[0] if self.fill_kinds else None
+
+    @property
+    def top(self):
+        """(row, offset) of the chart's top edge, or None if it is not cell-anchored."""
+        return None if self.start is None else (self.start[2], self.start[3])
+
+    @property
+    def bottom(self):
+        """(row, offset) of the chart's bottom edge, estimated from its height if need be."""
+        if self.end is not None:
+            return self.end[2], self.end[3]
+        if self.start is None or self.height is None:
+            return self.top
+        rows, offset = divmod(self.start[3] + self.height, DEFAULT_ROW_HEIGHT_EMU)
+        return self.start[2] + rows, offset
+
+    def is_below(self, other):
+        """True when this chart starts at or under the bottom of `other`."""
+        if self.top is None or other.bottom is None:
+            return False
+        return self.top >= other.bottom
+
+    def references_column(self, column):
+        """True when any series reads data from the given 1-based column."""
+        for ref in self.series:
+            try:
+                min_col, _, max_col, _ = range_boundaries(ref.rpartition("!")[2].replace("$", ""))
+            except (TypeError, ValueError):
+                continue
+            if min_col is not None and min_col <= column <= (max_col or min_col):
+                return True
+        return False
+
+
+class ChartIndex:
+    """A sheet's charts in drawing order, with a lookup by normalized title."""
+
+    def __init__(self, charts):
+        self.charts = [ChartEntry(chart) for chart in charts]
+        self.by_title = {}
+        for entry in self.charts:
+            if entry.title is not None:
+                self.by_title.setdefault(entry.title, entry)
+
+    def __len__(self):
+        return len(self.charts)
+
+    def __iter__(self):
+        return iter(self.charts)
+
+    def find(self, title):
+        """The first chart with this title (case and spacing ignored), or None."""
+        return self.by_title.get(normalize_title(title))
+
+    def titled(self):
+        return [entry for entry in self.charts if entry.title is not None]
+
+
+def chart_index(sheet):
+    """The sheet's ChartIndex, built on first use and kept on the sheet."""
+    index = getattr(sheet, "_chart_index", None)
+    if index is None:
+        index = sheet._chart_index = ChartIndex(sheet._charts)
+    return index
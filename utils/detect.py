@@ -0,0 +1,99 @@
+"""Work out which assignment a file is from its contents, not its name.
+
+An Office file's type is whatever its [Content_Types].xml says the main
+part is, so a workbook renamed to .docx (or exported without an extension)
+is still recognised. When several assignments take the same file type, the
+workbook's sheet names and row 1 headers are scored against each
+assignment's "signature" in the registry and the best match wins.
+"""
+import zipfile
+from xml.etree.ElementTree import fromstring
+
+from checkers.registry import ASSIGNMENTS
+
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+# Content type of the main part of each file type the checkers grade
+MAIN_CONTENT_TYPES = {
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml": "xlsx",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml": "docx",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml": "pptx",
+}
+
+# Row 1 is read from this many sheets at most when scoring a workbook
+MAX_SIGNATURE_SHEETS = 8
+# A matching sheet name counts for this many matching headers
+SHEET_WEIGHT = 3
+
+
+def document_type(archive):
+    """"xlsx", "docx" or "pptx" from an open zip's [Content_Types].xml, or None."""
+    try:
+        root = fromstring(archive.read("[Content_Types].xml"))
+    except (KeyError, SyntaxError):
+        return None
+    for override in root.iter(f"{{{CONTENT_TYPES_NS}}}Override"):
+        extension = MAIN_CONTENT_TYPES.get(override.get("ContentType"))
+        if extension is not None:
+            return extension
+    return None
+
+
+def _normalize(text):
+    return " ".join(str(text).split()).casefold()
+
+
+def _workbook_signature(file):
+    """(sheet names, row 1 headers of the first sheets) of a workbook, normalized."""
+    from utils.xlsx_fast import load_fast_workbook
+
+    workbook = load_fast_workbook(file, "A1:Z1")
+    try:
+        headers = set()
+        for name in workbook.sheetnames[:MAX_SIGNATURE_SHEETS]:
+            sheet = workbook[name]
+            if sheet.max_row:
+                headers.update(_normalize(value) for row in sheet.iter_rows(max_row=1, values_only=True)
+                               for value in row if value is not None)
+        return {_normalize(name) for name in workbook.sheetnames}, headers
+    finally:
+        workbook.close()
+
+
+def _score(signature, sheets, headers):
+    return (SHEET_WEIGHT * sum(_normalize(name) in sheets for name in signature.get("sheets", ()))
+            + sum(_normalize(header) in headers for header in signature.get("headers", ())))
+
+
+def detect_assignment(file):
+    """Return the assignment id a submission belongs to, or None if it cannot tell.
+
+    `file` is a path or seekable binary file; a file is rewound afterwards.
+    """
+    try:
+        with zipfile.ZipFile(file) as archive:
+            extension = document_type(archive)
+    except zipfile.BadZipFile:
+        return None
+    finally:
+        if hasattr(file, "seek"):
+            file.seek(0)
+
+    candidates = [name for name, assignment in ASSIGNMENTS.items() if assignment["extension"] == extension]
+    if len(candidates) <= 1:
+        return candidates[0] if candidates else None
+    if extension != "xlsx":
+        # Only workbooks carry signatures; two document assignments can't be told apart
+        return None
+
+    try:
+        sheets, headers = _workbook_signature(file)
+    finally:
+        if hasattr(file, "seek"):
+            file.seek(0)
+    scores = {name: _score(ASSIGNMENTS[name].get("signature", {}), sheets, headers) for name in candidates}
+    best = max(scores, key=scores.get)
+    # No evidence at all, or a tie, is not a match
+    if scores[best] == 0 or list(scores.values()).count(scores[best]) > 1:
+        return None
+    return best
@@ -1,12 +1,21 @@
 import streamlit as st
-import pandas as pd
+from utils.scoring import score_results
+
+
+def _markdown_table(headers, rows):
+    """Render rows as a Markdown table, so showing results needs no pandas."""
+    def cell(value):
+        return str(value).replace("|", "\\|").replace("\n", " ")
+
+    lines = ["| " + " | ".join(cell(h) for h in headers) + " |",
+             "|" + "---|" * len(headers)]
+    lines += ["| " + " | ".join(cell(v) for v in row) + " |" for row in rows]
+    return "\n".join(lines)
+
 
 def display_results(checklist_data):
     # Calculate scores
-    total_yes = checklist_data["Completed"].count("Yes")
-    total_items = len(checklist_data["Completed"])
-    percentage_complete = (total_yes / total_items) * 100
-    points = (total_yes / total_items) * 20
+    percentage_complete, points = score_results(checklist_data)
 
     # Display scores
     col1, col2 = st.columns(2)
@@ -29,5 +38,39 @@ def display_results(checklist_data):
 
     # Display checklist
     st.subheader("Detailed Checklist")
-    checklist_df = pd.DataFrame(checklist_data)
-    st.table(checklist_df)
+    st.markdown(_markdown_table(
+        list(checklist_data),
+        zip(*checklist_data.values()),
+    ))
+
+
+def display_timings(trace, key=None):
+    """Show a trace's stage and criterion timings in a collapsed panel.
+
+    `key` tells the panels apart when one assignment shows several results.
+    """
+    with st.expander("Timings"):
+        if trace.stages:
+            st.caption("Stages")
+            st.markdown(_markdown_table(
+                ["Stage", "Milliseconds"],
+                [(name, f"{seconds * 1000:.1f}") for name, seconds in trace.stages],
+            ))
+        if trace.criteria:
+            st.caption("Criteria")
+            st.markdown(_markdown_table(
+                ["Criterion", "Milliseconds"],
+                [(text, f"{seconds * 1000:.1f}") for text, seconds in trace.criteria],
+            ))
+        else:
+            st.caption("Criteria were not timed (result came from the cache).")
+        if trace.events:
+            st.caption("Debug messages")
+            st.code("\n".join(message for _, message in trace.events))
+        st.download_button(
+            "Download timings (JSON lines)",
+            trace.to_jsonl(),
+            file_name=f"{trace.assignment}-timings.jsonl",
+            mime="application/jsonl",
+            key=f"timings-{key or trace.assignment}",
+        )
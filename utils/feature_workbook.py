@@ -0,0 +1,272 @@
+"""Workbooks as plain, serializable feature records.
+
+workbook_features() reads everything the Excel checkers look at from an
+opened (bounded or XML) workbook into a JSON-safe dict: the sheet names,
+each sheet's cells inside the bounds (value, data type, style and cached
+formula result), the decoded bold / fill / border / alignment / number
+format of every style used, merged ranges, tables, and each chart's title,
+type, anchor, series references and fills. FeatureWorkbook rebuilds a
+workbook from such a record with the lookups the checkers use, so they
+re-run without the original file.
+"""
+import datetime
+from types import SimpleNamespace
+
+from openpyxl.utils.cell import coordinate_to_tuple, range_boundaries
+from openpyxl.worksheet.cell_range import MultiCellRange
+
+from utils.charts import chart_fill_kinds, chart_title, series_refs
+from utils.snapshot import _style_array
+from utils.xlsx_fast import EMPTY_SIDE, FastCell, FastStyle
+
+SIDES = ("left", "right", "top", "bottom")
+
+
+def _encode(value):
+    """A JSON-safe cell value; dates and times keep their type."""
+    if isinstance(value, datetime.timedelta):
+        return {"timedelta": value.total_seconds()}
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return {type(value).__name__: value.isoformat()}
+    if value is not None and not isinstance(value, (str, int, float, bool)):
+        return str(value)
+    return value
+
+
+def _decode(value):
+    if not isinstance(value, dict):
+        return value
+    (kind, text), = value.items()
+    if kind == "timedelta":
+        return datetime.timedelta(seconds=text)
+    return getattr(datetime, kind).fromisoformat(text)
+
+
+def _marker(marker):
+    return None if marker is None else [marker.col, marker.colOff, marker.row, marker.rowOff]
+
+
+class _StyleTable:
+    """The distinct styles seen while extracting, with their decoded attributes."""
+
+    def __init__(self):
+        self.xfs = []
+        self._index = {}
+        self.bold = {}
+        self.fill_types = {}
+        self.borders = {}
+        self.horizontal = {}
+        self.number_formats = {}
+
+    def add(self, cell):
+        style = _style_array(cell)
+        ids = (style.fontId, style.fillId, style.borderId, style.alignmentId, style.numFmtId)
+        index = self._index.get(ids)
+        if index is None:
+            index = self._index[ids] = len(self.xfs)
+            self.xfs.append(list(ids))
+            # JSON object keys are strings
+            self.bold.setdefault(str(style.fontId), bool(cell.font.bold))
+            self.fill_types.setdefault(str(style.fillId), cell.fill.fill_type)
+            border = cell.border
+            self.borders.setdefault(str(style.borderId), [
+                getattr(getattr(border, side), "style", None) for side in SIDES
+            ])
+            self.horizontal.setdefault(str(style.alignmentId), cell.alignment.horizontal)
+            self.number_formats.setdefault(str(style.numFmtId), cell.number_format)
+        return index
+
+    def to_features(self):
+        return {
+            "xfs": self.xfs,
+            "bold": self.bold,
+            "fill_types": self.fill_types,
+            "borders": self.borders,
+            "horizontal": self.horizontal,
+            "number_formats": self.number_formats,
+        }
+
+
+def _sheet_features(sheet, max_row, max_column, styles):
+    cached_value = getattr(sheet, "cached_value", None)
+    cells = []
+    for row in range(1, max_row + 1):
+        for column in range(1, max_column + 1):
+            cell = sheet.cell(row=row, column=column)
+            xf = styles.add(cell)
+            # Style 0 is a missing cell's, so empty unstyled cells are left out
+            if cell.value is None and xf == 0:
+                continue
+            cached = cached_value(row, column) if cached_value is not None and cell.data_type == "f" else None
+            cells.append([row, column, _encode(cell.value), cell.data_type, xf, _encode(cached)])
+
+    charts = []
+    for chart in sheet._charts:
+        anchor = getattr(chart, "anchor", None)
+        ext = getattr(anchor, "ext", None)
+        charts.append({
+            "title": chart_title(chart),
+            "tagname": getattr(chart, "tagname", None),
+            "anchor": [_marker(getattr(anchor, "_from", None)), _marker(getattr(anchor, "to", None))],
+            "size": [ext.cx, ext.cy] if ext is not None else None,
+            "series": series_refs(chart),
+            "fills": chart_fill_kinds(chart),
+        })
+
+    return {
+        "max_row": sheet.max_row,
+        "max_column": sheet.max_column,
+        "cells": cells,
+        "merged": [str(cell_range) for cell_range in sheet.merged_cells.ranges],
+        "tables": [
+            {
+                "name": table.name,
+                "ref": table.ref,
+                "style": table.tableStyleInfo.name if table.tableStyleInfo is not None else None,
+                "stripes": bool(table.tableStyleInfo is not None and table.tableStyleInfo.showRowStripes),
+            }
+            for table in (getattr(sheet, "tables", None) or {}).values()
+        ],
+        "charts": charts,
+    }
+
+
+def workbook_features(workbook, bounds):
+    """Read an opened workbook's gradable contents into a JSON-safe dict."""
+    _, _, max_column, max_row = range_boundaries(bounds)
+    styles = _StyleTable()
+    sheets = {}
+    for name in workbook.sheetnames:
+        sheet = workbook[name]
+        if not styles.xfs:
+            # A cell past the bounds is never stored, so it has the missing-cell style
+            styles.add(sheet.cell(row=max_row + 1, column=1))
+        sheets[name] = _sheet_features(sheet, max_row, max_column, styles)
+    return {
+        "bounds": bounds,
+        "sheetnames": list(workbook.sheetnames),
+        "active": workbook.active.title if workbook.sheetnames else None,
+        "styles": styles.to_features(),
+        "sheets": sheets,
+    }
+
+
+class FeatureStyles:
+    """A record's style table, shaped like utils.xlsx_fast.Stylesheet."""
+
+    def __init__(self, styles):
+        self.xfs = [FastStyle(*ids) for ids in styles["xfs"]] or [FastStyle(0, 0, 0, 0, 0)]
+        self.fonts = {int(k): SimpleNamespace(bold=v) for k, v in styles["bold"].items()}
+        self.fills = {int(k): SimpleNamespace(fill_type=v) for k, v in styles["fill_types"].items()}
+        self.borders = {
+            int(k): SimpleNamespace(**{
+                side: SimpleNamespace(style=value) if value is not None else EMPTY_SIDE
+                for side, value in zip(SIDES, v)
+            })
+            for k, v in styles["borders"].items()
+        }
+        self.alignments = {int(k): SimpleNamespace(horizontal=v) for k, v in styles["horizontal"].items()}
+        self._number_formats = {int(k): v for k, v in styles["number_formats"].items()}
+
+    def number_format(self, number_format_id):
+        return self._number_formats[number_format_id]
+
+
+class FeatureSheet:
+    """One sheet of a feature record, with the lookups of a bounded sheet."""
+
+    def __init__(self, workbook, title, features, max_row, max_column):
+        self.parent = workbook
+        self.title = title
+        self.styles = workbook.styles
+        self._bound_row = max_row
+        self._bound_column = max_column
+        self.max_row = features["max_row"]
+        self.max_column = features["max_column"]
+        self._cells = {
+            (row, column): FastCell(self, row, column, _decode(value), data_type, xf, _decode(cached))
+            for row, column, value, data_type, xf, cached in features["cells"]
+        }
+        self.merged_cells = MultiCellRange(" ".join(features["merged"]))
+        self.tables = {
+            table["name"]: SimpleNamespace(
+                name=table["name"],
+                displayName=table["name"],
+                ref=table["ref"],
+                tableStyleInfo=None if table["style"] is None and not table["stripes"] else SimpleNamespace(
+                    name=table["style"], showRowStripes=table["stripes"]),
+            )
+            for table in features["tables"]
+        }
+        self._charts = [
+            SimpleNamespace(
+                title=chart["title"],
+                tagname=chart["tagname"],
+                anchor=SimpleNamespace(
+                    ext=SimpleNamespace(cx=chart["size"][0], cy=chart["size"][1]) if chart["size"] else None,
+                    **{
+                        name: SimpleNamespace(col=m[0], colOff=m[1], row=m[2], rowOff=m[3]) if m else None
+                        for name, m in zip(("_from", "to"), chart["anchor"])
+                    },
+                ),
+                series_refs=chart["series"],
+                fill_kinds=chart["fills"],
+            )
+            for chart in features["charts"]
+        ]
+
+    def cell(self, row, column):
+        cell = self._cells.get((row, column))
+        if cell is None:
+            cell = FastCell(self, row, column)
+        return cell
+
+    def cached_value(self, row, column):
+        """The value Excel shows: a formula cell's cached result, else the cell's value."""
+        cell = self._cells.get((row, column))
+        if cell is None:
+            return None
+        return cell.cached if cell.data_type == "f" else cell.value
+
+    def __getitem__(self, coordinate):
+        row, column = coordinate_to_tuple(coordinate)
+        return self.cell(row, column)
+
+    def iter_rows(self, min_row=1, max_row=None, min_col=1, max_col=None, values_only=False):
+        max_row = min(max_row or self.max_row, self._bound_row)
+        max_col = min(max_col or self.max_column, self._bound_column)
+        for row in range(min_row, max_row + 1):
+            cells = (self.cell(row, col) for col in range(min_col, max_col + 1))
+            if values_only:
+                yield tuple(cell.value for cell in cells)
+            else:
+                yield tuple(cells)
+
+
+class FeatureWorkbook:
+    """A workbook rebuilt from workbook_features(), for re-running checkers."""
+
+    def __init__(self, features):
+        _, _, self._max_column, self._max_row = range_boundaries(features["bounds"])
+        self._features = features
+        self.sheetnames = features["sheetnames"]
+        self.styles = FeatureStyles(features["styles"])
+        self._sheets = {}
+
+    @property
+    def active(self):
+        return self[self._features["active"]]
+
+    def __contains__(self, name):
+        return name in self._features["sheets"]
+
+    def __getitem__(self, name):
+        if name not in self._features["sheets"]:
+            raise KeyError(f"Worksheet {name} does not exist.")
+        if name not in self._sheets:
+            self._sheets[name] = FeatureSheet(self, name, self._features["sheets"][name],
+                                              self._max_row, self._max_column)
+        return self._sheets[name]
+
+    def close(self):
+        pass
@@ -0,0 +1,171 @@
+"""Checks every submission passes before a parser sees it.
+
+Uploads are copied in chunks into a spooled temporary file, which moves to
+disk past SPOOL_MEMORY_BYTES, hashing the bytes on the way. The zip central
+directory is then checked against the declared sizes and entry count, so a
+zip bomb or a huge upload is turned away before openpyxl, python-docx or the
+inspectors decompress anything. zipfile never inflates a member past its
+declared size, so those limits also bound what the parsers can read.
+
+Oversized media (images, video, embedded objects) are not needed by any
+checker, so rather than rejecting the file they are swapped for empty
+placeholders and the submission is graded with a warning.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import zipfile
+
+CHUNK_SIZE = 1024 * 1024
+SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+
+MAX_UPLOAD_BYTES = int(os.environ.get("GRADER_MAX_UPLOAD_BYTES", 500 * 1024 * 1024))
+MAX_ENTRIES = int(os.environ.get("GRADER_MAX_ZIP_ENTRIES", 5000))
+MAX_UNCOMPRESSED_BYTES = int(os.environ.get("GRADER_MAX_UNCOMPRESSED_BYTES", 512 * 1024 * 1024))
+MAX_PART_BYTES = int(os.environ.get("GRADER_MAX_PART_BYTES", 128 * 1024 * 1024))
+MAX_MEDIA_BYTES = int(os.environ.get("GRADER_MAX_MEDIA_BYTES", 32 * 1024 * 1024))
+MAX_COMPRESSION_RATIO = 500
+
+# Package folders holding binary content no checker reads
+MEDIA_FOLDERS = ("media/", "embeddings/")
+
+
+class SubmissionRejected(Exception):
+    """The file cannot be graded safely."""
+
+
+def _is_media(name):
+    return any(folder in name for folder in MEDIA_FOLDERS) and not name.endswith((".xml", ".rels"))
+
+
+class Submission:
+    """An ingested upload: a seekable file to grade, its SHA-256 and any warnings."""
+
+    def __init__(self, file, digest, warnings):
+        self.file = file
+        self.digest = digest
+        self.warnings = warnings
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def to_path(self):
+        """Copy the file into a named temporary file and return its path.
+
+        For handing the submission to another process without holding it in
+        memory; the caller deletes the file.
+        """
+        self.file.seek(0)
+        with tempfile.NamedTemporaryFile(prefix="grader-", delete=False) as f:
+            shutil.copyfileobj(self.file, f, CHUNK_SIZE)
+        self.file.seek(0)
+        return f.name
+
+
+def _spool(file):
+    """Copy a stream or path into a spooled temp file, hashing it as it goes."""
+    if hasattr(file, "seek"):
+        file.seek(0)
+        source, close_source = file, False
+    else:
+        source, close_source = open(file, "rb"), True
+
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    sha = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                spooled.close()
+                raise SubmissionRejected(f"File is larger than the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB upload limit.")
+            sha.update(chunk)
+            spooled.write(chunk)
+    finally:
+        if close_source:
+            source.close()
+    spooled.seek(0)
+    return spooled, sha.hexdigest()
+
+
+def digest_file(path):
+    """SHA-256 of a file's bytes, as ingest() would compute it."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _check_archive(file):
+    """Validate the central directory; return the media members to drop."""
+    try:
+        with zipfile.ZipFile(file) as archive:
+            members = archive.infolist()
+    except zipfile.BadZipFile:
+        raise SubmissionRejected("File is not a valid Office document (not a zip archive).")
+    finally:
+        file.seek(0)
+
+    if len(members) > MAX_ENTRIES:
+        raise SubmissionRejected(f"File has {len(members)} parts; the limit is {MAX_ENTRIES}.")
+
+    dropped = []
+    total = 0
+    for info in members:
+        if _is_media(info.filename) and info.file_size > MAX_MEDIA_BYTES:
+            dropped.append(info.filename)
+            continue
+        if info.file_size > MAX_PART_BYTES:
+            raise SubmissionRejected(f"Part {info.filename} is too large to grade.")
+        if info.compress_size and info.file_size > CHUNK_SIZE and info.file_size / info.compress_size > MAX_COMPRESSION_RATIO:
+            raise SubmissionRejected(f"Part {info.filename} is compressed suspiciously well (possible zip bomb).")
+        total += info.file_size
+
+    if total > MAX_UNCOMPRESSED_BYTES:
+        raise SubmissionRejected("File expands to more data than the grader allows.")
+    return dropped
+
+
+def _without_members(file, dropped):
+    """Copy an archive, replacing the dropped members with empty placeholders."""
+    stripped = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    with zipfile.ZipFile(file) as source, zipfile.ZipFile(stripped, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            if info.filename in dropped:
+                target.writestr(info.filename, b"")
+                continue
+            with source.open(info) as src, target.open(info, "w", force_zip64=True) as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    stripped.seek(0)
+    return stripped
+
+
+def ingest(file):
+    """Spool, hash and validate an upload or path, returning a Submission.
+
+    Raises SubmissionRejected if the file is not a zip or exceeds the limits.
+    """
+    spooled, digest = _spool(file)
+    try:
+        dropped = _check_archive(spooled)
+        warnings = []
+        if dropped:
+            stripped = _without_members(spooled, dropped)
+            spooled.close()
+            spooled = stripped
+            warnings.append(f"Skipped {len(dropped)} oversized media file(s): {', '.join(dropped)}")
+    except Exception:
+        spooled.close()
+        raise
+    return Submission(spooled, digest, warnings)
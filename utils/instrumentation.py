@@ -0,0 +1,168 @@
+"""Timings and debug messages for one graded submission.
+
+A Trace collects how long each stage took (ingest, cache, parse, check,
+display), how long each grading criterion took, and any debug messages the
+checkers emit. Activate one around the work for a submission:
+
+    with tracing(Trace("excel_2", "smith.xlsx")) as trace:
+        with stage("parse"):
+            ...
+
+stage(), debug() and timed_criteria() find the active trace themselves, so
+checkers need no extra arguments. With no active trace they time nothing
+and debug() only logs.
+
+Set GRADER_TIMINGS_LOG to append every finished trace to that file as JSON
+lines, and GRADER_PROFILE_DIR to dump a cProfile .pstats file per graded
+submission into that folder.
+"""
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger("grader")
+
+TIMINGS_LOG = os.environ.get("GRADER_TIMINGS_LOG")
+PROFILE_DIR = os.environ.get("GRADER_PROFILE_DIR")
+
+_current = contextvars.ContextVar("grader_trace", default=None)
+
+
+class Trace:
+    """Stage timings, criterion timings and debug messages for one submission."""
+
+    def __init__(self, assignment, submission=None):
+        self.assignment = assignment
+        self.submission = submission
+        self.digest = None
+        self.stages = []
+        self.criteria = []
+        self.events = []
+        self._start = time.perf_counter()
+
+    def add_stage(self, name, seconds):
+        self.stages.append((name, seconds))
+
+    def add_criterion(self, text, seconds):
+        self.criteria.append((text, seconds))
+
+    def add_event(self, message):
+        self.events.append((time.perf_counter() - self._start, message))
+
+    def merge(self, other):
+        """Append another trace's timings, e.g. those recorded in a worker process."""
+        self.stages.extend(other.stages)
+        self.criteria.extend(other.criteria)
+        self.events.extend(other.events)
+
+    def records(self):
+        """Flat dicts, one per stage, criterion and message."""
+        common = {"assignment": self.assignment, "submission": self.submission, "digest": self.digest}
+        for name, seconds in self.stages:
+            yield {**common, "kind": "stage", "name": name, "seconds": seconds}
+        for text, seconds in self.criteria:
+            yield {**common, "kind": "criterion", "name": text, "seconds": seconds}
+        for offset, message in self.events:
+            yield {**common, "kind": "debug", "name": message, "seconds": offset}
+
+    def to_jsonl(self):
+        return "".join(json.dumps(record) + "\n" for record in self.records())
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def tracing(trace, log=True):
+    """Make `trace` the active trace; append it to GRADER_TIMINGS_LOG on exit.
+
+    Pass log=False when the trace will be activated again later and should
+    only be written once it is complete.
+    """
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+        if log and TIMINGS_LOG:
+            with open(TIMINGS_LOG, "a", encoding="utf-8") as f:
+                f.write(trace.to_jsonl())
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a named stage of the active trace."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_stage(name, time.perf_counter() - start)
+
+
+def debug(message):
+    """Log a checker's debug message and keep it on the active trace."""
+    logger.debug(message)
+    trace = _current.get()
+    if trace is not None:
+        trace.add_event(message)
+
+
+class _TimedCompleted(list):
+    """A "Completed" list that times each criterion from one append to the next."""
+
+    def __init__(self, trace, criteria):
+        super().__init__()
+        self._trace = trace
+        self._criteria = criteria
+        self._last = time.perf_counter()
+
+    def append(self, value):
+        now = time.perf_counter()
+        index = len(self)
+        text = self._criteria[index] if index < len(self._criteria) else f"criterion {index + 1}"
+        self._trace.add_criterion(text, now - self._last)
+        self._last = now
+        super().append(value)
+
+
+def timed_criteria(criteria):
+    """Return the list a hand-written checker appends its results to.
+
+    While a trace is active, each append records the time since the previous
+    one against the matching criterion text. Otherwise it is a plain list.
+    """
+    trace = _current.get()
+    if trace is None:
+        return []
+    return _TimedCompleted(trace, criteria)
+
+
+@contextmanager
+def profiled(assignment):
+    """Profile a block into GRADER_PROFILE_DIR when that variable is set."""
+    if not PROFILE_DIR:
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        trace = _current.get()
+        label = (trace and (trace.digest or trace.submission)) or str(time.time_ns())
+        label = re.sub(r"[^\w.-]", "_", str(label))[:64]
+        folder = Path(PROFILE_DIR)
+        folder.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(folder / f"{assignment}-{label}.pstats")
@@ -0,0 +1,140 @@
+"""Spatial indexes over a sheet's merged ranges and Excel tables.
+
+Checkers ask two questions about merges and tables: "is exactly this range
+merged?" and "which merged range (or table) covers this cell?". Scanning
+merged_cells.ranges answers both in time linear in the number of merges,
+and comparing stringified ranges by substring also matches the wrong ones
+("A35" is in "A350:B351"). RangeIndex answers the first with a set lookup
+and the second with a centered interval tree over rows, so sheets with
+thousands of merges cost a few comparisons per lookup.
+"""
+from bisect import bisect_right
+
+from openpyxl.utils.cell import coordinate_to_tuple, range_boundaries
+
+
+class IndexedRange:
+    """A rectangle of cells, plus what it came from (e.g. a table)."""
+
+    __slots__ = ("min_row", "min_col", "max_row", "max_col", "coord", "value")
+
+    def __init__(self, coord, value=None):
+        self.min_col, self.min_row, self.max_col, self.max_row = _bounds(coord)
+        self.coord = coord
+        self.value = value
+
+    @property
+    def bounds(self):
+        return self.min_row, self.min_col, self.max_row, self.max_col
+
+    def contains(self, row, column):
+        return self.min_row <= row <= self.max_row and self.min_col <= column <= self.max_col
+
+    def __repr__(self):
+        return f"IndexedRange({self.coord!r})"
+
+
+def _bounds(coord):
+    """(min_col, min_row, max_col, max_row) of "A1" or "A1:B2", ignoring $ signs."""
+    coord = str(coord).replace("$", "")
+    min_col, min_row, max_col, max_row = range_boundaries(coord if ":" in coord else f"{coord}:{coord}")
+    return min_col, min_row, max_col, max_row
+
+
+class _Node:
+    """Ranges that span the node's center row, plus subtrees above and below it.
+
+    Merged ranges never overlap, and neither do tables, so the ranges that
+    all span one row are disjoint in columns: sorted by first column, a
+    bisect finds the only one that can hold a given column.
+    """
+
+    __slots__ = ("center", "starts", "ranges", "above", "below")
+
+    def __init__(self, ranges):
+        rows = sorted(row for entry in ranges for row in (entry.min_row, entry.max_row))
+        self.center = rows[len(rows) // 2]
+        here, above, below = [], [], []
+        for entry in ranges:
+            if entry.max_row < self.center:
+                above.append(entry)
+            elif entry.min_row > self.center:
+                below.append(entry)
+            else:
+                here.append(entry)
+        here.sort(key=lambda entry: entry.min_col)
+        self.ranges = here
+        self.starts = [entry.min_col for entry in here]
+        self.above = _Node(above) if above else None
+        self.below = _Node(below) if below else None
+
+    def find(self, row, column):
+        node = self
+        while node is not None:
+            i = bisect_right(node.starts, column) - 1
+            if i >= 0 and node.ranges[i].contains(row, column):
+                return node.ranges[i]
+            if row == node.center:
+                return None
+            node = node.above if row < node.center else node.below
+        return None
+
+
+class RangeIndex:
+    """Non-overlapping ranges with exact-match and covering-cell lookups."""
+
+    def __init__(self, ranges=()):
+        self.ranges = [entry if isinstance(entry, IndexedRange) else IndexedRange(str(entry)) for entry in ranges]
+        self._exact = {entry.bounds: entry for entry in self.ranges}
+        self._root = _Node(self.ranges) if self.ranges else None
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def __iter__(self):
+        return iter(self.ranges)
+
+    def covering(self, row, column=None):
+        """The range holding a cell, given as (row, column) or "B7"; None if there is none."""
+        if column is None:
+            row, column = coordinate_to_tuple(str(row).replace("$", ""))
+        return self._root.find(row, column) if self._root is not None else None
+
+    def exactly(self, coord):
+        """The range that is exactly `coord` (e.g. "A13:G13"), or None."""
+        min_col, min_row, max_col, max_row = _bounds(coord)
+        return self._exact.get((min_row, min_col, max_row, max_col))
+
+    def starts_at(self, row, column=None):
+        """The range whose top-left cell is the given one, or None."""
+        entry = self.covering(row, column)
+        if entry is None:
+            return None
+        if column is None:
+            row, column = coordinate_to_tuple(str(row).replace("$", ""))
+        return entry if (entry.min_row, entry.min_col) == (row, column) else None
+
+
+class SheetRanges:
+    """The merged-range and table indexes of one sheet.
+
+    Table entries carry the table object (openpyxl's Table or its XML
+    backend / feature record equivalent) as `value`.
+    """
+
+    def __init__(self, sheet):
+        self.merged = RangeIndex(str(cell_range) for cell_range in sheet.merged_cells.ranges)
+        tables = getattr(sheet, "tables", None) or {}
+        self.tables = RangeIndex(IndexedRange(table.ref, table) for table in tables.values() if table.ref)
+
+    def is_merged(self, coord):
+        """True when exactly `coord` is one merged range."""
+        return self.merged.exactly(coord) is not None
+
+
+def sheet_ranges(sheet):
+    """The sheet's SheetRanges, built on first use and kept on the sheet."""
+    ranges = getattr(sheet, "_sheet_ranges", None)
+    if ranges is None:
+        ranges = sheet._sheet_ranges = SheetRanges(sheet)
+    return ranges
@@ -0,0 +1,7 @@
+def score_results(checklist_data, max_points=20):
+    """Return (percentage complete, points) for a checklist."""
+    total_yes = checklist_data["Completed"].count("Yes")
+    total_items = len(checklist_data["Completed"])
+    percentage_complete = (total_yes / total_items) * 100
+    points = (total_yes / total_items) * max_points
+    return percentage_complete, points
@@ -0,0 +1,129 @@
+from array import array
+
+from openpyxl.styles.cell_style import StyleArray
+
+DEFAULT_STYLE = StyleArray()
+
+
+def _style_array(cell):
+    # Read-only cells expose their style ids as style_array, regular cells as
+    # _style, which stays unset until the cell is given a style
+    if hasattr(cell, "style_array"):
+        return cell.style_array
+    return cell._style or DEFAULT_STYLE
+
+
+def _has_border(border):
+    return any(
+        side is not None and side.style is not None
+        for side in (border.left, border.right, border.top, border.bottom)
+    )
+
+
+class StyleSnapshot:
+    """Values and style ids for a block of cells, read in a single pass.
+
+    Each cell's font, fill, border, alignment and number format are stored as
+    the integer ids the workbook's stylesheet uses. The attributes the
+    checkers look at (bold, fill type, borders, horizontal alignment, number
+    format) are decoded once per distinct id, so criteria compare integers
+    and small lookups instead of full style objects. Formula cells also keep
+    the result cached in the file when the sheet provides it.
+    """
+
+    def __init__(self, sheet, max_row, max_column, min_row=1, min_column=1):
+        # The sheet's name, e.g. to tell its own cells in "Alumni!H2:H32"
+        self.title = getattr(sheet, "title", None)
+        self.min_row = min_row
+        self.min_column = min_column
+        self.max_row = max_row
+        self.max_column = max_column
+        self.width = max_column - min_column + 1
+        size = (max_row - min_row + 1) * self.width
+
+        self.values = [None] * size
+        self.data_types = [None] * size
+        # Cached formula results by index, when the sheet can supply them
+        self._results = {}
+        cached_value = getattr(sheet, "cached_value", None)
+        self.font_ids = array("i", [0]) * size
+        self.fill_ids = array("i", [0]) * size
+        self.border_ids = array("i", [0]) * size
+        self.alignment_ids = array("i", [0]) * size
+        self.number_format_ids = array("i", [0]) * size
+
+        # Decoded attributes, keyed by style id
+        self._bold = {}
+        self._fill_types = {}
+        self._borders = {}
+        self._horizontal = {}
+        self._number_formats = {}
+
+        i = 0
+        for row in range(min_row, max_row + 1):
+            for column in range(min_column, max_column + 1):
+                cell = sheet.cell(row=row, column=column)
+                style = _style_array(cell)
+                self.values[i] = cell.value
+                self.data_types[i] = cell.data_type
+                if cell.data_type == "f" and cached_value is not None:
+                    self._results[i] = cached_value(row, column)
+                self.font_ids[i] = style.fontId
+                self.fill_ids[i] = style.fillId
+                self.border_ids[i] = style.borderId
+                self.alignment_ids[i] = style.alignmentId
+                self.number_format_ids[i] = style.numFmtId
+
+                if style.fontId not in self._bold:
+                    self._bold[style.fontId] = bool(cell.font.bold)
+                if style.fillId not in self._fill_types:
+                    self._fill_types[style.fillId] = cell.fill.fill_type
+                if style.borderId not in self._borders:
+                    self._borders[style.borderId] = _has_border(cell.border)
+                if style.alignmentId not in self._horizontal:
+                    self._horizontal[style.alignmentId] = cell.alignment.horizontal
+                if style.numFmtId not in self._number_formats:
+                    self._number_formats[style.numFmtId] = cell.number_format
+                i += 1
+
+    def index(self, row, column):
+        return (row - self.min_row) * self.width + (column - self.min_column)
+
+    def value(self, row, column):
+        return self.values[self.index(row, column)]
+
+    def cached_value(self, row, column):
+        """A formula cell's cached result (None if the file has none), else its value."""
+        i = self.index(row, column)
+        if self.data_types[i] == "f":
+            return self._results.get(i)
+        return self.values[i]
+
+    def data_type(self, row, column):
+        return self.data_types[self.index(row, column)]
+
+    def fill_id(self, row, column):
+        return self.fill_ids[self.index(row, column)]
+
+    def bold(self, row, column):
+        return self._bold[self.font_ids[self.index(row, column)]]
+
+    def fill_type(self, row, column):
+        return self._fill_types[self.fill_ids[self.index(row, column)]]
+
+    def has_border(self, row, column):
+        return self._borders[self.border_ids[self.index(row, column)]]
+
+    def horizontal(self, row, column):
+        return self._horizontal[self.alignment_ids[self.index(row, column)]]
+
+    def number_format(self, row, column):
+        return self._number_formats[self.number_format_ids[self.index(row, column)]]
+
+    def rows(self, max_row=None, max_column=None):
+        """Yield row value tuples, optionally stopping short of the snapshot's edge."""
+        max_row = min(max_row or self.max_row, self.max_row)
+        max_column = min(max_column or self.max_column, self.max_column)
+        for row in range(self.min_row, max_row + 1):
+            start = self.index(row, self.min_column)
+            yield tuple(self.values[start:start + max_column - self.min_column + 1])
@@ -0,0 +1,194 @@
+from xml.etree.ElementTree import iterparse
+
+from openpyxl import load_workbook
+from openpyxl.cell.read_only import ReadOnlyCell
+from openpyxl.chart.chartspace import ChartSpace
+from openpyxl.chart.reader import read_chart
+from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+from openpyxl.packaging.relationship import get_dependents, get_rel, get_rels_path
+from openpyxl.utils.cell import coordinate_to_tuple, range_boundaries
+from openpyxl.worksheet.cell_range import MultiCellRange
+from openpyxl.worksheet.table import Table, TableList
+from openpyxl.worksheet._reader import WorkSheetParser
+from openpyxl.xml.constants import SHEET_MAIN_NS
+from openpyxl.xml.functions import fromstring
+
+from utils.xlsx_fast import formula_result
+
+MERGE_CELL_TAG = f"{{{SHEET_MAIN_NS}}}mergeCell"
+MERGE_CELLS_TAG = f"{{{SHEET_MAIN_NS}}}mergeCells"
+VALUE_TAG = f"{{{SHEET_MAIN_NS}}}v"
+
+
+class DualViewParser(WorkSheetParser):
+    """openpyxl's sheet parser, also keeping each formula cell's cached result.
+
+    openpyxl returns either the formulas or (with data_only=True) the cached
+    values; this keeps both from the same pass over the XML.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cached_values = {}
+
+    def parse_cell(self, element):
+        cell = super().parse_cell(element)
+        if cell["data_type"] == "f":
+            self.cached_values[(cell["row"], cell["column"])] = formula_result(
+                element.get("t", "n"), element.findtext(VALUE_TAG), self.shared_strings)
+        return cell
+
+
+class BoundedSheet:
+    """Read-only view of the top-left block of a worksheet.
+
+    Only the rows and columns inside the bounds are parsed, once, when the
+    sheet is first opened. Cells expose the same value, data_type, font,
+    fill, border, alignment and number_format lookups as a normal openpyxl
+    cell, and formula results are available from cached_value. Merged
+    ranges and charts are only read if a checker asks for them.
+    """
+
+    def __init__(self, sheet, max_row, max_column):
+        self.title = sheet.title
+        self._sheet = sheet
+        self._bound_row = max_row
+        self._bound_column = max_column
+        self._cells = {}
+        self._merged_cells = None
+        self._chart_list = None
+        self._tables = None
+
+        # Drive openpyxl's row parser ourselves (as ReadOnlyWorksheet.iter_rows
+        # does) so formula results are captured in the same pass
+        workbook = sheet.parent
+        with sheet._get_source() as src:
+            parser = DualViewParser(src, sheet._shared_strings, data_only=False, epoch=workbook.epoch,
+                                    date_formats=workbook._date_formats,
+                                    timedelta_formats=workbook._timedelta_formats)
+            for index, row in parser.parse():
+                if index > max_row:
+                    break
+                for cell in row:
+                    if cell["column"] <= max_column:
+                        self._cells[(cell["row"], cell["column"])] = ReadOnlyCell(sheet, **cell)
+        self._cached_values = parser.cached_values
+
+        # Use the size the worksheet declares, like a fully loaded sheet would,
+        # and fall back to the populated cells when the file doesn't record it
+        self.max_row = sheet.max_row or max((r for r, _ in self._cells), default=1)
+        self.max_column = sheet.max_column or max((c for _, c in self._cells), default=1)
+
+    def cell(self, row, column):
+        cell = self._cells.get((row, column))
+        if cell is None:
+            # Missing cells carry the workbook's default style, as in full mode
+            cell = ReadOnlyCell(self._sheet, row, column, None)
+        return cell
+
+    def cached_value(self, row, column):
+        """The value Excel shows: a formula cell's cached result, else the cell's value."""
+        cell = self._cells.get((row, column))
+        if cell is None:
+            return None
+        return self._cached_values.get((row, column)) if cell.data_type == "f" else cell.value
+
+    def __getitem__(self, coordinate):
+        row, column = coordinate_to_tuple(coordinate)
+        return self.cell(row, column)
+
+    def iter_rows(self, min_row=1, max_row=None, min_col=1, max_col=None, values_only=False):
+        max_row = min(max_row or self.max_row, self._bound_row)
+        max_col = min(max_col or self.max_column, self._bound_column)
+        for row in range(min_row, max_row + 1):
+            cells = (self.cell(row, col) for col in range(min_col, max_col + 1))
+            if values_only:
+                yield tuple(cell.value for cell in cells)
+            else:
+                yield tuple(cells)
+
+    @property
+    def merged_cells(self):
+        if self._merged_cells is None:
+            ranges = []
+            with self._sheet._get_source() as src:
+                for _, element in iterparse(src):
+                    if element.tag == MERGE_CELL_TAG:
+                        ranges.append(element.get("ref"))
+                    elif element.tag == MERGE_CELLS_TAG:
+                        break
+                    element.clear()
+            self._merged_cells = MultiCellRange(" ".join(ranges))
+        return self._merged_cells
+
+    @property
+    def _charts(self):
+        if self._chart_list is None:
+            self._chart_list = self._read_charts()
+        return self._chart_list
+
+    @property
+    def tables(self):
+        """The sheet's Excel tables by name, as on a fully loaded sheet."""
+        if self._tables is None:
+            self._tables = TableList()
+            archive = self._sheet.parent._archive
+            rels_path = get_rels_path(self._sheet._worksheet_path)
+            if rels_path in archive.namelist():
+                for rel in get_dependents(archive, rels_path).find(Table._rel_type):
+                    table = Table.from_tree(fromstring(archive.read(rel.target)))
+                    self._tables[table.name] = table
+        return self._tables
+
+    def _read_charts(self):
+        """Read the charts in the sheet's drawings without decoding images."""
+        archive = self._sheet.parent._archive
+        names = set(archive.namelist())
+        rels_path = get_rels_path(self._sheet._worksheet_path)
+        if rels_path not in names:
+            return []
+
+        charts = []
+        for rel in get_dependents(archive, rels_path).find(SpreadsheetDrawing._rel_type):
+            drawing = SpreadsheetDrawing.from_tree(fromstring(archive.read(rel.target)))
+            drawing_rels_path = get_rels_path(rel.target)
+            deps = get_dependents(archive, drawing_rels_path) if drawing_rels_path in names else []
+            for chart_rel in drawing._chart_rels:
+                chart = read_chart(get_rel(archive, deps, chart_rel.id, ChartSpace))
+                chart.anchor = chart_rel.anchor
+                charts.append(chart)
+        return charts
+
+
+class BoundedWorkbook:
+    """Workbook opened in read-only mode that only materialises the sheets
+    a checker actually opens, each limited to a fixed cell range."""
+
+    def __init__(self, workbook, bounds):
+        _, _, self._max_column, self._max_row = range_boundaries(bounds)
+        self._workbook = workbook
+        self._sheets = {}
+
+    @property
+    def sheetnames(self):
+        return self._workbook.sheetnames
+
+    @property
+    def active(self):
+        return self[self._workbook.active.title]
+
+    def __contains__(self, name):
+        return name in self._workbook.sheetnames
+
+    def __getitem__(self, name):
+        if name not in self._sheets:
+            self._sheets[name] = BoundedSheet(self._workbook[name], self._max_row, self._max_column)
+        return self._sheets[name]
+
+    def close(self):
+        self._workbook.close()
+
+
+def load_bounded_workbook(file, bounds):
+    """Open a workbook for grading, reading only cells inside `bounds` (e.g. "A1:I35")."""
+    return BoundedWorkbook(load_workbook(file, read_only=True), bounds)